@@ -12,6 +12,8 @@
 #                                                                                            #
 # ########################################################################################## #
 
+import sys
+
 from maptasker.src import mapit
 
 
@@ -21,6 +23,12 @@ def main():
     
     """
 
+    # 'maptasker serve ...': run the render server
+    if sys.argv[1:2] == ["serve"]:
+        from maptasker.src.server import serve
+
+        exit(serve(sys.argv[2:]))
+
     # Call the core function passing an empty filename
     return_code = mapit.mapit_all("")
     exit(return_code)
@@ -18,7 +18,7 @@ from maptasker.src.actiont import lookup_values
 from maptasker.src.error import error_handler
 from maptasker.src.format import format_html
 from maptasker.src.primitem import PrimeItems
-from maptasker.src.shelsort import shell_sort
+from maptasker.src.shelsort import sort_by_sr
 from maptasker.src.sysconst import DISABLED, FONT_FAMILY, RE_FONT, DISPLAY_DETAIL_LEVEL_all_tasks
 from maptasker.src.xmldata import remove_html_tags
 
@@ -51,7 +51,7 @@ def get_args(action: defusedxml.ElementTree, ignore_list: list) -> tuple[list, l
     # If we have args then sort them and convert to string
     if master_list:
         # Sort args by their number (e.g. arg0, arg1, arg2, ...)
-        shell_sort(master_list, True, False)
+        master_list = sort_by_sr(master_list)
         # Now go through args and build our "type" and "arg" lists
         for child in master_list:
             argument_types.append(child.tag)  # one of: 'Str' 'Int' 'Bundle' 'App'
@@ -19,9 +19,15 @@
 #      ['some_string:', 'l', 'lookup-code] for actiont dictionary lookup for specific  #
 #       code.                                                                          #
 #                                                                                      #
+#  The master table is frozen (read-only).  Anything learned about a code from the     #
+#  backup (e.g. more args than the table has) goes into a per-run LearnedActionCodes   #
+#  overlay instead, so decoding never depends on the order in which Tasks are done.    #
+#                                                                                      #
+from __future__ import annotations
 
-
+import threading
 from collections import namedtuple
+from types import MappingProxyType
 
 # from typing import List
 
@@ -4123,3 +4129,106 @@ action_codes = {
         ],
     ),
 }
+
+# Freeze the master table so that it can be shared safely (e.g. by parallel decoding).
+action_codes = MappingProxyType(action_codes)
+
+
+class LearnedActionCodes:
+    """
+    Per-run overlay of Action codes learned from the backup: codes that are not in
+    action_codes, or that have more args in the backup than in action_codes.
+
+    The overlay only records what was learned, which is logged at the end of the run
+    (see actiond.log_learned_action_codes) so that actionc.py can be updated.  It is
+    thread-safe, and merging overlays is deterministic: for each code we always keep the
+    entry with the most args, regardless of the order in which they were learned/merged.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the empty overlay
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        """
+        self.codes = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self) -> dict:
+        """
+        Get the state to pickle (e.g. to return the overlay from a worker process)
+        Args:
+            self: The instance of the class
+        Returns:
+            dict: the learned codes (the lock can not be pickled)
+        """
+        with self.lock:
+            return {"codes": dict(self.codes)}
+
+    def __setstate__(self, state: dict) -> None:
+        """
+        Restore the pickled state, with a new lock
+        Args:
+            state (dict): the learned codes
+        Returns:
+            None
+        """
+        self.codes = state["codes"]
+        self.lock = threading.Lock()
+
+    def learn(self, the_action_code_plus: str, numargs: int, args: list, types: list) -> None:
+        """
+        Record the arg count and types for the given Action code.
+        Args:
+            the_action_code_plus (str): the Action code with "action type" (e.g. 861t, t=Task, e=Event, s=State)
+            numargs (int): number of args found in the backup
+            args (list): list of arg positions (e.g. ["0", "1"])
+            types (list): list of arg types (e.g. ["Str", "Int"])
+        Returns:
+            None
+        """
+        entry = ActionCode(numargs, "", tuple(args), tuple(types), "", (), ())
+        with self.lock:
+            self.codes[the_action_code_plus] = self.choose(self.codes.get(the_action_code_plus), entry)
+
+    def merge(self, other: LearnedActionCodes) -> None:
+        """
+        Merge another overlay (e.g. from a worker) into this one.
+        Args:
+            other (LearnedActionCodes): the overlay to merge in
+        Returns:
+            None
+        """
+        with other.lock:
+            other_codes = dict(other.codes)
+        with self.lock:
+            for the_action_code_plus, entry in other_codes.items():
+                self.codes[the_action_code_plus] = self.choose(self.codes.get(the_action_code_plus), entry)
+
+    def items(self) -> list:
+        """
+        Get the learned entries, in Action code order (e.g. to log them at the end of the run)
+        Args:
+            self: The instance of the class
+        Returns:
+            list: list of (the Action code with "action type", learned entry) tuples
+        """
+        with self.lock:
+            return sorted(self.codes.items())
+
+    @staticmethod
+    def choose(current: ActionCode | None, new: ActionCode) -> ActionCode:
+        """
+        Choose between two learned entries for the same code: keep the one with the most args.
+        Ties are broken on the args and types so that the choice never depends on order.
+        Args:
+            current (ActionCode | None): the entry we already have, if any
+            new (ActionCode): the new entry
+        Returns:
+            ActionCode: the entry to keep
+        """
+        if current is None:
+            return new
+        return max(current, new, key=lambda entry: (entry.numargs, entry.args, entry.types))
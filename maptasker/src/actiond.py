@@ -7,11 +7,12 @@
 #                                                                                      #
 from __future__ import annotations
 
-import contextlib
 from typing import TYPE_CHECKING, Any
 
 import maptasker.src.action as get_action
 from maptasker.src.actionc import action_codes
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.runprof import profile_count
 from maptasker.src.sysconst import logger
 
 if TYPE_CHECKING:
@@ -25,95 +26,92 @@ IGNORE_ITEMS = ["code", "label", "se", "on", "ListElementItem", "pri", "pin"]
 #     return action_codes
 
 
-# Update the dictionary for the Action code
-#  This is only called if the action code is already in our master
+# Record what we learned about an Action code that is already in our master
 #  dictionary of codes.
 def update_action_codes(
     action: defusedxml.ElementTree,
-    the_action_code_plus: defusedxml.ElementTree,
-) -> defusedxml.ElementTree:
+    the_action_code_plus: str,
+) -> None:
     """
-    Update the dictionary for the Action code
+    Record the Action's args in the learned overlay if the backup has more args than
+    our master dictionary of codes.
         :param action: <Action> xml element
         :param the_action_code_plus: the Action code with "action type"
                 (e.g. 861t, t=Task, e=Event, s=State)
         :return: nothing
     """
-    # Update dictionary entry for this code in the format of an output line
-    # dict = { 'the_code':
-    #               {num_args: num,
-    #                args: arg0, arg1, ... type: Int/Str  }
     arg_list, type_list, arg_nums = get_action.get_args(action, IGNORE_ITEMS)
     arg_count = len(arg_list)
 
     # Compare this Actions num of args to dictionary's
     if arg_count > action_codes[the_action_code_plus].numargs:
-        with contextlib.suppress(Exception):
-            action_codes[the_action_code_plus].numargs = arg_count
-            action_codes[the_action_code_plus].args = arg_nums
-            action_codes[the_action_code_plus].types = type_list
+        PrimeItems.learned_action_codes.learn(the_action_code_plus, arg_count, arg_nums, type_list)
 
         logger.debug(
             "update_action_codes:"
             f" {the_action_code_plus} {action_codes[the_action_code_plus]!s} numargs of {action_codes[the_action_code_plus].numargs} update to {arg_count}:  needs to be updated in actionc.py!",
         )
-    return
 
 
-# Build the dictionary for the Action code.  Only called if the action code is not
+# Record the Action code's args.  Only called if the action code is not
 #   in our master dictionary of codes.
 def build_new_action_codes(
     action: defusedxml.ElementTree,
-    the_action_code_plus: defusedxml.ElementTree,
-) -> defusedxml.ElementTree:
+    the_action_code_plus: str,
+) -> None:
     """
-    Build the dictionary for the Action code
+    Record the args of an Action code that is not in our master dictionary of codes.
         :param action: <Action> xml element
         :param the_action_code_plus: the Action code with "action type" (e.g. 861t, t=Task, e=Event, s=State)
         :return: nothing
     """
     logger.info(f"...for {the_action_code_plus}")
+    profile_count("unknown_action_codes")
 
-    # Create a dictionary entry for this code in the format of an output line
-    # dict = { 'the_code':
-    #               {num_args: num, args: ['arg0', 'arg1', ...], types: ['Str', 'Int', ...]
+    # Record the args in the format of an action code entry:
+    #  {num_args: num, args: ['0', '1', ...], types: ['Str', 'Int', ...]
     arg_list, type_list, arg_nums = get_action.get_args(action, IGNORE_ITEMS)
-    arg_count = len(arg_list)
-    with contextlib.suppress(Exception):
-        action_codes[the_action_code_plus].numargs = arg_count
-        action_codes[the_action_code_plus].args = arg_nums
-        action_codes[the_action_code_plus].types = type_list
-    return
-
-
-# Build the dictionary for each Action code
-#  This is only called if the action code is not already in our master dictionary of codes
-# child = pointer to <code> xml
-# action = pointer to root xml (<Action> or <Profile>)
-# adder = empty if <action>.  Else it is a Profile condition, and we need to make key unique
+    PrimeItems.learned_action_codes.learn(the_action_code_plus, len(arg_list), arg_nums, type_list)
+
+
+# Learn about each Action code from the backup.
+#  The master dictionary of codes (actionc.py) is read-only.  What we learn goes into
+#  the per-run overlay, PrimeItems.learned_action_codes.
+# action = pointer to root xml (<Action> or <Profile> condition)
+# the_action_code_plus = code with "action type" appended to make the key unique
 def build_action_codes(
     action: defusedxml.ElementTree,
-    child: defusedxml.ElementTree,
-) -> defusedxml.ElementTree:
+    the_action_code_plus: str,
+) -> None:
     """
-    Build the dictionary for each Action code
+    Learn about the Action code from the backup.
     We first check if the_action_code_plus is already in action_codes.
     If it is, we call the update_action_codes() function. Otherwise, we call the
-    build_new_action_codes() function followed by some logging and debugging output
-    (if debug mode is enabled) as before.
+    build_new_action_codes() function.
 
-        :param action: xml element with Task action's "<code>nnn</code>"
-        :param child: xml root element of Task action
-        :return:
+        :param action: xml root element of the Task action or Profile condition
+        :param the_action_code_plus: the Action code with "action type" (e.g. 861t, t=Task, e=Event, s=State)
+        :return: nothing
     """
-    #  Get the actual dictionary/action code
-    the_action_code_plus = child.text
     if the_action_code_plus in action_codes:
         update_action_codes(action, the_action_code_plus)
     else:
         build_new_action_codes(action, the_action_code_plus)
 
-    return
+
+# Log what was learned about the Action codes during the run.
+def log_learned_action_codes() -> None:
+    """
+    Log the Action codes learned from the backup during the run: codes that are not in
+    our master dictionary of codes, or that have more args in the backup.
+        :return: nothing
+    """
+    for the_action_code_plus, entry in PrimeItems.learned_action_codes.items():
+        status = "has more args than" if the_action_code_plus in action_codes else "is not in"
+        logger.info(
+            f"actiond: {the_action_code_plus} {status} actionc.py: numargs={entry.numargs}, args={list(entry.args)},"
+            f" types={list(entry.types)}",
+        )
 
 
 # Given a child xml element, determine if it is a boolean of condtion
@@ -10,12 +10,14 @@ from __future__ import annotations
 
 import re
 from collections import defaultdict
+from functools import cache
 from typing import TYPE_CHECKING
 
 import maptasker.src.action as get_action
 from maptasker.src.actargs import action_args
 from maptasker.src.format import format_html
 from maptasker.src.primitem import PrimeItems
+from maptasker.src.shelsort import numeric_key
 from maptasker.src.sysconst import (
     DISPLAY_DETAIL_LEVEL_all_tasks,
     DISPLAY_DETAIL_LEVEL_all_variables,
@@ -32,6 +34,18 @@ if TYPE_CHECKING:
     import defusedxml.ElementTree
 
 
+# Get the result keys ("arg0", "arg1", ...) for the required args, in argument order.
+@cache
+def get_arg_keys_in_order(required_args: tuple) -> tuple:
+    """
+    Get the evaluated result keys for the required args, sorted by argument number.
+    This is worked out once for each distinct set of required args (i.e. per Action code).
+    :param required_args: tuple of required arg numbers (e.g. ("0", "1", "if"))
+    :return: tuple of the result keys (e.g. ("arg0", "arg1", "argif"))
+    """
+    return tuple(f"arg{arg}" for arg in sorted(required_args, key=numeric_key))
+
+
 # Given a list of positional items, return a string in the correct order based
 # on position
 def get_results_in_arg_order(evaluated_results: dict) -> str:
@@ -45,8 +59,8 @@ def get_results_in_arg_order(evaluated_results: dict) -> str:
 
     # Get all of the evaluated results into a single list
     result_parts = []
-    for arg in evaluated_results["required_args"]:
-        value = evaluated_results[f"arg{arg}"]["value"]
+    for arg_key in get_arg_keys_in_order(tuple(evaluated_results["required_args"])):
+        value = evaluated_results[arg_key]["value"]
         if value is not None:
             result_parts.append(value)
         # Eliminate empty values
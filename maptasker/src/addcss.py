@@ -5,11 +5,57 @@
 #                                                                                      #
 # addcss: Add formatting CSS to output HTML for the colors and font to use             #
 #                                                                                      #
+#         The colors and font are not put into the output lines as is.  A style        #
+#         token (see style_token) is put there instead, which is replaced by the       #
+#         current color/font when the html is written out (see apply_style).  The      #
+#         output lines are thus the same for any colors and font, and a map can be     #
+#         restyled without being mapped again.                                         #
+#                                                                                      #
 import contextlib
+import re
 
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import FONT_FAMILY, FormatLine
 
+# Style tokens are delimited by these Unicode private use characters, which are not in Tasker's xml.
+STYLE_MARKER_START = "\ue000"
+STYLE_MARKER_END = "\ue001"
+style_token_pattern = re.compile(f"{STYLE_MARKER_START}([a-z_]+){STYLE_MARKER_END}")
+
+
+# Get the style token for a color name (e.g. "project_color") or the font ("font").
+def style_token(name: str) -> str:
+    """
+    Get the style token for a color name or the font, to be replaced by the color/font
+    when the html is written out.
+        Args:
+            name (str): color name (key of PrimeItems.colors_to_use) or "font"
+
+        Returns:
+            str: the style token
+    """
+    return f"{STYLE_MARKER_START}{name}{STYLE_MARKER_END}"
+
+
+# Replace the style tokens in an output line with the current colors and font.
+def apply_style(line: str) -> str:
+    """
+    Replace the style tokens in the output line with the current colors and font.
+        Args:
+            line (str): the output line
+
+        Returns:
+            str: the line with the actual colors and font.
+    """
+    if STYLE_MARKER_START not in line:
+        return line
+    font = PrimeItems.program_arguments["font"]
+    colors = PrimeItems.colors_to_use
+    return style_token_pattern.sub(
+        lambda match: font if match[1] == "font" else colors.get(match[1], ""),
+        line,
+    )
+
 
 def add_css() -> None:
     """
@@ -33,7 +79,7 @@ def add_css() -> None:
         for color_argument_name in PrimeItems.colors_to_use:
             with contextlib.suppress(KeyError):
                 if PrimeItems.colors_to_use[color_argument_name]:
-                    our_html = f'color: {PrimeItems.colors_to_use[color_argument_name]}{FONT_FAMILY}{PrimeItems.program_arguments["font"]}'
+                    our_html = f'color: {style_token(color_argument_name)}{FONT_FAMILY}{style_token("font")}'
                     PrimeItems.output_lines.add_line_to_output(
                         5,
                         f".{color_argument_name} {{{our_html}}}",
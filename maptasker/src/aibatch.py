@@ -0,0 +1,861 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# aibatch: Ai analysis of many Projects/Profiles/Tasks at once                         #
+#                                                                                      #
+#          Each object is mapped on its own (see render.py) to get its query, and     #
+#          the queries are sent to the model concurrently (asyncio), at most           #
+#          "concurrency" at a time and, optionally, at most "requests_per_minute".    #
+#                                                                                      #
+#          The responses are kept in a cache file, by model and a hash of the          #
+#          messages sent, so an object that hasn't changed is never sent again.       #
+#          The interactive analysis (mapai.py) uses the same queries and cache.        #
+#          The response can be streamed, chunk by chunk, as the model writes it       #
+#          (see guiai.py, which shows it in the GUI's Analysis view as it comes).     #
+#                                                                                      #
+#          Example:                                                                    #
+#              from maptasker.src.aibatch import analyze_backup                        #
+#              results = analyze_backup(Path("backup.xml").read_bytes(),               #
+#                                       [("Project", "Base"), ("Task", "Clock")],      #
+#                                       "llama3.1:8b")                                 #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+from collections import namedtuple
+from functools import partial
+from typing import TYPE_CHECKING
+
+from maptasker.src.config import AI_PROMPT
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.sysconst import AI_CACHE_FILE, KEYFILE, OPENAI_MODELS, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+AI_CACHE_MAX_ENTRIES = 1000  # Responses kept in the cache file (the most recently used)
+AI_CHARS_PER_TOKEN = 4  # Characters in a token, roughly, to estimate the size of a query
+AI_CONCURRENCY = 4  # Queries sent to the model at once
+AI_REQUEST_TIMEOUT = 300  # Seconds to wait for the model to respond to a query
+
+# Tokens that can be sent to the model in one query, leaving room in its context window
+# for the response.  A bigger object is analyzed in parts.
+AI_TOKEN_BUDGETS = {
+    "gpt-3.5-turbo": 12000,
+    "gpt-4": 6000,
+    "gpt-4-turbo": 96000,
+    "gpt-4o": 96000,
+    "gpt-4o-mini": 96000,
+    "o1-preview": 96000,
+    "o1-mini": 96000,
+}
+AI_LOCAL_TOKEN_BUDGET = 1500  # Local (Ollama) models, which have a small context window by default
+AI_MIN_ROOM_TOKENS = 50  # Fewest tokens of the object that a query must have room for, after the prompt
+
+# An object to be analyzed:
+#  ai_object = "Project", "Profile" or "Task"
+#  name = the object's name
+#  lines = the object's lines (see cleanup_output), or [] if the object could not be mapped
+#  prompt = what to ask, ending with a colon (see get_ai_prompt)
+#  error = why the object could not be mapped
+AiQuery = namedtuple(  # noqa: PYI024
+    "AiQuery",
+    ["ai_object", "name", "lines", "prompt", "error"],
+)
+
+# The analysis of an object:
+#  ai_object, name = as for AiQuery
+#  response = the model's response, or "" if there was an error
+#  error = the error message, or ""
+#  cached = True if the response came from the cache
+AiResult = namedtuple(  # noqa: PYI024
+    "AiResult",
+    ["ai_object", "name", "response", "error", "cached"],
+)
+
+
+# Clean up the output list since it has all the front matter and we only need
+# the object (Project/Profile/Task)
+def cleanup_output(output_lines: list) -> list:
+    """
+    A function that cleans up the output list in prepartion of the query.
+
+    Args:
+        output_lines (list): The Ai output lines of the run (PrimeItems.ai["output_lines"]).
+
+    Returns:
+        list: The cleaned up output list.
+    """
+    # Delete everything up to the Profile.
+    temp_output = []
+    got_it = False
+    for line in output_lines:
+        if "Profile:" in line or "Project:" in line or "Task:" in line:
+            got_it = True
+        if got_it:
+            # Ignore blank lines.
+            if not line:
+                continue
+            # Quit if at end of Project.
+            if "Tasks not in any Profile," in line:
+                break
+            temp_line = line.replace("&nbsp;", " ")
+            temp_output.append(temp_line)
+
+    return temp_output
+
+
+# Get the prompt: what to ask about the object.
+def get_ai_prompt(prompt: str = "") -> str:
+    """
+    Get the prompt, ending with a colon.
+        Args:
+            prompt (str): what to ask, or "" for the runtime argument "ai_prompt" (or AI_PROMPT).
+
+        Returns:
+            str: the prompt.
+    """
+    if not prompt:
+        prompt = PrimeItems.program_arguments.get("ai_prompt") or AI_PROMPT
+    return prompt if prompt.endswith(":") else f"{prompt}:"
+
+
+# Put a query together.
+def make_ai_query(ai_object: str, prompt: str, lines: list, part: str = "") -> str:
+    """
+    Put the query for an object (or a part of it) together.
+        Args:
+            ai_object (str): "Project", "Profile" or "Task"
+            prompt (str): what to ask, ending with a colon (see get_ai_prompt)
+            lines (list): the object's lines (see cleanup_output)
+            part (str): "n of count" if the lines are a part of the object, else "".
+
+        Returns:
+            str: the query.
+    """
+    what = f"part ({part}) of a {ai_object}" if part else ai_object
+    text = "".join(f"{line}\n" for line in lines)
+    return f"Given the following {what} in Tasker, an Android automation tool, {prompt}{text}"
+
+
+# Put the query together.
+def build_ai_query(ai_object: str, output_lines: list, prompt: str = "") -> str:
+    """
+    Put the query for an object together from its Ai output lines.
+        Args:
+            ai_object (str): "Project", "Profile" or "Task"
+            output_lines (list): the Ai output lines of the run that mapped the object
+            prompt (str): what to ask, or "" for the runtime argument "ai_prompt" (or AI_PROMPT).
+
+        Returns:
+            str: the query.
+    """
+    return make_ai_query(ai_object, get_ai_prompt(prompt), cleanup_output(output_lines))
+
+
+# Put the query together to merge the analyses of the parts of an object.
+def make_reduce_query(ai_object: str, prompt: str, findings: list) -> str:
+    """
+    Put the query together to merge the analyses of the parts of an object into one.
+        Args:
+            ai_object (str): "Project", "Profile" or "Task"
+            prompt (str): what the parts were asked, ending with a colon
+            findings (list): the analyses of the parts
+
+        Returns:
+            str: the query.
+    """
+    parts = "".join(f"\nPart {number}:\n{finding}\n" for number, finding in enumerate(findings, 1))
+    return (
+        f"The following are the analyses of {len(findings)} parts of a {ai_object} in Tasker, an Android "
+        f"automation tool, each asked to {prompt[:-1]}.  Merge them into one analysis of the whole "
+        f"{ai_object}, without repeating anything:{parts}"
+    )
+
+
+# Estimate the number of tokens in some text.
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens the model will see in some text.
+        Args:
+            text (str): the text
+
+        Returns:
+            int: the estimated number of tokens
+    """
+    return len(text) // AI_CHARS_PER_TOKEN + 1
+
+
+# Get the number of tokens that can be sent to a model in one query.
+def get_token_budget(ai_model: str) -> int:
+    """
+    Get the number of tokens that can be sent to the model in one query.
+        Args:
+            ai_model (str): the model
+
+        Returns:
+            int: the token budget
+    """
+    return AI_TOKEN_BUDGETS.get(ai_model, AI_LOCAL_TOKEN_BUDGET)
+
+
+# Split an object's lines into chunks of Tasks that fit the budget.
+def split_into_chunks(lines: list, budget: int) -> list:
+    """
+    Split an object's lines into chunks that fit the token budget.  The lines are split
+    at the Project/Profile/Task lines (not their "Properties" lines), and each chunk starts
+    with the Project and Profile lines that its first line is under.  A Task that is too big
+    on its own is split at its lines, and a line that is too big on its own is cut short.
+        Args:
+            lines (list): the object's lines (see cleanup_output)
+            budget (int): tokens of lines allowed in a chunk
+
+        Returns:
+            list: the chunks, each a list of lines.
+    """
+    max_chars = max(budget, 1) * AI_CHARS_PER_TOKEN
+
+    # Split into segments: each starts at a Project/Profile/Task line and has the lines
+    # of the Project/Profile it is under.
+    # The Project/Profile lines are cut down to a quarter of a chunk, so there is always
+    # room for the lines under them.
+    segments = []
+    headings = {"Project:": "", "Profile:": ""}
+    for line in lines:
+        heading, _, rest = line.lstrip().partition(" ")
+        if heading not in ("Project:", "Profile:", "Task:") or rest.startswith("Properties"):
+            heading = ""
+        if heading or not segments:
+            segments.append(([heading_line for heading_line in headings.values() if heading_line], [line]))
+        else:
+            segments[-1][1].append(line)
+        if heading == "Project:":
+            headings = {"Project:": line[: max_chars // 4], "Profile:": ""}
+        elif heading == "Profile:":
+            headings["Profile:"] = line[: max_chars // 4]
+
+    chunks = []
+    chunk_chars = 0
+    for context, segment in segments:
+        segment_chars = sum(len(line) + 1 for line in segment)
+        if chunks and chunk_chars + segment_chars <= max_chars:
+            chunks[-1].extend(segment)
+            chunk_chars += segment_chars
+            continue
+        # Start a new chunk, splitting the segment up if it is too big for one.
+        chunks.append(list(context))
+        chunk_chars = sum(len(line) + 1 for line in context)
+        context_chars = chunk_chars
+        for line in segment:
+            if chunk_chars + len(line) + 1 > max_chars and len(chunks[-1]) > len(context):
+                chunks.append(list(context))
+                chunk_chars = context_chars
+            cut_line = line[: max_chars - chunk_chars - 1]
+            chunks[-1].append(cut_line)
+            chunk_chars += len(cut_line) + 1
+    return chunks
+
+
+# Get the messages to send to the model for a query.
+def get_ai_messages(query: str, ai_model: str) -> list:
+    """
+    Get the messages to send to the model for a query.
+        Args:
+            query (str): the query (see build_ai_query)
+            ai_model (str): the model: one of OPENAI_MODELS, or a local (Ollama) model
+
+        Returns:
+            list: the chat messages.
+    """
+    if ai_model in OPENAI_MODELS:
+        return [{"role": "system", "content": "You are a Tasker programmer"}, {"role": "user", "content": query}]
+
+    # Local model: the prompt goes last, after all of the Project/Profile/Task data.
+    prompt = query.split(":")[0]
+    context = query.replace(prompt[1:], "")
+    return [
+        {
+            "role": "system",
+            "content": f"You are a programmer using Tasker, and Android task management tool. The program code follows, with each line separated by '\n'. {prompt}:{context}",
+        },
+        {"role": "user", "content": context},
+        {"role": "user", "content": prompt},
+    ]
+
+
+# Get the OpenAi api key.
+def get_openai_api_key() -> str:
+    """
+    Get the OpenAi api key: the runtime argument, or the key file if it is "Hidden".
+        Args:
+            None
+
+        Returns:
+            str: the api key
+    """
+    apikey = PrimeItems.program_arguments.get("ai_apikey", "")
+    if apikey == "Hidden" and os.path.isfile(KEYFILE):
+        with open(KEYFILE) as key_file:
+            apikey = key_file.readline().strip()
+    return apikey
+
+
+# Get the cache key of a query.
+def get_cache_key(ai_model: str, messages: list) -> str:
+    """
+    Get the key of a query in the response cache: the model and a hash of the messages.
+        Args:
+            ai_model (str): the model
+            messages (list): the messages sent to the model (see get_ai_messages)
+
+        Returns:
+            str: the cache key
+    """
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()
+    return f"{ai_model}:{digest}"
+
+
+# Read the response cache.
+def read_ai_cache() -> dict:
+    """
+    Read the Ai response cache file.
+        Args:
+            None
+
+        Returns:
+            dict: cache key: response, the most recently used last.  Empty if no valid cache.
+    """
+    try:
+        with open(AI_CACHE_FILE, encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    return cache if isinstance(cache, dict) else {}
+
+
+# Save the response cache.
+def save_ai_cache(cache: dict) -> None:
+    """
+    Save the Ai response cache file, keeping the AI_CACHE_MAX_ENTRIES most recently used.
+        Args:
+            cache (dict): cache key: response, the most recently used last.
+
+        Returns:
+            None
+    """
+    from maptasker.src.getputer import write_if_changed
+
+    keep = dict(list(cache.items())[-AI_CACHE_MAX_ENTRIES:])
+    try:
+        write_if_changed(AI_CACHE_FILE, json.dumps(keep, indent=0).encode())
+    except OSError as e:
+        logger.debug(f"aibatch: unable to save the Ai cache: {e}")
+
+
+# Get a response from the cache.
+def get_cached_response(ai_model: str, messages: list) -> str | None:
+    """
+    Get the cached response to a query.
+        Args:
+            ai_model (str): the model
+            messages (list): the messages sent to the model
+
+        Returns:
+            str | None: the response, or None if it is not in the cache.
+    """
+    return read_ai_cache().get(get_cache_key(ai_model, messages))
+
+
+# Save a response in the cache.
+def cache_response(ai_model: str, messages: list, response: str) -> None:
+    """
+    Save the response to a query in the cache.
+        Args:
+            ai_model (str): the model
+            messages (list): the messages sent to the model
+            response (str): the model's response
+
+        Returns:
+            None
+    """
+    cache = read_ai_cache()
+    key = get_cache_key(ai_model, messages)
+    cache.pop(key, None)  # It goes to the end, as the most recent.
+    cache[key] = response
+    save_ai_cache(cache)
+
+
+# Get the queries for the objects of a backup.
+def get_ai_queries(model: object, items: list, options: dict | None = None, prompt: str = "") -> list:
+    """
+    Map each object on its own, and get the lines to put its query together with.
+        Args:
+            model (Model): the backup, from render.load_model
+            items (list): the objects to analyze: ("Project"/"Profile"/"Task", name) pairs
+            options (dict | None): runtime arguments to map the objects with (see render)
+            prompt (str): what to ask, or "" for AI_PROMPT
+
+        Returns:
+            list: an AiQuery for each item, in the same order.
+    """
+    from maptasker.src.render import RenderError, render_the_map, set_up_run, use_model
+
+    queries = []
+    for ai_object, name in items:
+        with use_run(MapRun()):
+            set_up_run({**(options or {}), f"single_{ai_object.lower()}_name": name}, {}, "backup.xml")
+            PrimeItems.program_arguments["ai_analyze"] = True
+            use_model(model)
+            try:
+                render_the_map()
+            except RenderError as e:
+                queries.append(AiQuery(ai_object, name, [], "", str(e)))
+                continue
+            except SystemExit as e:
+                queries.append(AiQuery(ai_object, name, [], "", f"Mapping failed with error code {e.code}"))
+                continue
+            lines = cleanup_output(PrimeItems.ai["output_lines"])
+            queries.append(AiQuery(ai_object, name, lines, get_ai_prompt(prompt), ""))
+    return queries
+
+
+# Get the response from an OpenAi model.
+async def ask_openai(
+    client: object,
+    ai_model: str,
+    messages: list,
+    stream: Callable[[str], None] | None = None,
+) -> str:
+    """
+    Send the messages to an OpenAi model and get the response.
+        Args:
+            client (AsyncOpenAI): the OpenAi client
+            ai_model (str): the model
+            messages (list): the messages to send
+            stream (Callable | None): if given, called with each chunk of the response as it comes
+
+        Returns:
+            str: the response
+    """
+    chunks = []
+    feed = await client.chat.completions.create(model=ai_model, messages=messages, stream=True)
+    async for chunk in feed:
+        if chunk.choices and (content := chunk.choices[0].delta.content):
+            chunks.append(content)
+            if stream is not None:
+                stream(content)
+    return "".join(chunks)
+
+
+# Get the response from a local (Ollama) model.
+async def ask_ollama(
+    client: object,
+    ai_model: str,
+    messages: list,
+    stream: Callable[[str], None] | None = None,
+) -> str:
+    """
+    Send the messages to a local (Ollama) model and get the response.
+        Args:
+            client (ollama.AsyncClient): the Ollama client
+            ai_model (str): the model
+            messages (list): the messages to send
+            stream (Callable | None): if given, called with each chunk of the response as it comes
+
+        Returns:
+            str: the response
+    """
+    chunks = []
+    async for chunk in await client.chat(ai_model, messages, stream=True):
+        if content := chunk["message"]["content"]:
+            chunks.append(content)
+            if stream is not None:
+                stream(content)
+    return "".join(chunks)
+
+
+class AiBatch:
+    """Sending a batch of queries to a model: the client, the cache and the limits (see analyze_queries)"""
+
+    def __init__(
+        self,
+        client: object,
+        ask: Callable,
+        ai_model: str,
+        budget: int,
+        cache: dict,
+        concurrency: int = AI_CONCURRENCY,
+        requests_per_minute: int = 0,
+    ) -> None:
+        """
+        Start the batch, with nothing sent yet
+        Args:
+            client (object): the OpenAi or Ollama client
+            ask (Callable): ask_openai or ask_ollama
+            ai_model (str): the model
+            budget (int): tokens allowed in a query
+            cache (dict): cache key: response (see read_ai_cache), added to as responses come
+            concurrency (int): most queries to have outstanding at once
+            requests_per_minute (int): most queries to send in a minute, or 0 for no limit
+        Returns:
+            None
+        """
+        self.client = client
+        self.ask = ask
+        self.ai_model = ai_model
+        self.budget = budget
+        self.cache = cache
+        self.used_keys = {}  # Cache keys of the responses we got, in the order we got them
+        self.sending = {}  # Cache key: the task getting its response
+        self.semaphore = asyncio.Semaphore(max(concurrency, 1))
+        self.interval = 60 / requests_per_minute if requests_per_minute else 0
+        self.next_start = 0.0
+        self.start_lock = asyncio.Lock()
+
+    async def wait_to_start(self) -> None:
+        """
+        Wait until we may send the next query, if there is a limit to the requests per minute.
+        Args:
+            None
+        Returns:
+            None
+        """
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        async with self.start_lock:
+            await asyncio.sleep(max(self.next_start - loop.time(), 0))
+            self.next_start = loop.time() + self.interval
+
+    async def send(self, messages: list, stream_to: Callable[[str], None] | None) -> tuple:
+        """
+        Send the messages to the model.
+        Args:
+            messages (list): the messages (see get_ai_messages)
+            stream_to (Callable | None): if given, called with each chunk of the response
+        Returns:
+            tuple: (response, error, cached)
+        """
+        async with self.semaphore:
+            await self.wait_to_start()
+            try:
+                response = await asyncio.wait_for(
+                    self.ask(self.client, self.ai_model, messages, stream_to),
+                    AI_REQUEST_TIMEOUT,
+                )
+            except TimeoutError:
+                return "", f"Ai analysis error: no response in {AI_REQUEST_TIMEOUT} seconds", False
+            except Exception as e:  # noqa: BLE001
+                logger.debug(f"aibatch: {self.ai_model} failed: {e}")
+                return "", f"Ai analysis error: {e}", False
+        return response, "", False
+
+    async def analyze(self, query: str, stream_to: Callable[[str], None] | None = None) -> tuple:
+        """
+        Get the response to one query, from the cache if we have it.  The same messages
+        are only sent once: only the query that sends them gets the response chunk by chunk,
+        the others get it all at once.
+        Args:
+            query (str): the query
+            stream_to (Callable | None): if given, called with each chunk of the response
+        Returns:
+            tuple: (response, error, cached)
+        """
+        messages = get_ai_messages(query, self.ai_model)
+        key = get_cache_key(self.ai_model, messages)
+        if key in self.cache:
+            self.used_keys[key] = True
+            if stream_to is not None:
+                stream_to(self.cache[key])
+            return self.cache[key], "", True
+        streamed = key not in self.sending
+        if streamed:
+            self.sending[key] = asyncio.ensure_future(self.send(messages, stream_to))
+        response, error, cached = await self.sending[key]
+        if not error:
+            self.cache[key] = response
+            self.used_keys[key] = True
+            if stream_to is not None and not streamed:
+                stream_to(response)
+        return response, error, cached
+
+    async def analyze_all(self, queries: list) -> tuple:
+        """
+        Get the responses to several queries at once.
+        Args:
+            queries (list): the queries
+        Returns:
+            tuple: (responses, the first error or "", True if all came from the cache)
+        """
+        results = await asyncio.gather(*(self.analyze(query) for query in queries))
+        responses = [response for response, _, _ in results]
+        errors = [error for _, error, _ in results if error]
+        return responses, errors[0] if errors else "", all(cached for _, _, cached in results)
+
+    def message_tokens(self, query: str) -> int:
+        """
+        Estimate the tokens the model is sent for a query (a local model gets some of it twice).
+        Args:
+            query (str): the query
+        Returns:
+            int: the estimated tokens
+        """
+        return sum(estimate_tokens(message["content"]) for message in get_ai_messages(query, self.ai_model))
+
+    def room_for(self, make_query: Callable[[str], str]) -> int:
+        """
+        Get the tokens of text that can go in a query and still fit the budget.
+        Args:
+            make_query (Callable): puts the query together around the text
+        Returns:
+            int: the tokens of text, 0 or less if the rest of the query doesn't leave any room.
+        """
+        empty = self.message_tokens(make_query(""))
+        sample = "x" * 4000
+        per_token = (self.message_tokens(make_query(sample)) - empty) / estimate_tokens(sample)
+        return int((self.budget - empty) / per_token)
+
+    def too_long(self) -> tuple:
+        """
+        The error for a prompt that leaves too little room for the object in a query.
+        Args:
+            None
+        Returns:
+            tuple: (response, error, cached)
+        """
+        return "", f"Ai analysis error: the prompt is too long for {self.ai_model}", False
+
+    async def merge(self, query: AiQuery, findings: list, cached: bool, stream_to: Callable | None) -> tuple:
+        """
+        Merge the analyses of the parts of an object into one, a few at a time if they are
+        too big to merge all at once.
+        Args:
+            query (AiQuery): the object
+            findings (list): the analyses of its parts
+            cached (bool): True if the analyses came from the cache
+            stream_to (Callable | None): if given, called with each chunk of the merged analysis
+        Returns:
+            tuple: (response, error, cached)
+        """
+        while len(findings) > 1:
+            merge_query = make_reduce_query(query.ai_object, query.prompt, findings)
+            if self.message_tokens(merge_query) <= self.budget:
+                response, error, merge_cached = await self.analyze(merge_query, stream_to)
+                return response, error, cached and merge_cached
+            # Each analysis is cut down to what there is room for with one other, so at least
+            # two are merged each time.
+            room = self.room_for(lambda text: make_reduce_query(query.ai_object, query.prompt, [text, text]))
+            if room < AI_MIN_ROOM_TOKENS:
+                return self.too_long()
+            groups = [[]]
+            for finding in findings:
+                cut_finding = finding[: room * AI_CHARS_PER_TOKEN]
+                if groups[-1] and self.message_tokens(
+                    make_reduce_query(query.ai_object, query.prompt, [*groups[-1], cut_finding]),
+                ) > self.budget:
+                    groups.append([])
+                groups[-1].append(cut_finding)
+            if len(groups) >= len(findings):
+                error = f"Ai analysis error: the analyses of the parts are too big to merge for {self.ai_model}"
+                return "", error, False
+            responses, error, merge_cached = await self.analyze_all(
+                [make_reduce_query(query.ai_object, query.prompt, group) for group in groups if len(group) > 1],
+            )
+            if error:
+                return "", error, False
+            cached = cached and merge_cached
+            merged = iter(responses)
+            findings = [next(merged) if len(group) > 1 else group[0] for group in groups]
+        if stream_to is not None:
+            stream_to(findings[0])
+        return findings[0], "", cached
+
+    async def analyze_object(self, query: AiQuery, stream_to: Callable[[str], None] | None = None) -> tuple:
+        """
+        Analyze an object, in parts if it is too big for one query.
+        Args:
+            query (AiQuery): the object
+            stream_to (Callable | None): if given, called with each chunk of the analysis
+        Returns:
+            tuple: (response, error, cached)
+        """
+        whole_query = make_ai_query(query.ai_object, query.prompt, query.lines)
+        if self.message_tokens(whole_query) <= self.budget:
+            return await self.analyze(whole_query, stream_to)
+
+        room = self.room_for(lambda text: make_ai_query(query.ai_object, query.prompt, [text], "999 of 999"))
+        if room < AI_MIN_ROOM_TOKENS:
+            return self.too_long()
+        chunks = split_into_chunks(query.lines, room)
+        logger.debug(f"aibatch: {query.ai_object} {query.name} is analyzed in {len(chunks)} parts")
+        findings, error, cached = await self.analyze_all(
+            [
+                make_ai_query(query.ai_object, query.prompt, chunk, f"{number} of {len(chunks)}")
+                for number, chunk in enumerate(chunks, 1)
+            ],
+        )
+        if error:
+            return "", error, False
+        return await self.merge(query, findings, cached, stream_to)
+
+
+# Get the client of the model and the function to ask it with.
+def get_ai_client(ai_model: str, api_key: str = "", base_url: str = "") -> tuple:
+    """
+    Get the client to send queries to the model with.
+        Args:
+            ai_model (str): the model: one of OPENAI_MODELS, or a local (Ollama) model
+            api_key (str): OpenAi api key, or "" for the one in the settings
+            base_url (str): url of the OpenAi api or Ollama server, or "" for the default
+
+        Returns:
+            tuple: (the client, ask_openai or ask_ollama)
+    """
+    if ai_model in OPENAI_MODELS:
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(api_key=api_key or get_openai_api_key() or None, base_url=base_url or None), ask_openai
+
+    import ollama
+
+    return ollama.AsyncClient(host=base_url or None), ask_ollama
+
+
+# Send the queries to the model, several at a time.
+async def analyze_queries(
+    queries: list,
+    ai_model: str,
+    concurrency: int = AI_CONCURRENCY,
+    requests_per_minute: int = 0,
+    api_key: str = "",
+    base_url: str = "",
+    use_cache: bool = True,
+    token_budget: int = 0,
+    stream: Callable[[int, str], None] | None = None,
+) -> list:
+    """
+    Send the queries to the model, at most concurrency at a time, and get the responses.
+    Queries that are in the cache (or are the same as another) are not sent.
+
+    An object too big for one query (see get_token_budget) is split into parts (see
+    split_into_chunks), which are analyzed at the same time.  The analyses of the parts
+    are then merged into one by the model, a few at a time if they are too big to merge
+    all at once.  The analyses of the parts and the merges are cached too.  If the prompt
+    leaves too little room in a query for the object, the object is not analyzed.
+
+    If stream is given, the response for each query (but not those for its parts) is passed
+    to it as it comes, chunk by chunk.  A response from the cache comes in one chunk.
+        Args:
+            queries (list): AiQuery's (see get_ai_queries)
+            ai_model (str): the model: one of OPENAI_MODELS, or a local (Ollama) model
+            concurrency (int): most queries to have outstanding at once
+            requests_per_minute (int): most queries to send in a minute, or 0 for no limit
+            api_key (str): OpenAi api key, or "" for the one in the settings
+            base_url (str): url of the OpenAi api or Ollama server, or "" for the default
+            use_cache (bool): False to send all of the queries, and not save the responses
+            token_budget (int): tokens allowed in a query, or 0 for the model's budget
+            stream (Callable | None): if given, called with the index of a query and each chunk
+                of its response.  It is called from the event loop, so it must not block.
+
+        Returns:
+            list: an AiResult for each query, in the same order.
+    """
+    client, ask = get_ai_client(ai_model, api_key, base_url)
+    cache = read_ai_cache() if use_cache else {}
+    batch = AiBatch(
+        client,
+        ask,
+        ai_model,
+        token_budget or get_token_budget(ai_model),
+        cache,
+        concurrency,
+        requests_per_minute,
+    )
+    try:
+        analyses = await asyncio.gather(
+            *(
+                batch.analyze_object(query, None if stream is None else partial(stream, index))
+                for index, query in enumerate(queries)
+                if query.lines
+            ),
+        )
+    finally:
+        with contextlib.suppress(Exception):
+            await client.close()
+
+    analysis = iter(analyses)
+    results = [
+        AiResult(query.ai_object, query.name, *next(analysis))
+        if query.lines
+        else AiResult(query.ai_object, query.name, "", query.error or "Nothing to analyze.", False)
+        for query in queries
+    ]
+
+    if use_cache:
+        # Those used this time are the most recent.
+        for key in batch.used_keys:
+            cache[key] = cache.pop(key)
+        save_ai_cache(cache)
+    return results
+
+
+# Analyze many Projects/Profiles/Tasks of a backup at once.
+def analyze_backup(
+    backup: bytes | object,
+    items: list,
+    ai_model: str,
+    options: dict | None = None,
+    prompt: str = "",
+    concurrency: int = AI_CONCURRENCY,
+    requests_per_minute: int = 0,
+    api_key: str = "",
+    base_url: str = "",
+    use_cache: bool = True,
+    token_budget: int = 0,
+    stream: Callable[[int, str], None] | None = None,
+) -> list:
+    """
+    Analyze many Projects/Profiles/Tasks of a backup at once.
+        Args:
+            backup (bytes | Model): the backup xml, or the backup loaded by render.load_model
+            items (list): the objects to analyze: ("Project"/"Profile"/"Task", name) pairs
+            ai_model (str): the model: one of OPENAI_MODELS, or a local (Ollama) model
+            options (dict | None): runtime arguments to map the objects with (see render)
+            prompt (str): what to ask, or "" for AI_PROMPT
+            concurrency (int): most queries to have outstanding at once
+            requests_per_minute (int): most queries to send in a minute, or 0 for no limit
+            api_key (str): OpenAi api key, or "" for the one in the settings
+            base_url (str): url of the OpenAi api or Ollama server, or "" for the default
+            use_cache (bool): False to send all of the queries, and not save the responses
+            token_budget (int): tokens allowed in a query, or 0 for the model's budget
+            stream (Callable | None): if given, called with the index of an item and each chunk
+                of its response as it comes (see analyze_queries)
+
+        Returns:
+            list: an AiResult for each item, in the same order.
+
+        Raises:
+            RenderError: if the backup is not valid.
+    """
+    from maptasker.src.render import load_model
+
+    model = load_model(backup) if isinstance(backup, bytes) else backup
+    queries = get_ai_queries(model, items, options, prompt)
+    return asyncio.run(
+        analyze_queries(
+            queries,
+            ai_model,
+            concurrency,
+            requests_per_minute,
+            api_key,
+            base_url,
+            use_cache,
+            token_budget,
+            stream,
+        ),
+    )
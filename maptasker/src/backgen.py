@@ -0,0 +1,345 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# backgen: generate a synthetic Tasker backup xml, at any scale                        #
+#                                                                                      #
+#          The backup has the Projects, Profiles, Tasks, Actions, Scenes and global    #
+#          variables asked for (see BackupSpec), with real action/condition codes     #
+#          from actionc.py, Perform Task calls between the Tasks and some names with   #
+#          unicode characters and icons.  The same BackupSpec always gives the same    #
+#          backup, so maps (and timings) of it can be compared from run to run.       #
+#                                                                                      #
+#          PRODUCTION_SPEC is about the size of a big real backup.  scale_spec(10) and #
+#          scale_spec(100) are ten and a hundred times that.                          #
+#                                                                                      #
+#          Example:                                                                    #
+#              from maptasker.src.backgen import make_backup, scale_spec               #
+#              backup_bytes = make_backup(scale_spec(10))                              #
+#                                                                                      #
+#          Or, from the command line:                                                  #
+#              python -m maptasker.src.backgen --scale 10 backup.xml                   #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import argparse
+import random
+from collections import namedtuple
+from typing import TYPE_CHECKING
+from xml.sax.saxutils import escape, quoteattr
+
+from maptasker.src.actionc import action_codes
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+# What to put in the backup:
+#  projects, profiles, tasks, scenes, variables = how many of each
+#  actions = Actions in each Task
+#  perform_task = fraction of the Actions that are Perform Task calls of another Task
+#  unicode_names = fraction of the names with unicode characters (and of the Tasks with an icon)
+#  unnamed_tasks = fraction of the Profiles whose entry Task has no name
+#  seed = seed for the random choices: the same spec always gives the same backup
+BackupSpec = namedtuple(  # noqa: PYI024
+    "BackupSpec",
+    ["projects", "profiles", "tasks", "actions", "scenes", "variables", "perform_task", "unicode_names",
+     "unnamed_tasks", "seed"],
+    defaults=(0.1, 0.1, 0.25, 1),
+)  # fmt: skip
+
+# About the size of a big real backup.
+PRODUCTION_SPEC = BackupSpec(projects=10, profiles=100, tasks=300, actions=12, scenes=10, variables=50)
+
+# Types of the arguments we know how to make.  Codes with other arguments (plugin Bundles) are not used.
+ARGUMENT_TYPES = ("Str", "Int", "Img", "App", "ConditionList")
+SCENE_ELEMENTS = ("ButtonElement", "TextElement", "RectElement", "CheckBoxElement", "EditTextElement")
+CREATED = 1700000000000  # cdate/edate of everything (milliseconds)
+UNICODE_WORDS = ("Café", "Ñandú", "Größe", "Šnek", "日本語", "Задача", "Ελλάδα", "☕", "🏠", "📱", "✅", "🔋")
+WORDS = ("Home", "Work", "Battery", "Night", "Wifi", "Alarm", "Music", "Car", "Backup", "Clock", "Notify", "Sync")
+ICONS = ("mw_action_home", "mw_device_battery_full", "mw_av_play_arrow", "mw_notification_sync", "cust_notification")
+APPS = (
+    ("com.android.chrome", "com.google.android.apps.chrome.Main", "Chrome"),
+    ("com.spotify.music", "com.spotify.music.MainActivity", "Spotify"),
+    ("net.dinglisch.android.taskerm", "net.dinglisch.android.taskerm.Tasker", "Tasker"),
+)
+
+
+# Scale the production spec.
+def scale_spec(factor: float, spec: BackupSpec = PRODUCTION_SPEC) -> BackupSpec:
+    """
+    Scale a backup spec: factor times as many of everything, with the same number of
+    Actions in each Task.
+        Args:
+            factor (float): e.g. 1, 10 or 100
+            spec (BackupSpec): the spec to scale
+
+        Returns:
+            BackupSpec: the scaled spec.
+    """
+    return spec._replace(
+        **{
+            field: max(round(getattr(spec, field) * factor), 1)
+            for field in ("projects", "profiles", "tasks", "scenes", "variables")
+        },
+    )
+
+
+# Get the codes that we can make an Action/condition for.
+def get_usable_codes(code_type: str) -> list:
+    """
+    Get the action_codes keys of a type that we can make, in a fixed order.
+        Args:
+            code_type (str): "t" (Task Action), "e" (Event) or "s" (State)
+
+        Returns:
+            list: the codes, e.g. ["100t", "101t"...]
+    """
+    return sorted(
+        code
+        for code, action_code in action_codes.items()
+        if code[:-1].isdigit()
+        and code.endswith(code_type)
+        and not action_code.redirect  # Plugins, which take a Bundle
+        and isinstance(action_code.args, list)
+        and len(action_code.args) == len(action_code.types)
+        and set(action_code.types) <= set(ARGUMENT_TYPES)
+        and code not in ("37t", "38t", "130t")  # Made on purpose: If, End If and Perform Task
+    )
+
+
+class BackupMaker:
+    """Make the xml of a synthetic backup, piece by piece"""
+
+    def __init__(self, spec: BackupSpec) -> None:
+        """
+        Make the names of the Tasks/Scenes and share out the Tasks among the Profiles.
+            Args:
+                spec (BackupSpec): what to put in the backup
+        """
+        self.spec = spec
+        self.random = random.Random(spec.seed)  # noqa: S311
+        self.task_codes = get_usable_codes("t")
+        self.condition_codes = [*get_usable_codes("e"), *get_usable_codes("s")]
+        self.variables = [f"%Synth{number}" for number in range(spec.variables)]
+        # Tasks are numbered 1...tasks, and Profiles after them.
+        self.task_names = {task_id: self._make_name("Task", task_id) for task_id in range(1, spec.tasks + 1)}
+        # The entry Task of each Profile (some of which have no name), and the Tasks of each Project.
+        self.entry_tasks = {}
+        for number in range(spec.profiles):
+            task_id = number % spec.tasks + 1
+            self.entry_tasks[spec.tasks + number + 1] = task_id
+            if self.random.random() < spec.unnamed_tasks:
+                self.task_names[task_id] = ""
+        self.named_tasks = [task_id for task_id, name in self.task_names.items() if name]
+        self.scene_names = [self._make_name("Scene", number) for number in range(1, spec.scenes + 1)]
+
+    # Make a name, with unicode characters now and then.
+    def _make_name(self, kind: str, number: int) -> str:
+        word = self.random.choice(WORDS)
+        if self.random.random() < self.spec.unicode_names:
+            return f"{self.random.choice(UNICODE_WORDS)} {word} {kind} {number}"
+        return f"{word} {kind} {number}"
+
+    # Make a value for a Str argument.
+    def _make_string(self) -> str:
+        choice = self.random.random()
+        if choice < 0.3 and self.variables:
+            return self.random.choice(self.variables)
+        if choice < 0.5:
+            return ""
+        return f"{self.random.choice(WORDS).lower()} {self.random.randrange(1000)}"
+
+    # Make the xml for an argument.
+    def _make_argument(self, arg: str, arg_type: str) -> str:
+        match arg_type:
+            case "Int":
+                return f'<Int sr="arg{arg}" val="{self.random.choice((0, 0, 1))}"/>'
+            case "Str":
+                value = self._make_string()
+                return f'<Str sr="arg{arg}" ve="3">{escape(value)}</Str>' if value else f'<Str sr="arg{arg}" ve="3"/>'
+            case "Img":
+                return f'<Img sr="arg{arg}" ve="2"><nme>{self.random.choice(ICONS)}</nme></Img>'
+            case "App":
+                package, app_class, label = self.random.choice(APPS)
+                return (
+                    f'<App sr="arg{arg}"><appClass>{app_class}</appClass><appPkg>{package}</appPkg>'
+                    f"<label>{label}</label></App>"
+                )
+        return ""  # ConditionList: left out, as Tasker does when there is no condition.
+
+    # Make the xml for the arguments of a code.
+    def _make_arguments(self, code: str) -> str:
+        action_code = action_codes[code]
+        arguments = "".join(
+            self._make_argument(arg, arg_type)
+            for arg, arg_type in zip(action_code.args, action_code.types, strict=True)
+        )
+        # The value of an argument evaluated as "Label" (e.g. Anchor) is the Action's label.
+        if "Label" in action_code.evalargs:
+            arguments += f"<label>{self.random.choice(WORDS).lower()} {self.random.randrange(1000)}</label>"
+        return arguments
+
+    # Make a condition: variable op value.
+    def _make_condition(self) -> str:
+        variable = self.random.choice(self.variables) if self.variables else "%synth"
+        return (
+            f'<ConditionList sr="if"><Condition sr="c0" ve="3"><lhs>{variable}</lhs>'
+            f"<op>{self.random.choice((0, 2, 3))}</op><rhs>{self.random.randrange(10)}</rhs></Condition></ConditionList>"
+        )
+
+    # Make a Task's Actions.
+    def _make_actions(self, task_id: int) -> Iterator[str]:
+        open_ifs = 0
+        for number in range(self.spec.actions):
+            choice = self.random.random()
+            if choice < self.spec.perform_task and len(self.named_tasks) > 1:
+                # Perform Task of another Task, with a priority and a parameter.
+                target = task_id
+                while target == task_id:
+                    target = self.random.choice(self.named_tasks)
+                body = (
+                    f'<code>130</code><Str sr="arg0" ve="3">{escape(self.task_names[target])}</Str>'
+                    f'{self._make_argument("1", "Int")}{self._make_argument("2", "Str")}'
+                )
+            elif choice < self.spec.perform_task + 0.05 and number < self.spec.actions - 1:
+                body = f"<code>37</code>{self._make_condition()}"
+                open_ifs += 1
+            elif choice < self.spec.perform_task + 0.1 and open_ifs:
+                body = "<code>38</code>"
+                open_ifs -= 1
+            else:
+                code = self.random.choice(self.task_codes)
+                body = f"<code>{code[:-1]}</code>{self._make_arguments(code)}"
+            yield f'\t\t<Action sr="act{number}" ve="7">{body}</Action>\n'
+
+    # Make the Profiles.
+    def _make_profiles(self) -> Iterator[str]:
+        for profile_id, task_id in self.entry_tasks.items():
+            code = self.random.choice(self.condition_codes)
+            tag, priority = ("Event", "<pri>0</pri>") if code.endswith("e") else ("State", "")
+            condition = f'<{tag} sr="con0" ve="2"><code>{code[:-1]}</code>{priority}{self._make_arguments(code)}</{tag}>'
+            yield (
+                f'\t<Profile sr="prof{profile_id}" ve="2">\n'
+                f"\t\t<cdate>{CREATED}</cdate><edate>{CREATED}</edate><flags>8</flags><id>{profile_id}</id>"
+                f"<mid0>{task_id}</mid0><nme>{escape(self._make_name('Profile', profile_id))}</nme>\n"
+                f"\t\t{condition}\n"
+                "\t</Profile>\n"
+            )
+
+    # Make the Projects, with the Profiles, Tasks and Scenes shared out among them.
+    def _make_projects(self) -> Iterator[str]:
+        projects = self.spec.projects
+        profile_ids = list(self.entry_tasks)
+        for number in range(projects):
+            pids = profile_ids[number::projects]
+            # The Profiles' entry Tasks, then the Project's share of the other Tasks.
+            tids = dict.fromkeys(self.entry_tasks[profile_id] for profile_id in pids)
+            tids.update(dict.fromkeys(range(number + 1, self.spec.tasks + 1, projects)))
+            scenes = self.scene_names[number::projects]
+            scene_list = f"<scenes>{escape(','.join(scenes))}</scenes>" if scenes else ""
+            yield (
+                f'\t<Project sr="proj{number}" ve="2">\n'
+                f"\t\t<cdate>{CREATED}</cdate><name>{escape(self._make_name('Project', number + 1))}</name>"
+                f"<pids>{','.join(map(str, pids))}</pids>"
+                f"{scene_list}<tids>{','.join(map(str, tids))}</tids>\n"
+                "\t</Project>\n"
+            )
+
+    # Make the Scenes, with elements that run Tasks.
+    def _make_scenes(self) -> Iterator[str]:
+        for name in self.scene_names:
+            elements = []
+            for number in range(self.random.randint(1, 4)):
+                element = self.random.choice(SCENE_ELEMENTS)
+                click = f"<clickTask>{self.random.choice(self.named_tasks)}</clickTask>" if self.named_tasks else ""
+                elements.append(
+                    f'<{element} sr="elements{number}" veis="1"><flags>4</flags>'
+                    f"<geom>{10 * number},{40 * number},200,40,{10 * number},{40 * number},200,40</geom>"
+                    f"{self._make_arguments(element)}{click}</{element}>",
+                )
+            yield (
+                f"\t<Scene sr={quoteattr('scene' + name)}>\n"
+                f"\t\t<cdate>{CREATED}</cdate><edate>{CREATED}</edate><heightLand>-1</heightLand>"
+                f"<heightPort>800</heightPort><nme>{escape(name)}</nme><widthLand>-1</widthLand>"
+                f"<widthPort>400</widthPort>\n"
+                f"\t\t{''.join(elements)}\n"
+                "\t</Scene>\n"
+            )
+
+    # Make the Tasks.
+    def _make_tasks(self) -> Iterator[str]:
+        for task_id, name in self.task_names.items():
+            name_element = f"<nme>{escape(name)}</nme>" if name else ""
+            yield (
+                f'\t<Task sr="task{task_id}">\n'
+                f"\t\t<cdate>{CREATED}</cdate><edate>{CREATED}</edate><id>{task_id}</id>{name_element}<pri>100</pri>"
+            )
+            if self.random.random() < self.spec.unicode_names:
+                yield f'<Img sr="icn" ve="2"><nme>{self.random.choice(ICONS)}</nme></Img>'
+            yield "\n"
+            yield from self._make_actions(task_id)
+            yield "\t</Task>\n"
+
+    # Make the global variables.
+    def _make_variables(self) -> Iterator[str]:
+        for number, variable in enumerate(self.variables):
+            yield f'\t<Variable sr="v{number}"><n>{variable}</n><v>{self._make_string() or "x"}</v></Variable>\n'
+
+    # Make the whole backup.
+    def make(self) -> Iterator[str]:
+        """
+        Make the xml of the backup, a piece at a time.
+            Args:
+                None
+
+            Returns:
+                Iterator[str]: the pieces of the xml, in order.
+        """
+        yield '<TaskerData sr="" dvi="1" tv="6.4.0-beta">\n'
+        yield from self._make_profiles()
+        yield from self._make_projects()
+        yield from self._make_scenes()
+        yield from self._make_tasks()
+        yield from self._make_variables()
+        yield "</TaskerData>\n"
+
+
+# Make the xml of a synthetic backup.
+def make_backup(spec: BackupSpec = PRODUCTION_SPEC) -> bytes:
+    """
+    Make a synthetic Tasker backup.
+        Args:
+            spec (BackupSpec): what to put in it
+
+        Returns:
+            bytes: the backup xml.
+    """
+    return "".join(BackupMaker(spec).make()).encode("utf-8")
+
+
+# Write a synthetic backup to a file.
+def write_backup(file_name: str, spec: BackupSpec = PRODUCTION_SPEC) -> int:
+    """
+    Write a synthetic Tasker backup to a file, a piece at a time (a big one need not fit in memory).
+        Args:
+            file_name (str): the file to write
+            spec (BackupSpec): what to put in it
+
+        Returns:
+            int: the size of the file, in bytes.
+    """
+    size = 0
+    with open(file_name, "wb") as backup_file:
+        for piece in BackupMaker(spec).make():
+            size += backup_file.write(piece.encode("utf-8"))
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Tasker backup.")
+    parser.add_argument("file", help="the backup file to write")
+    parser.add_argument("--scale", type=float, default=1, help="times the size of a big real backup (default 1)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the random choices (default 1)")
+    arguments = parser.parse_args()
+    the_spec = scale_spec(arguments.scale)._replace(seed=arguments.seed)
+    print(f"{arguments.file}: {write_backup(arguments.file, the_spec):,} bytes, {the_spec}")
@@ -0,0 +1,384 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# benchmk: time (and measure the memory of) each phase of mapping a backup             #
+#                                                                                      #
+#          Each phase (see PHASES) is timed on its own, on synthetic backups of the    #
+#          scales asked for (see backgen.py): reading the xml, decoding the Actions,   #
+#          rendering the map into the output queue, writing MapTasker.html, the        #
+#          outline, the diagram, parsing the html into the GUI's map view and the      #
+#          directory.  What a phase needs (e.g. the rendered map, to write it out) is  #
+#          done before it is timed.  The best of 'repeat' runs is kept, and the peak   #
+#          memory of a phase is measured in a run of its own (tracemalloc slows it).  #
+#                                                                                      #
+#          The results can be saved as json and compared with those of an earlier     #
+#          run, to catch phases that have become slower.                               #
+#                                                                                      #
+#          Example:                                                                    #
+#              python -m maptasker.src.benchmk --scale 1 --scale 10 --output new.json  #
+#                  --baseline old.json --threshold 0.25                                #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from pathlib import Path
+
+from maptasker.src.backgen import scale_spec, write_backup
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.sysconst import MY_VERSION
+
+BACKUP_FILE = "backup.xml"
+HTML_FILE = "/MapTasker.html"
+BENCHMARK_OPTIONS = {"display_detail_level": 3, "directory": True}  # What the phases map
+DEFAULT_THRESHOLD = 0.25  # A phase that takes 25% longer than its baseline has regressed
+NOISE_SECONDS = 0.01  # ... and is at least this much slower, so that tiny phases don't flap
+
+# A phase of mapping a backup:
+#  name = the phase's name, in the results
+#  prepare = function(model, backup_file) that gets the run ready for the phase, and returns what run needs
+#  run = function(prepared) that does the phase (this is what is timed)
+Phase = namedtuple("Phase", ["name", "prepare", "run"])  # noqa: PYI024
+
+# A phase that has become slower than its baseline:
+#  scale = the backup scale
+#  phase = the phase's name
+#  seconds = how long it takes now
+#  baseline_seconds = how long it took in the baseline
+Regression = namedtuple("Regression", ["scale", "phase", "seconds", "baseline_seconds"])  # noqa: PYI024
+
+
+# Set up a run to map the model, optionally rendering the map into the output queue.
+def start_the_map(model: object, render: bool = True) -> None:
+    """
+    Set up the current run with the benchmark options and the model.
+        Args:
+            model (render.Model): the loaded backup
+            render (bool): also render the map into the output queue
+
+        Returns:
+            None
+    """
+    from maptasker.src.render import render_the_map, set_up_run, use_model
+
+    set_up_run(BENCHMARK_OPTIONS, {}, BACKUP_FILE)
+    use_model(model)
+    if render:
+        render_the_map()
+
+
+# Ingest: read and parse the backup xml into its Projects/Profiles/Tasks/Scenes.
+def prepare_ingest(model: object, backup_file: str) -> object:  # noqa: ARG001
+    """Set up a run to read the backup file, making sure the backup kept from a previous run isn't reused."""
+    from maptasker.src.render import set_up_run
+    from maptasker.src.taskerd import forget_the_model
+
+    set_up_run(BENCHMARK_OPTIONS, {}, BACKUP_FILE)
+    forget_the_model()
+    PrimeItems.file_to_get = Path(backup_file)
+    return None
+
+
+def run_ingest(_: object) -> None:
+    """Read the backup file."""
+    from maptasker.src.taskerd import get_the_xml_data
+
+    if get_the_xml_data() != 0:
+        error = f"benchmk: the backup could not be read: {PrimeItems.error_msg}"
+        raise RuntimeError(error)
+
+
+# Actions: decode every Action of every Task.
+def prepare_actions(model: object, backup_file: str) -> list:  # noqa: ARG001
+    """Get the xml of every Task."""
+    start_the_map(model, render=False)
+    return [task["xml"] for task in PrimeItems.tasker_root_elements["all_tasks"].values()]
+
+
+def run_actions(tasks: list) -> None:
+    """Decode the Actions of the Tasks."""
+    from maptasker.src.tasks import get_actions
+
+    for task in tasks:
+        get_actions(task)
+
+
+# Output: render the map into the output queue (see lineout.py).
+def prepare_output(model: object, backup_file: str) -> None:  # noqa: ARG001
+    """Set up a run to render the model."""
+    start_the_map(model, render=False)
+
+
+def run_output(_: object) -> None:
+    """Render the map."""
+    from maptasker.src.render import render_the_map
+
+    render_the_map()
+
+
+# Write: write the rendered map out as MapTasker.html (without the directory, its own phase).
+def prepare_write(model: object, backup_file: str) -> str:  # noqa: ARG001
+    """Render the map, without the directory."""
+    start_the_map(model)
+    PrimeItems.program_arguments["directory"] = False
+    return str(Path.cwd())
+
+
+def run_write(output_dir: str) -> None:
+    """Write out the map."""
+    from maptasker.src.mapit import write_out_the_file
+
+    write_out_the_file(output_dir, HTML_FILE)
+
+
+# Outline: lay out the network of Projects/Profiles/Tasks/Scenes.
+def prepare_outline(model: object, backup_file: str) -> dict:  # noqa: ARG001
+    """Render the map (the outline is done after it)."""
+    start_the_map(model)
+    return {}
+
+
+def run_outline(network: dict) -> None:
+    """Outline the configuration."""
+    from maptasker.src.outline import do_the_outline
+
+    do_the_outline(network)
+
+
+# Diagram: draw the outlined network as text (MapTasker_map.txt).
+def prepare_diagram(model: object, backup_file: str) -> dict:
+    """Render the map and outline it."""
+    network = prepare_outline(model, backup_file)
+    run_outline(network)
+    return network
+
+
+def run_diagram(network: dict) -> None:
+    """Draw the diagram."""
+    from maptasker.src.diagram import network_map
+
+    network_map(network)
+
+
+# Parse: parse MapTasker.html into the GUI's map view (see guimap.py).
+def prepare_parse(model: object, backup_file: str) -> None:
+    """Write out the map, for it to be parsed."""
+    run_write(prepare_write(model, backup_file))
+
+
+def run_parse(_: object) -> None:
+    """Parse the map."""
+    from maptasker.src.guimap import parse_html
+
+    parse_html()
+
+
+# Directory: the directory of the map, from what was collected while rendering it.
+def prepare_directory(model: object, backup_file: str) -> None:  # noqa: ARG001
+    """Render the map, and start a new output queue for the directory."""
+    start_the_map(model)
+    PrimeItems.output_lines.output_lines = []
+
+
+def run_directory(_: object) -> None:
+    """Output the directory."""
+    from maptasker.src.dirout import output_directory
+
+    output_directory()
+
+
+PHASES = (
+    Phase("ingest", prepare_ingest, run_ingest),
+    Phase("actions", prepare_actions, run_actions),
+    Phase("output", prepare_output, run_output),
+    Phase("write", prepare_write, run_write),
+    Phase("outline", prepare_outline, run_outline),
+    Phase("diagram", prepare_diagram, run_diagram),
+    Phase("parse", prepare_parse, run_parse),
+    Phase("directory", prepare_directory, run_directory),
+)
+PHASE_NAMES = tuple(phase.name for phase in PHASES)
+
+
+# Time a phase: the best of several runs, and the peak memory of another run.
+def time_phase(phase: Phase, model: object, backup_file: str, repeat: int) -> dict:
+    """
+    Time a phase, each run in a fresh MapRun.
+        Args:
+            phase (Phase): the phase
+            model (render.Model): the loaded backup
+            backup_file (str): the backup's file (for the ingest)
+            repeat (int): how many times to time it
+
+        Returns:
+            dict: "seconds" and "cpu_seconds" (the best of the runs) and "peak_bytes".
+    """
+    seconds = []
+    cpu_seconds = []
+    for _ in range(repeat):
+        with use_run(MapRun()):
+            prepared = phase.prepare(model, backup_file)
+            start, cpu_start = time.perf_counter(), time.process_time()
+            phase.run(prepared)
+            seconds.append(time.perf_counter() - start)
+            cpu_seconds.append(time.process_time() - cpu_start)
+
+    with use_run(MapRun()):
+        prepared = phase.prepare(model, backup_file)
+        tracemalloc.start()
+        try:
+            phase.run(prepared)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return {"seconds": min(seconds), "cpu_seconds": min(cpu_seconds), "peak_bytes": peak_bytes}
+
+
+# Benchmark every phase on a backup of each of the scales.
+def run_benchmarks(scales: list, repeat: int = 3, phases: tuple = PHASE_NAMES) -> dict:
+    """
+    Benchmark the phases on a synthetic backup of each scale (see backgen.scale_spec).
+    The files the phases write go in a temporary folder.
+        Args:
+            scales (list): the backup scales, e.g. [1, 10]
+            repeat (int): how many times each phase is timed (the best time is kept)
+            phases (tuple): the names of the phases to benchmark (see PHASES)
+
+        Returns:
+            dict: the results: "version", "python", "machine", "repeat" and "scales", which is
+                {scale: {"backup_bytes": size, "phases": {phase: time_phase(...)}}}.
+    """
+    from maptasker.src.render import load_model
+
+    if unknown_phases := set(phases) - set(PHASE_NAMES):
+        error = f"Unknown benchmark phase(s): {', '.join(sorted(unknown_phases))}"
+        raise ValueError(error)
+    results = {
+        "version": MY_VERSION,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "scales": {},
+    }
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as temp_dir, contextlib.chdir(temp_dir):
+            backup_file = str(Path(temp_dir) / BACKUP_FILE)
+            backup_bytes = write_backup(backup_file, scale_spec(scale))
+            model = load_model(Path(backup_file).read_bytes())
+            results["scales"][f"{scale:g}"] = {
+                "backup_bytes": backup_bytes,
+                "phases": {
+                    phase.name: time_phase(phase, model, backup_file, repeat)
+                    for phase in PHASES
+                    if phase.name in phases
+                },
+            }
+    return results
+
+
+# Save the results as json.
+def save_results(results: dict, file_name: str) -> None:
+    """
+    Save benchmark results.
+        Args:
+            results (dict): from run_benchmarks
+            file_name (str): the json file to write
+
+        Returns:
+            None
+    """
+    with open(file_name, "w", encoding="utf-8") as results_file:
+        json.dump(results, results_file, indent=2)
+
+
+# Read saved results.
+def read_results(file_name: str) -> dict:
+    """
+    Read benchmark results saved by save_results.
+        Args:
+            file_name (str): the json file
+
+        Returns:
+            dict: the results.
+    """
+    with open(file_name, encoding="utf-8") as results_file:
+        return json.load(results_file)
+
+
+# Find the phases that are slower than in the baseline.
+def compare_to_baseline(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list:
+    """
+    Compare the results with those of a baseline run.  A phase has regressed if it takes
+    more than (1 + threshold) times as long as in the baseline (and NOISE_SECONDS more).
+    Scales and phases that are not in both are not compared.
+        Args:
+            results (dict): from run_benchmarks
+            baseline (dict): earlier results
+            threshold (float): how much slower a phase may be, e.g. 0.25 for 25%
+
+        Returns:
+            list: a Regression for each phase that has regressed.
+    """
+    regressions = []
+    for scale, result in results["scales"].items():
+        baseline_phases = baseline["scales"].get(scale, {}).get("phases", {})
+        for name, timing in result["phases"].items():
+            if name not in baseline_phases:
+                continue
+            seconds, baseline_seconds = timing["seconds"], baseline_phases[name]["seconds"]
+            if seconds > baseline_seconds * (1 + threshold) and seconds - baseline_seconds >= NOISE_SECONDS:
+                regressions.append(Regression(scale, name, seconds, baseline_seconds))
+    return regressions
+
+
+# Format the results as a table.
+def format_results(results: dict) -> list:
+    """
+    Format benchmark results for display.
+        Args:
+            results (dict): from run_benchmarks
+
+        Returns:
+            list: the lines of the table.
+    """
+    lines = [f"{'scale':>6} {'phase':<10} {'seconds':>9} {'cpu':>9} {'peak MB':>9}"]
+    for scale, result in results["scales"].items():
+        for name, timing in result["phases"].items():
+            peak_mb = timing["peak_bytes"] / 1_000_000
+            lines.append(
+                f"{scale:>6} {name:<10} {timing['seconds']:>9.3f} {timing['cpu_seconds']:>9.3f} {peak_mb:>9.1f}",
+            )
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark each phase of mapping synthetic backups.")
+    parser.add_argument("--scale", type=float, action="append", help="backup scale, may be repeated (default 1)")
+    parser.add_argument("--repeat", type=int, default=3, help="times to time each phase (default 3)")
+    parser.add_argument("--phase", action="append", choices=PHASE_NAMES, help="phase to do, may be repeated")
+    parser.add_argument("--output", help="json file to save the results in")
+    parser.add_argument("--baseline", help="json file of earlier results to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown (default 0.25)")
+    arguments = parser.parse_args()
+
+    the_results = run_benchmarks(arguments.scale or [1], arguments.repeat, tuple(arguments.phase or PHASE_NAMES))
+    print("\n".join(format_results(the_results)))
+    if arguments.output:
+        save_results(the_results, arguments.output)
+    if arguments.baseline:
+        the_regressions = compare_to_baseline(the_results, read_results(arguments.baseline), arguments.threshold)
+        for regression in the_regressions:
+            print(
+                f"Regression: scale {regression.scale} {regression.phase} took {regression.seconds:.3f}s"
+                f" (baseline {regression.baseline_seconds:.3f}s)",
+            )
+        sys.exit(1 if the_regressions else 0)
@@ -150,9 +150,9 @@ def condition_state(the_item: defusedxml.ElementTree.XMLParse, the_output_condit
             state_code = f"{child.text}s" if "s" not in child.text else child.text
             if state_code not in action_codes:
                 process_action_codes.build_action_codes(
-                    child,
                     the_item,
-                )  # Add it to our action dictionary
+                    state_code,
+                )  # Learn about it (see actiond)
             # child.text = state_code
             state = action_evaluate.get_action_code(
                 child,
@@ -188,7 +188,7 @@ def condition_event(the_item: defusedxml.ElementTree.XMLParse, the_output_condit
     event_code = f"{the_event_code.text}e" if "e" not in the_event_code.text else the_event_code.text
     if event_code not in action_codes:
         # Build new (template_ action code if not in our dictionary of codes yet
-        process_action_codes.build_action_codes(the_event_code, the_item)  # Add it to our action dictionary
+        process_action_codes.build_action_codes(the_item, event_code)  # Learn about it (see actiond)
     # the_event_code.text = event_code
     event = action_evaluate.get_action_code(
         the_event_code,
@@ -0,0 +1,252 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# crossref: build a cross-reference index of Projects/Profiles/Tasks/Scenes            #
+#                                                                                      #
+#           The index lets us go straight to the owning Project of a named item,       #
+#           rather than walking every Project/Profile/Task to find it.                 #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.sysconst import pattern11, pattern12
+
+if TYPE_CHECKING:
+    import defusedxml.ElementTree
+
+
+# Split a comma-separated <pids>/<tids>/<scenes> list from a Project.
+def get_project_list(project: defusedxml.ElementTree.XML, items_to_get: str) -> list:
+    """
+    Get the list of ids/names for the given Project's <pids>, <tids> or <scenes>
+        Args:
+            project (XML): the Project xml element
+            items_to_get (str): Project item to get: "pids", "tids" or "scenes"
+
+        Returns:
+            list: the ids/names found, or an empty list if none.
+    """
+    items_in_project = project.find(items_to_get)
+    if items_in_project is None or not items_in_project.text:
+        return []
+    return items_in_project.text.split(",")
+
+
+# Index the Profile and Task names, and the Profiles' Tasks.
+def index_names(cross_reference: dict, all_elements: dict) -> None:
+    """
+    Add the Profile and Task names, and each Profile's Entry/Exit Tasks (and each Task's
+    Profiles), to the index.
+        Args:
+            cross_reference (dict): the index being built (see build_cross_reference)
+            all_elements (dict): the Tasker root elements
+
+        Returns:
+            None
+    """
+    for profile_id, profile in all_elements["all_profiles"].items():
+        cross_reference["profile_ids_by_name"].setdefault(profile["name"], []).append(profile_id)
+        # A Profile's Task ids are in <mid0> (Entry) and <mid1> (Exit), before the name.
+        profile_tasks = []
+        for child in profile["xml"]:
+            if child.tag == "nme":
+                break
+            if "mid" in child.tag and child.text:
+                profile_tasks.append(child.text)
+        cross_reference["profile_tasks"][profile_id] = profile_tasks
+        for task_id in profile_tasks:
+            cross_reference["task_profiles"].setdefault(task_id, []).append(profile_id)
+    for task_id, task in all_elements["all_tasks"].items():
+        cross_reference["task_ids_by_name"].setdefault(task["name"], []).append(task_id)
+
+
+# Index the owning Project of each Profile and Task.
+def index_projects(cross_reference: dict, all_elements: dict) -> None:
+    """
+    Add the owning Project of each Profile and Task, and each Project's Profiles and
+    Tasks, to the index.
+        Args:
+            cross_reference (dict): the index being built (see build_cross_reference)
+            all_elements (dict): the Tasker root elements
+
+        Returns:
+            None
+    """
+    # Keep the first Project found, which is the one we would process first.
+    for project_name, project in all_elements["all_projects"].items():
+        for key, items_to_get, project_key in (
+            ("project_of_profile", "pids", "project_profiles"),
+            ("project_of_task", "tids", "project_tasks"),
+        ):
+            items = get_project_list(project["xml"], items_to_get)
+            for item in items:
+                cross_reference[key].setdefault(item, project_name)
+            cross_reference[project_key][project_name] = items
+
+
+# Build the cross-reference index from the Tasker root elements.
+def build_cross_reference() -> dict:
+    """
+    Build the cross-reference index for all of the Tasker root elements.
+        Args:
+            None
+
+        Returns:
+            dict: the index, with the following keys...
+                "profile_ids_by_name": Profile name: list of Profile IDs
+                "task_ids_by_name": Task name: list of Task IDs
+                "profile_tasks": Profile ID: list of Entry/Exit Task IDs
+                "task_profiles": Task ID: list of the Profiles that call it
+                "project_of_profile": Profile ID: owning Project (first found)
+                "project_of_task": Task ID: owning Project (first found)
+                "project_profiles": Project name: list of its Profile IDs
+                "project_tasks": Project name: list of its Task IDs
+    """
+    cross_reference = {
+        "profile_ids_by_name": {},
+        "task_ids_by_name": {},
+        "profile_tasks": {},
+        "task_profiles": {},
+        "project_of_profile": {},
+        "project_of_task": {},
+        "project_profiles": {},
+        "project_tasks": {},
+    }
+    index_names(cross_reference, PrimeItems.tasker_root_elements)
+    index_projects(cross_reference, PrimeItems.tasker_root_elements)
+    return cross_reference
+
+
+# Get the cross-reference index, building it if we don't yet have it.
+def get_cross_reference() -> dict:
+    """
+    Get the cross-reference index, building it if we don't yet have one for the
+    current Tasker root elements.
+        Args:
+            None
+
+        Returns:
+            dict: the cross-reference index (see build_cross_reference)
+    """
+    if not PrimeItems.cross_reference:
+        PrimeItems.cross_reference = build_cross_reference()
+    return PrimeItems.cross_reference
+
+
+# Find all of the Task IDs with the given name.
+def find_task_ids_by_name(task_name: str) -> list:
+    """
+    Find all of the Task IDs with the given name
+        Args:
+            task_name (str): name of the Task to find
+
+        Returns:
+            list: list of Task IDs in the order they are in the backup
+    """
+    return get_cross_reference()["task_ids_by_name"].get(task_name, [])
+
+
+# Get the first of the given Projects, in the order they are in the backup.
+def get_first_project(project_names: set) -> list:
+    """
+    Get the first of the given Projects, which is the one we would process first.
+        Args:
+            project_names (set): names of the Projects
+
+        Returns:
+            list: list with the name of the first Project, or empty list if none.
+    """
+    if not project_names:
+        return []
+    if len(project_names) == 1:
+        return list(project_names)
+    return [next(name for name in PrimeItems.tasker_root_elements["all_projects"] if name in project_names)]
+
+
+# Find the Project that owns the single Task we are looking for.
+def find_project_for_single_task(task_name: str) -> list:
+    """
+    Find the first Project that either has a Profile that calls the named Task, or has
+    the named Task in its list of Tasks.
+        Args:
+            task_name (str): name of the Task to find
+
+        Returns:
+            list: list with the name of the owning Project, or empty list if none.
+    """
+    cross_reference = get_cross_reference()
+    project_names = set()
+    for task_id in find_task_ids_by_name(task_name):
+        if project_name := cross_reference["project_of_task"].get(task_id):
+            project_names.add(project_name)
+        for profile_id in cross_reference["task_profiles"].get(task_id, []):
+            if project_name := cross_reference["project_of_profile"].get(profile_id):
+                project_names.add(project_name)
+    return get_first_project(project_names)
+
+
+# Get the list of Projects to process when doing a single Project/Profile/Task.
+def get_single_item_projects() -> list | None:
+    """
+    Resolve the single Project/Profile/Task we are looking for to its owning Project,
+    so that only that Project needs to be processed.
+        Args:
+            None
+
+        Returns:
+            list | None: list of the names of the Projects to process (empty if the single
+                item is not in any Project), or None if not doing a single item.
+    """
+    program_arguments = PrimeItems.program_arguments
+
+    # Single Project: just do it.
+    if project_name := program_arguments["single_project_name"]:
+        return [project_name] if project_name in PrimeItems.tasker_root_elements["all_projects"] else []
+
+    # Single Profile: do the first Project that has a Profile with this name.
+    if profile_name := program_arguments["single_profile_name"]:
+        cross_reference = get_cross_reference()
+        return get_first_project(
+            {
+                cross_reference["project_of_profile"][profile_id]
+                for profile_id in cross_reference["profile_ids_by_name"].get(profile_name, [])
+                if profile_id in cross_reference["project_of_profile"]
+            },
+        )
+
+    # Single Task: do the first Project that has or calls this Task.
+    if task_name := program_arguments["single_task_name"]:
+        return find_project_for_single_task(task_name)
+
+    return None
+
+
+# Find the variables referred to by a Project's Profiles and Tasks.
+def find_project_variables(project_name: str) -> set:
+    """
+    Find the variables (with at least one capital letter) in the xml of the Project's
+    Profiles and Tasks, without decoding them.
+        Args:
+            project_name (str): name of the Project
+
+        Returns:
+            set: the names of the variables found
+    """
+    cross_reference = get_cross_reference()
+    all_elements = PrimeItems.tasker_root_elements
+    profile_ids = cross_reference["project_profiles"].get(project_name, [])
+    task_ids = set(cross_reference["project_tasks"].get(project_name, []))
+    for profile_id in profile_ids:
+        task_ids.update(cross_reference["profile_tasks"].get(profile_id, []))
+
+    variables = set()
+    for item in [all_elements["all_profiles"].get(profile_id) for profile_id in profile_ids] + [
+        all_elements["all_tasks"].get(task_id) for task_id in task_ids
+    ]:
+        if item is not None:
+            for text in item["xml"].itertext():
+                variables.update(word for word in pattern12.findall(text) if pattern11.match(word))
+    return variables
@@ -1398,7 +1398,8 @@ def configure_progress_bar(output_lines: list) -> tuple:
             "max_data": max_data,
             "progress_counter": 0,
         }
-    return None
+    # No progress bar, but keep count all the same.
+    return {"progress_bar": None, "tenth_increment": 1, "max_data": 0, "progress_counter": 0}
 
 
 # Build the Profile box.
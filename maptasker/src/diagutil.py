@@ -8,9 +8,11 @@
 #                                                                                      #
 from __future__ import annotations
 
+import functools
 import re
+import unicodedata
 from string import printable
-from tkinter import font
+from tkinter import TclError, font
 
 from maptasker.src.nameattr import get_tk
 from maptasker.src.primitem import PrimeItems
@@ -165,6 +167,23 @@ def width_and_height_calculator_in_pixel(txt: str, fontname: str, fontsize: int)
     return [the_font.measure(txt), the_font.metrics("linespace")]
 
 
+# Get the dimensions of an icon character, guessing them if there is no display for Tkinter.
+@functools.cache
+def measure_icon(char: str) -> list:
+    """
+    Get the width and height of an icon character in pixels.  Without a display (e.g. when
+    run headless), a wide (two column) character is taken to be wider than it is high.
+    Args:
+        char: The icon character
+    Returns:
+        A list containing the width and height of the character.
+    """
+    try:
+        return width_and_height_calculator_in_pixel(char, "Courier New", 12)
+    except TclError:
+        return [2, 1] if unicodedata.east_asian_width(char) in ("W", "F") else [1, 1]
+
+
 # Wew have an icon in our name.  Remove any padding as necessary
 def fix_icon(name: str) -> str:
     """
@@ -183,7 +202,7 @@ def fix_icon(name: str) -> str:
         if char.strip() and set(char).difference(printable):
             # tkframe = PrimeItems.tkroot.frame()  # Initialize Tkinter
             # We have the icon.
-            char_dimension = width_and_height_calculator_in_pixel(char, "Courier New", 12)
+            char_dimension = measure_icon(char)
             trailer = "" if char_dimension[0] > char_dimension[1] else blank
             break
     return trailer
@@ -9,27 +9,33 @@
 # MIT License   Refer to https://opensource.org/license/mit                            #
 import math
 
+import defusedxml.ElementTree
+
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import NO_PROFILE, NORMAL_TAB, TABLE_BACKGROUND_COLOR, TABLE_BORDER, FormatLine
-from maptasker.src.xmldata import find_task_by_name
 
 period = "."
 
 
-# Search a list of lists for a given string.  Return True if found.
-def search_lists(search_string: str, list_of_lists: list) -> bool:
+# Get the set of names already added to the directory for a given key.
+def get_directory_names(key: str) -> set:
     """
-    Search a list of lists for a given string.  Return True if found.
+    Get the (persistent) set of names already in the directory for the given key.
+    The set lives alongside the directory lists, so it is discarded whenever
+    PrimeItems.directory_items is re-initialized.
         Args:
-            search_string (str): string to search for
-            list_of_lists (list): pointer to the list of lists to search through
+            key (str): "projects", "profiles", "tasks", or "scenes"
 
         Returns:
-            boolean: True if string found in list of lists, False otherwise
+            set: the names already added to PrimeItems.directory_items[key]
     """
-    # Convert list to a set for faster performance.
-    lookup = {item[1] for item in list_of_lists}
-    return search_string in lookup
+    all_names = PrimeItems.directory_items.setdefault("names", {})
+    names = all_names.get(key)
+    # Build the set once (from any items added before the set existed).
+    if names is None or len(names) != len(PrimeItems.directory_items[key]):
+        names = {item[1] for item in PrimeItems.directory_items[key]}
+        all_names[key] = names
+    return names
 
 
 # Add directory item (Project/Profile/Task/Scene) to our dictionary of items
@@ -43,12 +49,14 @@ def add_directory_item(key: str, name: str) -> None:
                 where "directory_head is "project", "profile", "task", or "scene"
             name (str): name of the Project/Profile/Task/Scene
     """
+    names = get_directory_names(key)
 
     # Only set values if we haven't already done this named item
-    if not search_lists(name, PrimeItems.directory_items[key]) and name != NO_PROFILE:
+    if name not in names and name != NO_PROFILE:
         hyperlink_name = name.replace(" ", "_")
         PrimeItems.directory_items["current_item"] = f"{key}_{hyperlink_name}"
         PrimeItems.directory_items[key].append([hyperlink_name, name])
+        names.add(name)
     else:
         PrimeItems.directory_items["current_item"] = ""
 
@@ -199,117 +207,162 @@ def do_trailing_matters() -> None:
     output_table(trailing_matter, 4)
 
 
-# Determinme if an item is in a specific a specific Project.
-def find_task_in_project(start_index: object, item_to_match: str, items_to_search: str) -> bool:
+# Split a Project's comma-separated list of ids/names (pids, tids, scenes) into a set.
+def get_project_ids(project: defusedxml.ElementTree.XML, items_to_get: str) -> set:
+    """
+    Get the set of ids/names for the given Project element
+        Args:
+            project (XML): the Project xml element
+            items_to_get (str): Project item to get: "scenes", "pids", "tids"
+
+        Returns:
+            set: the ids/names found, or an empty set if none.
+    """
+    items_in_project = project.find(items_to_get)
+    if items_in_project is None or items_in_project.text is None:
+        return set()
+    return set(items_in_project.text.split(","))
+
+
+# Find the first Project that contains the given item.
+def find_task_in_project(project_ids: list, item_to_match: str, items_to_search: str) -> tuple:
     """
     Determinme if an item is in a specific a specific Project.
         Args:
-            start_index (object): Which index to start our search within
-                PrimeItems.tasker_root_elements["all_projects"]
+            project_ids (list): list of precomputed Project id sets, as returned
+                by get_project_id_sets
             item_to_match (str): item to look for within Project
             items_to_search (str): Project item to search: "scenes", "pids", "tids"
 
         Returns:
-            bool: True if found, False otherwise
+            tuple: True and the Project's id sets if found, False and empty dict otherwise
     """
-    if start_index:
-        begin_search_at = PrimeItems.tasker_root_elements["all_projects"][start_index]
-    else:
-        begin_search_at = PrimeItems.tasker_root_elements["all_projects"]
-    for project_item in begin_search_at:
-        project = PrimeItems.tasker_root_elements["all_projects"][project_item]["xml"]
-        items_in_project = project.find(items_to_search)
-        if items_in_project is not None and item_to_match in items_in_project.text.split(","):
+    for project in project_ids:
+        if item_to_match in project[items_to_search]:
             return True, project
-    return False, ""
+    return False, {}
 
 
-# Doing Scene hyperlink.  Make sure it is okay to do this Scene hyperlink.
-def check_scene(item: str) -> bool:
+# Build the pids/tids/scenes sets for every Project, in Project order.
+def get_project_id_sets() -> list:
     """
-    Check to make sure this Scene should be included in the output
+    Build the pids/tids/scenes sets for each Project, so we only have to split
+    each Project's lists once.
         Args:
-            item (str): directory hyperlink item we are processing
+            None
 
-        Returns:20.
-            bool: True if we should output this hperlink, False if it is to be ingored.
+        Returns:
+            list: list of dictionaries with "pids", "tids" and "scenes" sets
     """
-    # Single Project?
-    if PrimeItems.program_arguments["single_project_name"]:
-        found, project = find_task_in_project("", item[1], "scenes")
-        return found
+    return [
+        {
+            "pids": get_project_ids(project["xml"], "pids"),
+            "tids": get_project_ids(project["xml"], "tids"),
+            "scenes": get_project_ids(project["xml"], "scenes"),
+        }
+        for project in PrimeItems.tasker_root_elements["all_projects"].values()
+    ]
 
-    # Single Profile?
-    if profile_name := PrimeItems.program_arguments["single_profile_name"]:
-        # Find out if this Scene is in the single Project's Profile' we are looking for.
-        # Get the Profile ID for the single Profile we are looking for
-        for profile_id in PrimeItems.tasker_root_elements["all_profiles"]:
-            if PrimeItems.tasker_root_elements["all_profiles"][profile_id]["name"] == profile_name:
-                found, project = find_task_in_project("", profile_id, "pids")
-                if found:
-                    scenes = project.find("scenes")
-                    if scenes is not None and item[1] in scenes.text.split(","):
-                        return True
 
-        return False
-    # Single Task?
-    if (profile_name := PrimeItems.program_arguments["single_task_name"]) and (
-        this_task_id := find_task_by_name(PrimeItems.program_arguments["single_task_name"])
-    ):
-        # Find the Project this single Task belongs to.
-        found, project = find_task_in_project("", this_task_id, "tids")
+# Build the sets used to determine which Tasks and Scenes go into the directory.
+def build_directory_filters() -> dict:
+    """
+    Precompute the Task ids and Scene names that are eligible for the directory when
+    doing a single Project/Profile/Task.  This is done once, rather than for every
+    directory hyperlink.
+        Args:
+            None
+
+        Returns:
+            dict: "task_ids" = dict of Task name to (first) Task id,
+                "profile_task_ids" = set of Task ids allowed for the single Profile,
+                "scenes" = set of Scene names allowed, or None if all are allowed.
+    """
+    program_arguments = PrimeItems.program_arguments
+    project_ids = get_project_id_sets()
+
+    # Map each Task name to its first Task id (same as find_task_by_name).
+    task_ids = {}
+    for task_id, task in PrimeItems.tasker_root_elements["all_tasks"].items():
+        task_ids.setdefault(task["name"], task_id)
+
+    profile_task_ids = set()
+    scenes = None
+    # Single Project?  Any Scene in any Project is valid.
+    if program_arguments["single_project_name"]:
+        scenes = set().union(*(project["scenes"] for project in project_ids))
+
+    # Single Profile?  Get the Scenes and Tasks in the Profile's Project.
+    elif profile_name := program_arguments["single_profile_name"]:
+        scenes = set()
+        profile_ids = {
+            profile_id
+            for profile_id, profile in PrimeItems.tasker_root_elements["all_profiles"].items()
+            if profile["name"] == profile_name
+        }
+        for profile_id in profile_ids:
+            found, project = find_task_in_project(project_ids, profile_id, "pids")
+            if found:
+                scenes.update(project["scenes"])
+        # Get the Task IDs of every Project that has the Profile we are looking for.
+        for project in project_ids:
+            if not profile_ids.isdisjoint(project["pids"]):
+                profile_task_ids.update(project["tids"])
+
+    # Single Task?  Get the Scenes in the Task's Project.
+    elif (task_name := program_arguments["single_task_name"]) and (this_task_id := task_ids.get(task_name)):
+        scenes = set()
+        found, project = find_task_in_project(project_ids, this_task_id, "tids")
         if found:
-            # Found Project with Profile, now check If Scenes in Project
-            scenes = project.find("scenes")
-            if scenes is not None and item[1] in scenes.text.split(","):
-                return True
-        return False
+            scenes = project["scenes"]
+
+    return {"task_ids": task_ids, "profile_task_ids": profile_task_ids, "scenes": scenes}
+
+
+# Doing Scene hyperlink.  Make sure it is okay to do this Scene hyperlink.
+def check_scene(item: str, filters: dict) -> bool:
+    """
+    Check to make sure this Scene should be included in the output
+        Args:
+            item (str): directory hyperlink item we are processing
+            filters (dict): precomputed filters from build_directory_filters
 
+        Returns:
+            bool: True if we should output this hperlink, False if it is to be ingored.
+    """
     # Not doing single name...Scene hyperlink is okay to include.
-    return True
+    if filters["scenes"] is None:
+        return True
+    return item[1] in filters["scenes"]
 
 
 # Doing Task hyperlink.  Make sure it is okay to do this Task hyperlink.
-def check_task(item: str) -> bool:
+def check_task(item: str, filters: dict) -> bool:
     """
     Check to make sure this Task should be included in the output
         Args:
             item (str): directory hyperlink item we are processing
+            filters (dict): precomputed filters from build_directory_filters
 
         Returns:
             bool: True if we should output this hyperlink, False if it is to be ingored.
     """
     if PrimeItems.program_arguments["single_task_name"] and item[1] != PrimeItems.program_arguments["single_task_name"]:
         return False
-    # Doing a single Profile?
+    # Doing a single Profile?  Make sure this Task is in the Profile's Project.
     if PrimeItems.program_arguments["single_profile_name"]:
-        # Get this Task's ID.
-        if this_task_id := find_task_by_name(item[1]):
-            # Find the Project that belongs to the Profile we are looking for.
-            for project_item in PrimeItems.tasker_root_elements["all_projects"]:
-                project = PrimeItems.tasker_root_elements["all_projects"][project_item]["xml"]
-                pids = project.find("pids")
-                # See if the Profile we are looking for is in this Project
-                if pids is not None:
-                    for profile_id in pids.text.split(","):
-                        if (
-                            PrimeItems.program_arguments["single_profile_name"]
-                            == PrimeItems.tasker_root_elements["all_profiles"][profile_id]["name"]
-                        ):
-                            # Get the Project's Task IDs
-                            tids = project.find("tids")
-                            if tids is not None and this_task_id in tids.text.split(","):
-                                return True
-        return False
+        this_task_id = filters["task_ids"].get(item[1])
+        return this_task_id is not None and this_task_id in filters["profile_task_ids"]
     return True
 
 
 # Doing Profile hyperlink.  Make sure it is okay to do this Profile hyperlink.
-def check_profile(item: str) -> bool:
+def check_profile(item: str, filters: dict) -> bool:  # noqa: ARG001
     """
     Check to make sure this Profile should be included in the output
         Args:
             item (str): directory hyperlink item we are processing
+            filters (dict): precomputed filters from build_directory_filters
 
         Returns:
             bool: True if we should output this hperlink, False if it is to be ingored.
@@ -323,11 +376,12 @@ def check_profile(item: str) -> bool:
 
 
 # Doing Project hyperlinks.  Make sure it is okay to do this Project hyperlink.
-def check_project(item: str) -> bool:
+def check_project(item: str, filters: dict) -> bool:  # noqa: ARG001
     """
     Check to make sure this Project should be included in the output
         Args:
             item (str): directory hyperlink item we are processing
+            filters (dict): precomputed filters from build_directory_filters
 
         Returns:
             bool: True if we should output this hperlink, False if it is to be ingored.
@@ -351,13 +405,14 @@ def check_project(item: str) -> bool:
 
 
 # Check to make sure this directory item should be included in the output.
-def check_item(name: str, item: str) -> bool:
+def check_item(name: str, item: str, filters: dict) -> bool:
     """
     Check to make sure this item should be included in the output
         Args:
             name: element name: directory we are doing:
                     "projects", "profiles", "tasks", "scenes"
             item (str): directory hyperlink item we are processing
+            filters (dict): precomputed filters from build_directory_filters
 
         Returns:
             bool: True if we should output this hyperlink, False if it is to be ingored.
@@ -369,13 +424,13 @@ def check_item(name: str, item: str) -> bool:
         "scenes": check_scene,
     }
     # Check if doing a single item...only build directory for that item.
-    return function_mappings[name](item)
+    return function_mappings[name](item, filters)
 
 
 #######################################################################################
 # Output table for specific Tasker element: Projects, Profiles, Tasks, Scenes
 #######################################################################################
-def do_tasker_element(name: str) -> None:
+def do_tasker_element(name: str, filters: dict) -> None:
     """
     Build an html table and output it for the given Tasker element: Project, Profile,
         Scene or Task.  DO this by traversing the entire xml trees.
@@ -386,6 +441,7 @@ def do_tasker_element(name: str) -> None:
     Args:
         name: element name: directory we are doing:
                 "projects", "profiles", "tasks", "scenes"
+        filters (dict): precomputed filters from build_directory_filters
 
     Returns:
         None
@@ -397,7 +453,7 @@ def do_tasker_element(name: str) -> None:
         directory_hyperlinks = []
 
         for item in PrimeItems.directory_items[name]:
-            if check_item(name, item):
+            if check_item(name, item, filters):
                 # Directory item is valid for this name.
                 # Get the name and display name for this item
                 hyperlink_name = item[0].replace(">", "&gt;").replace("<", "&lt;")
@@ -437,14 +493,17 @@ def output_directory() -> None:
         f"<h2>{NORMAL_TAB}Directory</h2><br><br>",
         ["<br><br>", "profile_color", FormatLine.add_end_span],
     )
+    # Precompute the Task/Scene filters once for all of the hyperlinks.
+    filters = build_directory_filters()
+
     # Ok, run through the Tasker key elements and output the directory for each
     # Only do Projects and Profiles if not looking for a single Project or Profile
     if not (PrimeItems.program_arguments["single_profile_name"] or PrimeItems.program_arguments["single_task_name"]):
-        do_tasker_element("projects")
-    do_tasker_element("profiles")
+        do_tasker_element("projects", filters)
+    do_tasker_element("profiles", filters)
     if PrimeItems.program_arguments["display_detail_level"] != 0:
-        do_tasker_element("tasks")
-    do_tasker_element("scenes")
+        do_tasker_element("tasks", filters)
+    do_tasker_element("scenes", filters)
 
     do_trailing_matters()
 
@@ -0,0 +1,324 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# droidnet: talk to the Tasker server (HTTP Server Example) on the Android device      #
+#                                                                                      #
+#           All requests to the Android device share one keep-alive session, so a      #
+#           list/validate/fetch sequence reuses the same connection.  The session      #
+#           retries (with backoff) requests that could not connect or that the         #
+#           server was too busy to answer.  Several files (e.g. every Project          #
+#           export) can be fetched at once with a small pool of threads.               #
+#                                                                                      #
+#           The lists of files on the device are cached.  A list that is older than   #
+#           ANDROID_LIST_TTL is still used as is, and refreshed in the background for  #
+#           the next time, so that the GUI's file menu comes up at once.               #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING
+
+from maptasker.src.sysconst import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    import requests
+
+ANDROID_BACKOFF = 0.5  # Backoff factor between retries, in seconds (0.5, 1, 2...)
+ANDROID_FETCH_WORKERS = 4  # Files fetched at once, and connections kept open
+ANDROID_LIST_TTL = 60  # Seconds a list of files is used for before it is refreshed
+ANDROID_RETRIES = 3  # Times to retry a request that failed to connect or got a busy status
+ANDROID_RETRY_STATUSES = (429, 500, 502, 503, 504)
+EXPORT_FILE_SUFFIXES = (".prj.xml", ".prf.xml", ".tsk.xml", ".scn.xml")
+
+android_session = None
+android_session_lock = threading.Lock()
+
+# The lists of files, by (ip address, port, directory):
+# {"files": list, "etag": str, "last_modified": str, "fetched": monotonic time}
+file_lists = {}
+file_lists_lock = threading.Lock()
+file_lists_refreshing = set()  # Keys of the lists being refreshed in the background
+
+
+# Get the session shared by all requests to the Android device.
+def get_android_session() -> requests.Session:
+    """
+    Get the session shared by all requests to the Android device, creating it the first time.
+        Args:
+            None
+
+        Returns:
+            requests.Session: the keep-alive session, which retries failed requests.
+    """
+    global android_session  # noqa: PLW0603
+    with android_session_lock:
+        if android_session is None:
+            # Only loaded when needed, to keep start up fast.
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+
+            retry = Retry(
+                total=ANDROID_RETRIES,
+                backoff_factor=ANDROID_BACKOFF,
+                status_forcelist=ANDROID_RETRY_STATUSES,
+                allowed_methods=("GET",),
+                raise_on_status=False,  # Give us the last response, to report its status.
+            )
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=ANDROID_FETCH_WORKERS,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            android_session = session
+        return android_session
+
+
+# Close the session, and the connections it has open.
+def close_android_session() -> None:
+    """
+    Close the session shared by the requests to the Android device.  The next request
+    starts a new one.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    global android_session  # noqa: PLW0603
+    with android_session_lock:
+        if android_session is not None:
+            android_session.close()
+            android_session = None
+
+
+# Is this a Tasker export (Project/Profile/Task/Scene) file?
+def is_export_file(file_location: str) -> bool:
+    """
+    Determine if a file is a Tasker Project, Profile, Task or Scene export.
+        Args:
+            file_location (str): location of the file
+
+        Returns:
+            bool: True if the file is an export (e.g. "/Tasker/MyProject.prj.xml")
+    """
+    return file_location.lower().endswith(EXPORT_FILE_SUFFIXES)
+
+
+# Fetch several files from the Android device at once.
+def fetch_android_files(
+    ip_address: str,
+    ip_port: str,
+    file_locations: list,
+    progress: Callable[[str, int, int], None] | None = None,
+) -> dict:
+    """
+    Fetch several files from the Android device into the current directory, with up to
+    ANDROID_FETCH_WORKERS downloads at a time.
+        Args:
+            ip_address (str): TCP/IP address of the Android device
+            ip_port (str): port of the Tasker server on the Android device
+            file_locations (list): locations of the files on the Android device
+            progress (Callable | None): if given, called with the file location, the bytes
+                received so far and the total (0 if not known).  It is called from the
+                download threads.
+
+        Returns:
+            dict: file location: (return code, local file name or error message), in the
+                order of file_locations.  See getbakup.download_backup_file.
+    """
+    from maptasker.src.getbakup import download_backup_file, substring_after_last
+
+    results = {}
+    to_fetch = {}
+    for file_location in dict.fromkeys(file_locations):
+        # Each file is saved under its own name, so two files can't have the same one.
+        local_name = substring_after_last(file_location, "/") or file_location
+        if local_name in to_fetch.values():
+            results[file_location] = (8, f"File {file_location} has the same name as another file being fetched.")
+        else:
+            to_fetch[file_location] = local_name
+
+    def fetch(file_location: str) -> tuple[int, str]:
+        file_progress = None if progress is None else partial(progress, file_location)
+        return download_backup_file(ip_address, ip_port, file_location, file_progress)
+
+    if to_fetch:
+        logger.debug(f"droidnet: fetching {len(to_fetch)} files from {ip_address}:{ip_port}")
+        with ThreadPoolExecutor(
+            max_workers=min(ANDROID_FETCH_WORKERS, len(to_fetch)),
+            thread_name_prefix="maptasker-fetch",
+        ) as executor:
+            # Each download runs in a copy of our context, so it uses the same run (PrimeItems).
+            futures = {
+                file_location: executor.submit(contextvars.copy_context().run, fetch, file_location)
+                for file_location in to_fetch
+            }
+            for file_location, future in futures.items():
+                results[file_location] = future.result()
+
+    return {file_location: results[file_location] for file_location in dict.fromkeys(file_locations)}
+
+
+# Get the file list from the maplist response.
+def parse_list_of_files(file_contents: bytes) -> list:
+    """
+    Get the list of file locations from the maplist response.
+        Args:
+            file_contents (bytes): the response: a comma separated list of
+                "/storage/emulated/0/path/to/file.xml" entries, each ending with a 3 character
+                count field.
+
+        Returns:
+            list: the file locations (without "/storage/emulated/0"), except those in the trash.
+    """
+    return [
+        item[:-3].replace("/storage/emulated/0", "")
+        for item in file_contents.decode("utf-8").split(",")
+        if ".Trash" not in item
+    ]
+
+
+# Refresh a cached file list in a thread of its own.
+def refresh_list_of_files_in_background(ip_address: str, ip_port: str, file_location: str) -> None:
+    """
+    Refresh the cached list of files in a directory on the Android device, in a thread of
+    its own.  Nothing is done if it is already being refreshed.
+        Args:
+            ip_address (str): IP address to connect to.
+            ip_port (str): Port number to connect to.
+            file_location (str): the directory.
+
+        Returns:
+            None
+    """
+    key = (ip_address, ip_port, file_location)
+    with file_lists_lock:
+        if key in file_lists_refreshing:
+            return
+        file_lists_refreshing.add(key)
+
+    def refresh() -> None:
+        try:
+            return_code, result = get_list_of_files(ip_address, ip_port, file_location, max_age=0)
+            if return_code != 0:
+                logger.debug(f"droidnet: unable to refresh the list of files: {result}")
+        finally:
+            with file_lists_lock:
+                file_lists_refreshing.discard(key)
+
+    threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(refresh,),
+        name="maptasker-list-files",
+        daemon=True,
+    ).start()
+
+
+# Get the list of XML files on the Android device.
+def get_list_of_files(
+    ip_address: str,
+    ip_port: str,
+    file_location: str,
+    max_age: float = ANDROID_LIST_TTL,
+) -> tuple:
+    """Get list of files from given IP address.
+    Parameters:
+        - ip_address (str): IP address to connect to.
+        - ip_port (str): Port number to connect to.
+        - file_location (str): Location of the file to retrieve.
+        - max_age (float): Seconds that a cached list is used for without checking with the
+            device.
+    Returns:
+        - tuple: Return code and list of file locations.
+    Processing Logic:
+        - A list younger than max_age is returned straight from the cache.
+        - An older list is returned from the cache too, and is refreshed in the background
+          for the next time (unless max_age is 0, when it is refreshed first).
+        - The list is fetched with maplist.  If the server gave us an ETag or Last-Modified
+          for it, we ask for it only if it has changed (If-None-Match/If-Modified-Since).
+        - Otherwise, return error with the error message."""
+    from maptasker.src.maputils import get_android_response
+
+    key = (ip_address, ip_port, file_location)
+    with file_lists_lock:
+        cached = file_lists.get(key)
+    if cached is not None and max_age:
+        if time.monotonic() - cached["fetched"] >= max_age:
+            refresh_list_of_files_in_background(ip_address, ip_port, file_location)
+        return 0, list(cached["files"])
+
+    # Ask the server for the list, unless it hasn't changed since we got it.
+    headers = {}
+    if cached is not None:
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+    return_code, response = get_android_response(
+        ip_address,
+        ip_port,
+        file_location,
+        "maplist",
+        "?xml",
+        headers or None,
+    )
+    if return_code != 0:
+        return return_code, response
+
+    if response.status_code == 304 and cached is not None:
+        file_list = {**cached, "fetched": time.monotonic()}
+    else:
+        file_list = {
+            "files": parse_list_of_files(response.content),
+            "etag": response.headers.get("ETag", ""),
+            "last_modified": response.headers.get("Last-Modified", ""),
+            "fetched": time.monotonic(),
+        }
+    with file_lists_lock:
+        file_lists[key] = file_list
+    return 0, list(file_list["files"])
+
+
+# Forget the cached file lists.
+def forget_lists_of_files() -> None:
+    """
+    Forget the cached lists of files, so that they are fetched again.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    with file_lists_lock:
+        file_lists.clear()
+
+
+# Fetch all of the Project/Profile/Task/Scene exports in a directory on the Android device.
+def fetch_android_exports(ip_address: str, ip_port: str, directory: str) -> tuple[int, object]:
+    """
+    Fetch all of the Tasker exports (.prj/.prf/.tsk/.scn.xml) in a directory on the
+    Android device at once.  Requires the 'MapTasker List' profile on the device.
+        Args:
+            ip_address (str): TCP/IP address of the Android device
+            ip_port (str): port of the Tasker server on the Android device
+            directory (str): the directory, e.g. "/storage/emulated/0/Tasker"
+
+        Returns:
+            tuple[int, object]: 0 and the results from fetch_android_files, or the error
+                code and message if the files could not be listed.
+    """
+    return_code, file_list = get_list_of_files(ip_address, ip_port, directory)
+    if return_code != 0:
+        return return_code, file_list
+    return 0, fetch_android_files(ip_address, ip_port, [item for item in file_list if is_export_file(item)])
@@ -3,12 +3,198 @@
 #                                                                                      #
 # fonts:Get/set up fonts to use in output                                              #
 #                                                                                      #
+#       Finding the monospace fonts means starting Tk and measuring every font, so     #
+#       the list is saved in a cache file along with a fingerprint of the font         #
+#       directories (their modification times).  If the fingerprint still matches,     #
+#       the saved list is used as is.  If not, the saved list is used for this run     #
+#       and a new list is built in the background (in its own process, since Tk       #
+#       must run in the main thread) for the next run.                                 #
+#                                                                                      #
 # MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import platform
+import subprocess
 import sys
-from tkinter import Tk, font
+from pathlib import Path
 
-# from maptasker.src.nameattr import get_tk
 from maptasker.src.primitem import PrimeItems
+from maptasker.src.sysconst import FONT_CACHE_FILE, logger
+
+
+# Get the directories that fonts are installed in for this platform.
+def get_font_directories() -> list:
+    """
+    Get the directories that fonts are installed in for this platform
+        Args:
+            None
+
+        Returns:
+            list: list of font directory Paths (not all of which need exist)
+    """
+    home = Path.home()
+    match platform.system():
+        case "Darwin":
+            return [Path("/System/Library/Fonts"), Path("/Library/Fonts"), home / "Library" / "Fonts"]
+        case "Windows":
+            windows = Path(os.environ.get("WINDIR", "C:\\Windows"))
+            local = Path(os.environ.get("LOCALAPPDATA", home / "AppData" / "Local"))
+            return [windows / "Fonts", local / "Microsoft" / "Windows" / "Fonts"]
+        case _:
+            return [
+                Path("/usr/share/fonts"),
+                Path("/usr/local/share/fonts"),
+                home / ".fonts",
+                home / ".local" / "share" / "fonts",
+                Path("/etc/fonts"),
+            ]
+
+
+# Get the fingerprint of the installed fonts.
+def get_font_fingerprint() -> list:
+    """
+    Get the fingerprint of the installed fonts: the modification times of the font
+    directories and their immediate subdirectories, which change when fonts are added
+    or removed.
+        Args:
+            None
+
+        Returns:
+            list: list of [directory, modification time] pairs
+    """
+    fingerprint = []
+    for directory in get_font_directories():
+        with contextlib.suppress(OSError):
+            fingerprint.append([str(directory), directory.stat().st_mtime_ns])
+            with os.scandir(directory) as entries:
+                fingerprint.extend(
+                    [entry.path, entry.stat().st_mtime_ns]
+                    for entry in sorted(entries, key=lambda entry: entry.name)
+                    if entry.is_dir()
+                )
+    return fingerprint
+
+
+# Ask Tk for all monospace ("f"=fixed) fonts.
+def find_mono_fonts() -> list:
+    """
+    Ask Tk for all of the monospace font families.  This is the slow part.
+        Args:
+            None
+
+        Returns:
+            list: list of monospace font families, in Tk's order
+    """
+    from tkinter import Tk, font
+
+    # Use the Tk root we already have (the GUI's, if running it), or a temporary one.
+    root = new_root = None
+    if PrimeItems.tkroot is not None:
+        root = PrimeItems.tkroot
+    elif not PrimeItems.program_arguments.get("gui"):
+        root = new_root = Tk()
+    try:
+        fonts = [font.Font(root=root, family=f) for f in font.families(root)]
+        return [f.actual("family") for f in fonts if f.metrics("fixed")]
+    finally:
+        if new_root is not None:
+            new_root.destroy()
+
+
+# Save the monospace fonts and the fingerprint they were found with.
+def save_font_cache(mono_fonts: list, fingerprint: list) -> None:
+    """
+    Save the monospace fonts and the font fingerprint to the cache file
+        Args:
+            mono_fonts (list): list of monospace font families
+            fingerprint (list): font fingerprint (see get_font_fingerprint)
+
+        Returns:
+            None
+    """
+    temp_file = f"{FONT_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        with open(temp_file, "w", encoding="utf-8") as cache_file:
+            json.dump({"fingerprint": fingerprint, "fonts": mono_fonts}, cache_file)
+        # Replace the cache file in one go, so a reader never sees half of it.
+        os.replace(temp_file, FONT_CACHE_FILE)
+    except OSError as e:
+        logger.debug(f"fonts: unable to save the font cache: {e}")
+        with contextlib.suppress(OSError):
+            os.remove(temp_file)
+
+
+# Read the cache file.
+def read_font_cache() -> dict:
+    """
+    Read the monospace fonts and the fingerprint they were found with from the cache file
+        Args:
+            None
+
+        Returns:
+            dict: {"fingerprint": list, "fonts": list}, or empty dict if there is no valid cache.
+    """
+    try:
+        with open(FONT_CACHE_FILE, encoding="utf-8") as cache_file:
+            cache = json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or not isinstance(cache.get("fonts"), list):
+        return {}
+    return cache
+
+
+# Rebuild the cache file in the background, in its own process.
+def refresh_font_cache_in_background() -> None:
+    """
+    Start a process to find the monospace fonts and save them to the cache file.  The
+    process runs in our current directory (where the cache file is), and can import
+    this package wherever it was imported from.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    package_root = str(Path(__file__).resolve().parents[2])
+    python_path = os.pathsep.join(path for path in (package_root, os.environ.get("PYTHONPATH")) if path)
+    with contextlib.suppress(OSError):
+        subprocess.Popen(
+            [sys.executable, "-m", "maptasker.src.fonts"],
+            cwd=os.getcwd(),
+            env=os.environ | {"PYTHONPATH": python_path},
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+
+# Get all monospace fonts, from the cache if we can.
+def get_mono_font_families() -> list:
+    """
+    Get all of the monospace font families.  The cached list is used if we have one,
+    and is rebuilt in the background if the installed fonts have changed.
+        Args:
+            None
+
+        Returns:
+            list: list of monospace font families
+    """
+    cache = read_font_cache()
+    fingerprint = get_font_fingerprint()
+    if cache:
+        if cache.get("fingerprint") != fingerprint:
+            logger.debug("fonts: the installed fonts have changed.  Refreshing the font cache.")
+            refresh_font_cache_in_background()
+        return cache["fonts"]
+
+    # No cache yet: we have to find them now.
+    mono_fonts = find_mono_fonts()
+    save_font_cache(mono_fonts, fingerprint)
+    return mono_fonts
 
 
 # Get all monospace ("f"=fixed) fonts
@@ -21,9 +207,6 @@ def get_fonts(save_fonts: bool) -> dict:
         Returns:
             dict: list of avilable monospace fonts
     """
-    # get_tk()  # Get the Tkinter root window
-    _ = Tk()
-    fonts = [font.Font(family=f) for f in font.families()]
     our_font = PrimeItems.program_arguments["font"]
 
     # Set up our list of fonts, including Courier
@@ -34,18 +217,21 @@ def get_fonts(save_fonts: bool) -> dict:
         print("Valid monospace fonts...")
         print('  "Courier" is the default')
 
-    # Go thru list of fonts from tkinter
+    # Go thru list of monospace fonts
     PrimeItems.mono_fonts = {}
-    for f in fonts:
-        # Monospace only
-        if f.metrics("fixed") and "Wingding" not in f.actual("family"):
+    for family in get_mono_font_families():
+        if "Wingding" not in family:
             if our_font == "help":
-                print(f'  "{f.actual("family")}"')
+                print(f'  "{family}"')
             elif save_fonts:
-                PrimeItems.mono_fonts[f.name] = f.actual("family")
-            mono_fonts.append(f.actual("family"))
+                PrimeItems.mono_fonts[family] = family
+            mono_fonts.append(family)
     if our_font == "help":
         sys.exit(0)
 
-    del fonts
     return mono_fonts
+
+
+# Refresh the cache file (run in the background by refresh_font_cache_in_background).
+if __name__ == "__main__":
+    save_font_cache(find_mono_fonts(), get_font_fingerprint())
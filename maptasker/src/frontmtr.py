@@ -7,7 +7,7 @@
 # MIT License   Refer to https://opensource.org/license/mit                            #
 import datetime
 
-from maptasker.src.addcss import add_css
+from maptasker.src.addcss import add_css, style_token
 from maptasker.src.debug import display_debug_info
 from maptasker.src.format import format_html
 from maptasker.src.prefers import get_preferences
@@ -45,7 +45,7 @@ def output_the_heading() -> None:
     # Set up highlight background color if needed
     if PrimeItems.program_arguments["highlight"]:
         background_color_html = (
-            "<style>\nmark { \nbackground-color: " + PrimeItems.colors_to_use["highlight_color"] + ";\n}\n</style>\n"
+            "<style>\nmark { \nbackground-color: " + style_token("highlight_color") + ";\n}\n</style>\n"
         )
     else:
         background_color_html = ""
@@ -60,7 +60,7 @@ def output_the_heading() -> None:
     heading_color = "heading_color"
     PrimeItems.heading = (
         f'<!doctype html>\n<html lang=”en”>\n<head>\n<meta charset="UTF-8">{background_color_html}<title>MapTasker</title>\n<body'
-        f" style=\"background-color:{PrimeItems.colors_to_use['background_color']}\">\n"
+        f" style=\"background-color:{style_token('background_color')}\">\n"
         + format_html(
             heading_color,
             "",
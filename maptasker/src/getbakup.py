@@ -6,58 +6,183 @@
 # MIT License   Refer to https://opensource.org/license/mit                            #
 from __future__ import annotations
 
-import os.path
-from os import getcwd
+import os
+import sys
+import time
+from typing import TYPE_CHECKING
 
 from maptasker.src.error import error_handler
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import logger
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
 
-# We've read in the xml backup file.  Now save it for processing.
-def write_out_backup_file(file_contents: bin) -> None:
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MIN_RATE = 64 * 1024  # Slowest acceptable download, in bytes per second on average
+DOWNLOAD_TIMEOUT = 5  # Seconds to connect, or to wait for the next data
+PART_FILE_SUFFIX = ".part"  # Suffix of the file being downloaded
+
+
+# Print the progress of the download (command line).
+def print_download_progress(bytes_done: int, bytes_total: int) -> None:
+    """
+    Print the progress of the backup file download, on one line.
+        Args:
+            bytes_done (int): number of bytes received so far
+            bytes_total (int): size of the download, or 0 if not known
+
+        Returns:
+            None
     """
-    We've read in the xml backup file.  Now save it for processing.
+    if not sys.stdout.isatty():
+        return
+    if bytes_total:
+        print(f"\rFetching backup file: {bytes_done * 100 // bytes_total}%", end="", flush=True)
+    else:
+        print(f"\rFetching backup file: {bytes_done // 1024}K", end="", flush=True)
 
-        :param file_contents: binary contents of backup xml file
-        :return: Nothing
+
+# Decide what to do with the server's response to a download request.
+def check_download_response(response: object, offset: int) -> str:
     """
-    # Store the output in the current directory
-    my_output_dir = getcwd()
-    if my_output_dir is None:
-        error_handler(
-            "MapTasker canceled.  An error occurred in getbakup.  Program canceled.",
-            2,
-        )
-
-    # We must get just the file name and type since we will be using this to save it to our local path.
-    # This is the file we will do all of our processing against...the local file fetched from the Android device.
-    # Get position of the last "/" in path/file
-    name_location = PrimeItems.program_arguments["android_file"].rfind(PrimeItems.slash) + 1
-    # Get the name of the file
-    my_file_name = PrimeItems.program_arguments["android_file"][name_location:]
-
-    # Convert the binary code to string
-    output_lines = file_contents.decode("utf-8")
-
-    # Set up the backup file full path
-    the_backup_file = PrimeItems.program_arguments["android_file"]
-    put_message = f"Fetching backup file {my_file_name}: {the_backup_file}"
-    logger.debug(put_message)
-
-    # If backup.xml already exists, delete it first
-    if os.path.isfile(my_file_name):
-        os.remove(my_file_name)
-
-    # Open output file
-    with open(my_file_name, "w") as out_file:
-        # Write out each line
-        for item in output_lines:
-            item.rstrip()  # Get rid of trailing blanks
-            out_file.write(item)
+    Decide what to do with the server's response to a (resumed) download request.
+        Args:
+            response (requests.Response): the response
+            offset (int): the size of the part already downloaded, or 0
+
+        Returns:
+            str: "restart" to download the whole file again (the part we have is all there is,
+                or the server would rather start over), "whole" to save the whole file,
+                "rest" to add the rest of it to the part we have, "not found", or "failed".
+    """
+    status = response.status_code
+    if offset and (
+        status == 416
+        or (status == 206 and not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-"))
+    ):
+        return "restart"
+    if status == 404:
+        return "not found"
+    if status not in {200, 206}:
+        return "failed"
+    # Range not supported: start over.
+    return "rest" if offset and status == 206 else "whole"
+
+
+# Save the file being downloaded, as it is received.
+def save_download(
+    response: object,
+    part_file_name: str,
+    offset: int,
+    progress: Callable[[int, int], None] | None,
+) -> str:
+    """
+    Save the file as it is received, adding to the part we have if offset is not 0.  Give up
+    if it is coming in slower than DOWNLOAD_MIN_RATE (on average, after DOWNLOAD_TIMEOUT).
+        Args:
+            response (requests.Response): the streamed response
+            part_file_name (str): the file to save it in
+            offset (int): the size of the part already downloaded, or 0
+            progress (Callable | None): if given, called with the bytes received so far and
+                the total (0 if not known).
+
+        Returns:
+            str: the error, or "" if it was all saved.
+    """
+    size = int(response.headers.get("Content-Length", 0))
+    bytes_total = offset + size if size else 0
+    start = time.monotonic()
+    bytes_saved = 0
+    with open(part_file_name, "ab" if offset else "wb") as part_file:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            part_file.write(chunk)
+            bytes_saved += len(chunk)
+            # Bytes received (before being unzipped), to compare with the total.  They aren't
+            # counted for a chunked response, with no total.
+            bytes_received = response.raw.tell() or bytes_saved
+            if progress is not None:
+                progress(offset + bytes_received, bytes_total)
+            if time.monotonic() - start > DOWNLOAD_TIMEOUT + bytes_received / DOWNLOAD_MIN_RATE:
+                return "Timeout error: the file is taking too long."
+
+        # Make sure we got all of it (an unzipped file is checked by requests itself).
+        if size and "Content-Encoding" not in response.headers and part_file.tell() != offset + size:
+            return "Incomplete file.  Try again to resume."
+    return ""
+
+
+# Download the backup file from the Android device, straight to a local file.
+def download_backup_file(
+    ip_address: str,
+    ip_port: str,
+    file_location: str,
+    progress: Callable[[int, int], None] | None = None,
+) -> tuple[int, str]:
+    """
+    Download the backup file from the Android device (Tasker's HTTP Server Example) into the
+    current directory.  The file is written as it is received, to a '.part' file which is
+    renamed when it is complete.  If a previous download was interrupted, it is resumed
+    (HTTP Range) from where it left off.  The file is sent gzipped if the server can.
+        Args:
+            ip_address (str): TCP/IP address of the Android device
+            ip_port (str): port of the Tasker server on the Android device
+            file_location (str): location of the backup file on the Android device
+            progress (Callable | None): if given, called with the bytes received so far and
+                the total (0 if not known).
+
+        Returns:
+            tuple[int, str]: 0 and the name of the local file, or the error code and message
+                (6 = file not found, 8 = request failed).
+    """
+    # Only loaded when needed, to keep start up fast.
+    import requests
+
+    from maptasker.src.droidnet import get_android_session
+    from maptasker.src.maputils import get_android_url
+
+    url = get_android_url(ip_address, ip_port, "file", file_location, "?download=1")
+    my_file_name = substring_after_last(file_location, "/") or file_location
+    part_file_name = f"{my_file_name}{PART_FILE_SUFFIX}"
+    logger.debug(f"Fetching backup file {my_file_name}: {url}")
+
+    # Resume the previous download if there is one.  The part we have is the decoded file,
+    # so the rest has to be sent as is (not gzipped) for the offset to be right.
+    offset = os.path.getsize(part_file_name) if os.path.isfile(part_file_name) else 0
+    headers = {"Range": f"bytes={offset}-", "Accept-Encoding": "identity"} if offset else {}
+
+    try:
+        with get_android_session().get(
+            url,
+            headers=headers,
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT,
+        ) as response:
+            action = check_download_response(response, offset)
+            if action == "restart":
+                os.remove(part_file_name)
+                return download_backup_file(ip_address, ip_port, file_location, progress)
+            if action == "not found":
+                return 6, f"File {file_location} not found."
+            if action == "failed":
+                return 8, f"Request failed for url: {url} ...with status code {response.status_code}"
+            if error := save_download(response, part_file_name, offset if action == "rest" else 0, progress):
+                return 8, f"Request failed for url: {url} .  {error}"
+    except requests.exceptions.InvalidSchema:
+        return 8, f"Request failed for url: {url} .  Invalid url!"
+    except requests.exceptions.Timeout:
+        return 8, f"Request failed for url: {url} .  Timeout error."
+    except requests.exceptions.ConnectionError:
+        return 8, f"Request failed for url: {url} .  Connection error! Unable to get XML from Android device."
+    except (requests.exceptions.RequestException, OSError) as e:
+        return 8, f"Request failed for url: {url}, error: {e} ."
+
+    # Replace the old file in one go, so it is never half written.
+    os.replace(part_file_name, my_file_name)
 
     # Set flag to identify that backup file was fetched from Android device
     PrimeItems.program_arguments["fetched_backup_from_android"] = True
+    return 0, my_file_name
 
 
 # Return the substring after the last occurance of a specific character in a string
@@ -83,28 +208,24 @@ def get_backup_file() -> str:
 
         :return: The name of the backup file (e.g. backup.xml)
     """
-    from maptasker.src.maputils import http_request
-
     # If ruinning from the GUI, then we have already gotten the file. Just return the name on the local drive.add
     if PrimeItems.program_arguments["gui"]:
         return substring_after_last(PrimeItems.program_arguments["android_file"], "/")
 
-    # Get the contents of the file from the Android device.
-    return_code, file_contents = http_request(
+    # Get the file from the Android device and write it to local storage.
+    return_code, file_name = download_backup_file(
         PrimeItems.program_arguments["android_ipaddr"],
         PrimeItems.program_arguments["android_port"],
         PrimeItems.program_arguments["android_file"],
-        "file",
-        "?download=1",
+        print_download_progress,
     )
+    if sys.stdout.isatty():
+        print()  # End the progress line.
 
     if return_code != 0:
         if PrimeItems.program_arguments["gui"]:
             PrimeItems.error_code = return_code
             return None
-        error_handler(str(file_contents), 8)
-
-    # Write the XML file to local storage.
-    write_out_backup_file(file_contents)
+        error_handler(file_name, 8)
 
-    return substring_after_last(PrimeItems.program_arguments["android_file"], "/")
+    return file_name
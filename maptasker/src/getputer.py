@@ -27,6 +27,7 @@ from maptasker.src.sysconst import (
     ARGUMENTS_FILE,
     NOW_TIME,
     OLD_ARGUMENTS_FILE,
+    RUN_ONLY_ARGUMENTS,
     SYSTEM_ARGUMENTS,
     SYSTEM_SETTINGS_FILE,
     logger,
@@ -34,6 +35,41 @@ from maptasker.src.sysconst import (
 
 twenty_four_hours_ago = NOW_TIME - timedelta(hours=25)
 
+# The contents of each settings file as we last wrote or read it, by file path.
+# A save only writes a file if its contents have changed.
+last_saved = {}
+
+
+# Write the file, but only if it is different than what we last saved/read.
+def write_if_changed(file_path: str, contents: bytes) -> bool:
+    """
+    Write the contents to the file if they are different than what the file last held.
+    The file is written to a temporary file which then replaces it, so the file is
+    never left half written.
+        Args:
+            file_path (str): path of the file to write
+            contents (bytes): the new contents of the file
+
+        Returns:
+            bool: True if the file was written, False if it was unchanged.
+    """
+    file_path = os.path.abspath(file_path)
+    # First time here for this file: see what is on disk.
+    if file_path not in last_saved:
+        try:
+            last_saved[file_path] = Path(file_path).read_bytes()
+        except OSError:
+            last_saved[file_path] = None
+    if last_saved[file_path] == contents:
+        return False
+
+    temp_file = f"{file_path}.tmp"
+    with open(temp_file, "wb") as settings_file:
+        settings_file.write(contents)
+    os.replace(temp_file, file_path)
+    last_saved[file_path] = contents
+    return True
+
 
 # Settings file is corrupt.  Let user know and reset colors to use and program arguments
 def corrupted_file(program_arguments: dict, colors_to_use: dict) -> None:
@@ -72,6 +108,7 @@ def corrupted_file(program_arguments: dict, colors_to_use: dict) -> None:
 def save_arguments(program_arguments: dict, colors_to_use: dict, new_file: str) -> None:
     """
     Save the program arguments, colors to use, and new file to a JSON file.
+    Each file is only written if what we are saving has changed.
 
     Args:
         program_arguments (dict): The program arguments.
@@ -103,35 +140,34 @@ def save_arguments(program_arguments: dict, colors_to_use: dict, new_file: str)
     user_args = {}
     sys_args = {}
     for argument in ARGUMENT_NAMES:
+        if argument in RUN_ONLY_ARGUMENTS:
+            continue
         if argument in SYSTEM_ARGUMENTS:
             sys_args[argument] = program_arguments[argument]
         else:
             user_args[argument] = program_arguments[argument]
 
-    # Save dictionaries
-    settings = {"program_arguments": user_args, "colors_to_use": colors_to_use, "last_run": PrimeItems.last_run}
-
-    # Write out the guidance for the file.
-    with open(new_file, "wb") as settings_file:
-        tomli_w.dump(guidance, settings_file)
-        settings_file.close()
+    # Save dictionaries.  Sort the program args and colors first.
+    settings = {
+        "program_arguments": dict(sorted(user_args.items())),
+        "colors_to_use": dict(sorted(colors_to_use.items())),
+        "last_run": PrimeItems.last_run,
+    }
 
-    # Write out the user program arguments in TOML format.  Open in binary append format (ab).
-    with open(new_file, "ab") as settings_file:
-        settings["program_arguments"] = dict(sorted(user_args.items()))  # Sort the program args first.
-        settings["colors_to_use"] = dict(sorted(colors_to_use.items()))  # Sort the colors first.
-        try:
-            tomli_w.dump(settings, settings_file)
-        except TypeError as e:
-            logger.debug(f"getputer tomli failure: {e}")
-            print(f"getputer tomli failure: {e}...one or more settings is 'None'!")
-        settings_file.close()
+    # The guidance for the file followed by the user program arguments, in TOML format.
+    try:
+        toml_contents = tomli_w.dumps(guidance) + tomli_w.dumps(settings)
+    except TypeError as e:
+        # Keep the settings we last saved.
+        logger.debug(f"getputer tomli failure: {e}")
+        print(f"getputer tomli failure: {e}...one or more settings is 'None'!")
+    else:
+        if write_if_changed(new_file, toml_contents.encode("utf-8")):
+            logger.debug(f"getputer: saved {new_file}")
 
-    # Write out the system program arguments in PICKLE format.
-    with open(SYSTEM_SETTINGS_FILE, "wb") as settings_file:
-        # dump information to that file
-        pickle.dump(sys_args, settings_file)
-        settings_file.close()
+    # The system program arguments in PICKLE format.
+    if write_if_changed(SYSTEM_SETTINGS_FILE, pickle.dumps(sys_args)):
+        logger.debug(f"getputer: saved {SYSTEM_SETTINGS_FILE}")
 
 
 # User still has setting file in older unsupported format.  Convert the info and delete it.
@@ -221,7 +257,9 @@ def read_toml_file(new_file: str) -> tuple[dict, dict]:
         # Setup old date if date last used is not in TROML settings file.  Catch all possible errors with TOML file.
         try:
             # Colors to use
-            settings = tomllib.load(f)
+            contents = f.read()
+            last_saved[os.path.abspath(new_file)] = contents
+            settings = tomllib.loads(contents.decode("utf-8"))
             try:
                 colors_to_use = settings["colors_to_use"]  # Get the colors to use
             except KeyError:
@@ -271,10 +309,16 @@ def read_arguments(program_arguments: dict, colors_to_use: dict, old_file: str,
     # Read the system settings PICKLE file
     if os.path.isfile(sys_file):
         with open(sys_file, "rb") as sys_settings_file:
-            sys_args = pickle.load(sys_settings_file)  # noqa: S301
+            contents = sys_settings_file.read()
+            last_saved[os.path.abspath(sys_file)] = contents
+            sys_args = pickle.loads(contents)  # noqa: S301
             for key, value in sys_args.items():
                 program_arguments[key] = value
 
+    # Drop any run-only arguments saved by an earlier version.
+    for argument in RUN_ONLY_ARGUMENTS:
+        program_arguments.pop(argument, None)
+
     return program_arguments, colors_to_use
 
 
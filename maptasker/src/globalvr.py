@@ -9,6 +9,8 @@
 
 import defusedxml.ElementTree  # Need for type hints
 
+from maptasker.src.addcss import style_token
+from maptasker.src.crossref import find_project_variables
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import NORMAL_TAB, TABLE_BACKGROUND_COLOR, TABLE_BORDER, FormatLine
 
@@ -150,6 +152,25 @@ def get_variables() -> None:
         }
 
 
+# Add the variable references of Projects that are not being mapped.
+def add_project_references(project_names: list) -> None:
+    """
+    Add the Projects to the variables they refer to, without mapping them.  When mapping a
+    single Project/Profile/Task only its Project is mapped, yet a variable the other
+    Projects refer to is still not an "Unreferenced Global Variable".
+        Args:
+            project_names (list): names of the Projects not being mapped
+
+        Returns:
+            None
+    """
+    for project_name in project_names:
+        project = PrimeItems.tasker_root_elements["all_projects"][project_name]
+        for variable_name in find_project_variables(project_name):
+            if (variable := PrimeItems.variables.get(variable_name)) is not None and project not in variable["project"]:
+                variable["project"].append(project)
+
+
 # Print the variables (Project's or Unreferenced)
 def print_the_variables(color_to_use: str, project: defusedxml.ElementTree) -> None:
     """Parameters:
@@ -219,7 +240,7 @@ def output_variables(heading: str, project: defusedxml.ElementTree) -> None:
     # Output unreferenced global variables.  The Project will be "".
     # Force an indentation and set color to use in output.
     if project is None or project == "":
-        color_to_use = PrimeItems.colors_to_use["trailing_comments_color"]
+        color_to_use = style_token("trailing_comments_color")
         color_name = "trailing_comments_color"
         PrimeItems.output_lines.add_line_to_output(
             1,
@@ -233,7 +254,7 @@ def output_variables(heading: str, project: defusedxml.ElementTree) -> None:
             FormatLine.dont_format_line,
         )
     else:
-        color_to_use = PrimeItems.colors_to_use["project_color"]
+        color_to_use = style_token("project_color")
         color_name = "project_color"
 
     # Print the heading if we have global variables.
@@ -245,7 +266,7 @@ def output_variables(heading: str, project: defusedxml.ElementTree) -> None:
         )
 
         # Define table
-        table_definition = f'{TABLE_BORDER}<table cellspacing="1" cellpadding="2" border="1" style="height:16px; margin-left: 20;color:{color_to_use};background-color:{TABLE_BACKGROUND_COLOR};font-family:{PrimeItems.program_arguments["font"]};text-align:left">\n<tr>\n<th>Name</th>\n<th>Value</th>\n</tr>'
+        table_definition = f'{TABLE_BORDER}<table cellspacing="1" cellpadding="2" border="1" style="height:16px; margin-left: 20;color:{color_to_use};background-color:{TABLE_BACKGROUND_COLOR};font-family:{style_token("font")};text-align:left">\n<tr>\n<th>Name</th>\n<th>Value</th>\n</tr>'
         PrimeItems.output_lines.add_line_to_output(
             5,
             table_definition,
@@ -0,0 +1,163 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# guiai: run the Ai analysis from the GUI, streaming the response as it comes          #
+#                                                                                      #
+#        The selected Project/Profile/Task is mapped and sent to the model (see        #
+#        aibatch.py) in a worker thread.  The worker puts each chunk of the response   #
+#        on a queue as the model writes it, and the GUI takes them off the queue      #
+#        every AI_POLL_MS and adds them to the Analysis view.  So the response shows   #
+#        up as it is written, and the GUI stays responsive in the meantime.            #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import queue
+import threading
+
+from maptasker.src.initparg import initialize_runtime_arguments
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.sysconst import ANALYSIS_FILE, OPENAI_MODELS, logger
+
+AI_POLL_MS = 50  # How often the GUI checks for more of the response, in milliseconds
+
+
+# Get the object to analyze, from the GUI's selection.
+def get_selected_object(self) -> tuple:  # noqa: ANN001
+    """
+    Get the Project/Profile/Task selected in the GUI, as map_ai would.
+        Args:
+            self: The GUI (MyGui) instance
+
+        Returns:
+            tuple: "Project"/"Profile"/"Task" and the object's name, or ("", "") if nothing
+                is selected.
+    """
+    for ai_object in ("Project", "Profile", "Task"):
+        if name := getattr(self, f"single_{ai_object.lower()}_name"):
+            return ai_object, name
+    return "", ""
+
+
+# Analyze the object (run in the worker thread).
+def analyze_the_object(analysis: dict, responses: queue.Queue) -> None:
+    """
+    Map the object, send it to the model and put each chunk of the response on the queue
+    as it comes.  The last thing put on the queue is the AiResult (run in the worker thread).
+        Args:
+            analysis (dict): what to analyze: "model" (render.Model), "ai_object", "name",
+                "options", "ai_model", "prompt" and "api_key".
+            responses (queue.Queue): where the chunks and the result go.
+
+        Returns:
+            None
+    """
+    from maptasker.src.aibatch import AiResult, analyze_queries, get_ai_queries
+
+    item = (analysis["ai_object"], analysis["name"])
+    try:
+        queries = get_ai_queries(analysis["model"], [item], analysis["options"], analysis["prompt"])
+
+        async def analyze() -> list:
+            return await analyze_queries(
+                queries,
+                analysis["ai_model"],
+                api_key=analysis["api_key"],
+                stream=lambda _, chunk: responses.put(chunk),
+            )
+
+        if analysis["ai_model"] in OPENAI_MODELS:
+            (result,) = asyncio.run(analyze())
+        else:
+            from maptasker.src import cria
+
+            # Make sure the local model is up.
+            with cria.Model(analysis["ai_model"]):
+                (result,) = asyncio.run(analyze())
+    except Exception as e:  # noqa: BLE001
+        logger.debug(f"guiai: analysis failed: {e}")
+        result = AiResult(*item, "", f"Ai analysis error: {e}", False)
+    responses.put(result)
+
+
+# Run the analysis in the background, showing the response in the Analysis view as it comes.
+def analyze_in_background(self) -> bool:  # noqa: ANN001
+    """
+    Analyze the selected Project/Profile/Task in a worker thread, adding the response to
+    the Analysis view as the model writes it.  Returns at once: the GUI carries on while
+    the analysis runs.  When it is done, the response is saved in ANALYSIS_FILE.
+        Args:
+            self: The GUI (MyGui) instance
+
+        Returns:
+            bool: True if the analysis was started, False if one is already running or
+                nothing is selected.
+    """
+    from maptasker.src.aibatch import AiResult
+    from maptasker.src.crossref import get_cross_reference
+    from maptasker.src.render import Model
+
+    ai_object, name = get_selected_object(self)
+    if not ai_object or getattr(self, "ai_analyzing", False):
+        return False
+    self.ai_analyzing = True
+
+    # The backup that the GUI has loaded, and the GUI's settings to map the object with.
+    program_arguments = initialize_runtime_arguments()
+    analysis = {
+        "model": Model(PrimeItems.xml_tree, PrimeItems.tasker_root_elements, get_cross_reference(), 0),
+        "ai_object": ai_object,
+        "name": name,
+        "options": {key: getattr(self, key) for key in program_arguments if hasattr(self, key)},
+        "ai_model": self.ai_model,
+        "prompt": self.ai_prompt,
+        "api_key": self.ai_apikey,
+    }
+    responses = queue.Queue()
+    # The worker uses the same run (PrimeItems) as we do.
+    worker = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(analyze_the_object, analysis, responses),
+        name="maptasker-ai",
+        daemon=True,
+    )
+
+    heading = f'Ai Response using model {self.ai_model} for {ai_object} "{name}":\n\n'
+    analysisview = self.display_ai_response(heading)
+    textbox = analysisview.textview_textbox
+
+    def show_the_response() -> None:
+        result = None
+        try:
+            while True:
+                chunk = responses.get_nowait()
+                if isinstance(chunk, AiResult):
+                    result = chunk
+                    break
+                if textbox.winfo_exists():
+                    textbox.insert("end", chunk)
+                    textbox.see("end")
+        except queue.Empty:
+            pass
+        if result is None:
+            self.after(AI_POLL_MS, show_the_response)
+            return
+
+        # Done.
+        worker.join()
+        self.ai_analyzing = False
+        if result.error:
+            if textbox.winfo_exists():
+                textbox.insert("end", result.error)
+            self.display_message_box(result.error, "Red")
+            return
+        with open(ANALYSIS_FILE, "w") as response_file:
+            response_file.write(f"{heading}{result.response}")
+        self.display_message_box(f"Analysis response saved in {ANALYSIS_FILE}.", "Turquoise")
+
+    logger.debug(f"guiai: analyzing {ai_object} {name} with {self.ai_model} in the background")
+    worker.start()
+    self.after(AI_POLL_MS, show_the_response)
+    return True
@@ -0,0 +1,155 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# guiload: load the backup xml for the GUI, showing the progress                      #
+#                                                                                      #
+#          The xml is parsed, and its cross-reference index built, in a worker         #
+#          thread so that the GUI stays responsive.  A progress bar shows how much     #
+#          of the file has been parsed.  The GUI waits for the load in its own event   #
+#          loop (wait_variable), checking on the worker every LOAD_POLL_MS.            #
+#          A backup fetched from the Android device shows the progress of its          #
+#          download in a progress bar too.                                             #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import contextvars
+import threading
+from tkinter import BooleanVar
+
+from maptasker.src.crossref import get_cross_reference
+from maptasker.src.maputils import validate_xml_file
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.sysconst import logger
+from maptasker.src.taskerd import get_the_xml_data
+
+LOAD_POLL_MS = 50  # How often the GUI checks on the load, in milliseconds
+
+
+# Create a progress bar window.
+def make_progress_bar(title: str) -> object:
+    """
+    Create a progress bar window for the load/download.
+        Args:
+            title (str): the window title
+
+        Returns:
+            ProgressbarWindow: the progress bar window
+    """
+    # Imported here since guiwins imports guiutils, which imports us.
+    from maptasker.src.guiwins import ProgressbarWindow
+
+    # Make sure we have a geometry set for the progress bar
+    if not PrimeItems.program_arguments["map_window_position"]:
+        PrimeItems.program_arguments["map_window_position"] = "300x200+600+0"
+    progress_bar = ProgressbarWindow()
+    progress_bar.progressbar.configure(width=300, height=30)
+    progress_bar.title(title)
+    return progress_bar
+
+
+# Fetch the backup file from the Android device and validate it, showing the progress of the download.
+def fetch_and_validate_xml_file(ip_address: str, port: str, android_file: str) -> tuple:
+    """
+    Fetch the backup file from the Android device and validate it, showing the progress of
+    the download in a progress bar.
+        Args:
+            ip_address (str): IP address of the Android device
+            port (str): port of the Tasker server on the Android device
+            android_file (str): location of the backup file on the Android device
+
+        Returns:
+            tuple: the return code and error message from validate_xml_file.
+    """
+    progress_bar = make_progress_bar("Fetching XML")
+
+    def progress(bytes_done: int, bytes_total: int) -> None:
+        if bytes_total:
+            progress_bar.progressbar.set(min(bytes_done / bytes_total, 1))
+            progress_bar.title(f"Fetching XML: {min(bytes_done * 100 // bytes_total, 100)}%")
+        progress_bar.update()
+
+    try:
+        return validate_xml_file(ip_address, port, android_file, progress)
+    finally:
+        progress_bar.destroy()
+
+
+# Load the xml in the worker thread.
+def load_the_xml(load: dict) -> None:
+    """
+    Load the backup xml and build its cross-reference index (run in the worker thread).
+        Args:
+            load (dict): the state of the load, shared with the GUI: "bytes_read",
+                "file_size", "indexing", "return_code" and "exception".
+
+        Returns:
+            None
+    """
+
+    def progress(bytes_read: int, file_size: int) -> None:
+        load["bytes_read"] = bytes_read
+        load["file_size"] = file_size
+
+    try:
+        load["return_code"] = get_the_xml_data(progress)
+        if load["return_code"] == 0:
+            load["indexing"] = True
+            get_cross_reference()
+    except Exception as e:  # noqa: BLE001
+        # Raised again in the GUI's thread, as if the load had been done there.
+        load["exception"] = e
+
+
+# Load the xml in the background, showing its progress.
+def load_xml_in_background(self) -> int:  # noqa: ANN001
+    """
+    Load the backup xml (PrimeItems.file_to_get) in a worker thread, showing the progress
+    of the load, and wait for it while the GUI carries on.
+        Args:
+            self: The GUI (MyGui) instance
+
+        Returns:
+            int: the return code from get_the_xml_data: 0 if okay, non-zero if error.
+    """
+    if getattr(self, "loading_xml", False):
+        PrimeItems.error_msg = "The XML is already being loaded."
+        return 1
+    self.loading_xml = True
+
+    load = {"bytes_read": 0, "file_size": 0, "indexing": False, "return_code": 1, "exception": None}
+    # The worker uses the same run (PrimeItems) as we do.
+    worker = threading.Thread(
+        target=contextvars.copy_context().run,
+        args=(load_the_xml, load),
+        name="maptasker-load-xml",
+        daemon=True,
+    )
+
+    progress_bar = make_progress_bar("Loading XML")
+    loaded = BooleanVar(master=self, value=False)
+
+    def check_the_load() -> None:
+        if not worker.is_alive():
+            loaded.set(True)
+            return
+        if load["indexing"]:
+            progress_bar.title("Indexing XML")
+        elif load["file_size"]:
+            progress_bar.progressbar.set(load["bytes_read"] / load["file_size"])
+            progress_bar.title(f"Loading XML: {load['bytes_read'] * 100 // load['file_size']}%")
+        self.after(LOAD_POLL_MS, check_the_load)
+
+    logger.debug(f"guiload: loading {PrimeItems.file_to_get.name} in the background")
+    worker.start()
+    try:
+        self.after(LOAD_POLL_MS, check_the_load)
+        self.wait_variable(loaded)
+    finally:
+        worker.join()
+        progress_bar.destroy()
+        self.loading_xml = False
+
+    if load["exception"] is not None:
+        raise load["exception"]
+    return load["return_code"]
@@ -15,7 +15,6 @@ import os
 import platform
 import sys
 import time
-from tkinter import font
 from typing import TYPE_CHECKING, Callable
 
 import customtkinter as ctk
@@ -23,17 +22,18 @@ import darkdetect
 from PIL import Image
 
 from maptasker.src.colrmode import set_color_mode
+from maptasker.src.crossref import get_cross_reference
+from maptasker.src.droidnet import get_list_of_files
+from maptasker.src.fonts import get_mono_font_families
 from maptasker.src.getids import get_ids
+from maptasker.src.guiload import fetch_and_validate_xml_file, load_xml_in_background
 from maptasker.src.lineout import LineOut
 from maptasker.src.maputils import (
     append_item_to_list,
     get_pypi_version,
-    http_request,
     validate_ip_address,
     validate_port,
-    validate_xml_file,
 )
-from maptasker.src.nameattr import get_tk
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.profiles import get_profile_tasks
 from maptasker.src.proginit import get_data_and_output_intro
@@ -46,6 +46,7 @@ from maptasker.src.sysconst import (
     KEYFILE,
     NOW_TIME,
     OPENAI_MODELS,
+    UNKNOWN_TASK_NAME,
     VERSION,
     Colors,
     logger,
@@ -117,7 +118,7 @@ def valid_item(self, the_name: str, element_name: str, debug: bool, appearance_m
         _ = self.prompt_and_get_file(self.debug, self.appearance_mode)
 
     # Get the XML data
-    return_code = get_xml(debug, appearance_mode)
+    return_code = get_xml(self, debug, appearance_mode)
 
     # Did we get an error reading the backup file?
     if return_code > 0:
@@ -140,9 +141,10 @@ def valid_item(self, the_name: str, element_name: str, debug: bool, appearance_m
 
 
 # Get the XML data and setup Primeitems
-def get_xml(debug: bool, appearance_mode: str) -> int:
+def get_xml(self, debug: bool, appearance_mode: str) -> int:  # noqa: ANN001
     """ "Returns the tasker root xml items from the backup xml file based on the given debug and appearance mode parameters."
     Parameters:
+        self: The GUI instance, which shows the progress while the xml is loaded in the background.
         debug (bool): Indicates whether the program is in debug mode or not.
         appearance_mode (str): Specifies the color mode to be used.
     Returns:
@@ -162,25 +164,21 @@ def get_xml(debug: bool, appearance_mode: str) -> int:
     PrimeItems.colors_to_use = set_color_mode(appearance_mode)
     PrimeItems.output_lines = LineOut()
 
-    return get_data_and_output_intro(False)
+    return get_data_and_output_intro(False, lambda: load_xml_in_background(self))
 
 
 # Get all monospace fonts from TKInter
-def get_mono_fonts() -> None:
+def get_mono_fonts() -> dict:
     """
     Returns a dictionary of fixed-width fonts
     Args:
-        self: The class instance
+        None
     Returns:
-        dict: A dictionary of fixed-width fonts and their family names
-    - Get all available fonts from the font module
-    - Filter fonts to only those with a fixed width
-    - Build a dictionary with font name as key and family as value
+        dict: A dictionary of fixed-width font families
+    - Get the fixed-width font families, from the font cache if we can (see fonts.py)
+    - Build a dictionary with the family as key and value
     """
-    # Make sure we have the Tkinter window/root
-    get_tk()
-    fonts = [font.Font(family=f) for f in font.families()]
-    return {f.name: f.actual("family") for f in fonts if f.metrics("fixed")}
+    return {family: family for family in get_mono_font_families()}
 
 
 # Build list of all available monospace fonts
@@ -293,6 +291,8 @@ def clear_android_buttons(self) -> None:  # noqa: ANN001
         self.filelist_label.destroy()
     with contextlib.suppress(AttributeError):
         self.filelist_option.destroy()
+    with contextlib.suppress(AttributeError):
+        self.fetch_exports_button.destroy()
     if not self.first_time:  # If first time, don't destory Upgrade and What's New buttons.
         with contextlib.suppress(AttributeError):
             self.list_files_query_button.destroy()
@@ -369,38 +369,6 @@ def is_new_version() -> bool:
     return False
 
 
-# List the XML files on the Android device
-def get_list_of_files(ip_address: str, ip_port: str, file_location: str) -> tuple:
-    """Get list of files from given IP address.
-    Parameters:
-        - ip_address (str): IP address to connect to.
-        - ip_port (str): Port number to connect to.
-        - file_location (str): Location of the file to retrieve.
-    Returns:
-        - tuple: Return code and list of file locations.
-    Processing Logic:
-        - Retrieve file contents using http_request.
-        - If return code is 0, split the decoded string into a list and return.
-        - Otherwise, return error with empty string."""
-
-    # Get the contents of the file.
-    return_code, file_contents = http_request(ip_address, ip_port, file_location, "maplist", "?xml")
-
-    # If good return code, get the list of XML file locations into a list and return.
-    if return_code == 0:
-        decoded_string = (file_contents.decode("utf-8")).split(",")
-        # Strip off the count field
-        for num, item in enumerate(decoded_string):
-            temp_item = item[:-3]  # Drop last 3 characters
-            decoded_string[num] = temp_item.replace("/storage/emulated/0", "")
-        # Remove items that are in the trash
-        final_list = [item for item in decoded_string if ".Trash" not in item]
-        return 0, final_list
-
-    # Otherwise, return error
-    return return_code, file_contents
-
-
 # Write out the changelog
 def create_changelog() -> None:
     """Create changelog file."""
@@ -971,16 +939,11 @@ def validate_or_filelist_xml(
     """
     # If we don't yet have the file, then get it from the Android device.
     if len(android_file) != 0 and android_file != "" and self.list_files == False:
-        return_code, file_contents = http_request(android_ipaddr, android_port, android_file, "file", "?download=1")
-
-        # Validate XML file.
-        if return_code == 0:
-            PrimeItems.program_arguments["gui"] = True
-            return_code, error_message = validate_xml_file(android_ipaddr, android_port, android_file)
-            if return_code != 0:
-                self.display_message_box(error_message, "Red")
-                return 1, android_ipaddr, android_port, android_file
-        else:
+        # Get and validate the XML file.
+        PrimeItems.program_arguments["gui"] = True
+        return_code, error_message = fetch_and_validate_xml_file(android_ipaddr, android_port, android_file)
+        if return_code != 0:
+            self.display_message_box(error_message, "Red")
             return 1, android_ipaddr, android_port, android_file
 
     # File location not provided.  Get the list of all XML files from the Android device and present it to the user.
@@ -1018,6 +981,23 @@ def validate_or_filelist_xml(
             (50, 10),
             "w",
         )
+        # Add 'Fetch All Exports' button, to get every Project/Profile/Task/Scene export in the list at once.
+        self.fetch_exports_button = add_button(
+            self,
+            self,
+            "#246FB6",
+            "",
+            "#1bc9ff",
+            self.event_handlers.fetch_exports_event,
+            2,  # border width
+            "Fetch All Exports",
+            1,  # column span
+            8,  # row
+            1,  # column
+            (200, 0),
+            (0, 0),
+            "nw",
+        )
         # Add 'Cancel Entry' button.
         add_cancel_button(self, row=8, delta_y=0)
 
@@ -1269,8 +1249,8 @@ def get_tasker_objects(self) -> tuple:  # noqa: ANN001
     """
     Retrieves the projects, profiles, and tasks available in the XML file.
 
-    This function checks if the XML file has already been loaded. If not, it loads the XML file and builds the tree data.
-    Then, it goes through each project and retrieves all the profile names and tasks.
+    The Projects' Profiles and Tasks are taken from the cross-reference index (see crossref.py), rather than
+    by walking through the xml of each Project and Profile.
     The profile names and tasks are cleaned up by removing the "Profile: Unnamed/Anonymous" and "Task: Unnamed/Anonymous." entries.
     If there are no profiles or tasks found, a message box is displayed and the function returns False.
     The profile names and tasks are then sorted alphabetically and duplicates are removed.
@@ -1285,20 +1265,26 @@ def get_tasker_objects(self) -> tuple:  # noqa: ANN001
     projects_to_display = []
     profiles = []
     tasks = []
-    # Build the tree of Tasker objects
-    tree_data = self.build_the_tree()
-    # If no tree data, then we don't have any Projects.  Just get the Profiles and Tasks.
-    if not tree_data:
-        profiles = [value["name"] for value in PrimeItems.tasker_root_elements["all_profiles"].values()]
-        tasks = [value["name"] for value in PrimeItems.tasker_root_elements["all_tasks"].values()]
-    # We have the Tasker objects.  Collect all Projects, Profiles and Tasks from the tree data.
+    root = PrimeItems.tasker_root_elements
+    # If no Projects, just get the Profiles and Tasks.
+    if not root["all_projects"]:
+        profiles = [value["name"] for value in root["all_profiles"].values()]
+        tasks = [value["name"] for value in root["all_tasks"].values()]
+    # Collect all Projects, and their Profiles and Tasks, from the cross-reference index.
     else:
-        for project in tree_data:
-            projects_to_display.append(project["name"])
-            for profile in project["children"]:
-                with contextlib.suppress(TypeError):
-                    profiles.append(profile["name"])
-                    tasks.extend(profile["children"])
+        cross_reference = get_cross_reference()
+        for project_name, project in root["all_projects"].items():
+            projects_to_display.append(f"Project: {project['name']}")
+            # Projects without Profiles don't have any Profiles or Tasks to list.
+            if profile_ids := cross_reference["project_profiles"].get(project_name, []):
+                profile_names, task_names = get_project_objects(
+                    profile_ids,
+                    cross_reference["project_tasks"].get(project_name, []),
+                    cross_reference["profile_tasks"],
+                )
+                profiles.extend(profile_names)
+                tasks.extend(task_names)
+
     # Clean up the object lists by removing anonymous or missing objects.
 
     profiles_to_display = [profile for profile in profiles if profile != "Profile: Unnamed/Anonymous"]
@@ -1324,6 +1310,48 @@ def get_tasker_objects(self) -> tuple:  # noqa: ANN001
     return True, projects_to_display, profiles_to_display, tasks_to_display
 
 
+# Get the names of a Project's Profiles and Tasks.
+def get_project_objects(profile_ids: list, task_ids: list, profile_tasks: dict) -> tuple:
+    """
+    Get the names of a Project's Profiles and Tasks, to be listed for selection.
+        Args:
+            profile_ids (list): the Project's Profile IDs
+            task_ids (list): the Project's Task IDs
+            profile_tasks (dict): Profile ID: list of its Task IDs (from the cross-reference index)
+
+        Returns:
+            tuple: list of Profile names ("Profile: xxx") and list of Task names ("Task: xxx").
+    """
+    all_profiles = PrimeItems.tasker_root_elements["all_profiles"]
+    all_tasks = PrimeItems.tasker_root_elements["all_tasks"]
+    profile_names = []
+    task_names = []
+    found_tasks = []
+    for profile_id in profile_ids:
+        # Get the Profile's Tasks
+        if profile_task_ids := profile_tasks.get(profile_id, []):
+            for task_id in profile_task_ids:
+                task_name = (all_tasks[task_id]["name"] if task_id.isdigit() else "") or UNKNOWN_TASK_NAME
+                task_names.append(f"Task: {task_name}")
+                found_tasks.append(task_name)  # Keep track of found tasks
+        else:
+            task_names.append("No Profile Tasks Found")
+
+        # Get the Profile name.
+        profile_name = all_profiles[profile_id]["name"]
+        profile_names.append(f"Profile: {profile_name}" if profile_name else "Profile: Unnamed/Anonymous")
+
+    # Now add tasks that are not found in any Profile that belong to the Project
+    no_profile_tasks = [
+        all_tasks[task_id]["name"] for task_id in task_ids if all_tasks[task_id]["name"] not in found_tasks
+    ]
+    if no_profile_tasks:
+        profile_names.append("No Profile")
+        task_names.extend(no_profile_tasks)
+
+    return profile_names, task_names
+
+
 # Build a list of Profiles that are under the given project
 def build_profiles(root: dict, profile_ids: list, project: defusedxml.ElementTree) -> list:
     """Parameters:
@@ -2300,6 +2300,9 @@ def initialize_variables(self) -> None:  # noqa: ANN001
     self.outline = False
     self.preferences = None
     self.pretty = False
+    self.profiling = False
+    self.profiling_cprofile = False  # Only set from the command line (see runprof.py)
+    self.profiling_memory = 0
     self.rerun = None
     self.reset = None
     self.restore = False
@@ -3223,6 +3226,19 @@ def initialize_screen(self: object) -> None:  # noqa: PLR0915
         "w",
         "#6563ff",
     )
+    # Profiling
+    self.profiling_checkbox = add_checkbox(
+        self,
+        self.tabview.tab("Debug"),
+        self.event_handlers.profiling_checkbox_event,
+        "Profile the Run",
+        5,
+        3,
+        20,
+        10,
+        "w",
+        "#6563ff",
+    )
 
 
 # Delete the windows
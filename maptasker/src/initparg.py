@@ -50,8 +50,12 @@ def initialize_runtime_arguments() -> dict:
         "view_limit": 10000,  # Map view limit
         "map_window_position": "",  # Last-used map window position
         "outline": False,  # Outline Project/Profile?Task/Scene names
+        "parallel": 0,  # Number of worker processes to render Projects with (0 = none)
         "preferences": False,  # Display Tasker's preferences
         "pretty": False,  # Pretty up the output (takes many more output lines)
+        "profiling": False,  # Record the time taken by each phase/Project of the run (see runprof.py)
+        "profiling_cprofile": False,  # Also profile the run with cProfile
+        "profiling_memory": 0,  # Also report the N places that allocated the most memory (0 = none)
         "rerun": False,  # Is this a GUI re-run?
         "reset": False,  # Reset settings to default values
         "runtime": False,  # Display the runtime arguments/settings
@@ -25,13 +25,23 @@ styling and structure based on the type of element being displayed. The output l
 are accumulated and ultimately used to generate the final HTML output file.
 """
 
-from maptasker.src.dirout import add_directory_item
-from maptasker.src.format import format_html
+from __future__ import annotations
+
+import contextlib
+from typing import TYPE_CHECKING
+
+from maptasker.src.addcss import apply_style
+from maptasker.src.dirout import add_directory_item, output_directory
+from maptasker.src.format import format_html, format_line
 from maptasker.src.frontmtr import output_the_front_matter
 from maptasker.src.primitem import PrimeItems
+from maptasker.src.runprof import profile_phase
 from maptasker.src.sysconst import UNKNOWN_TASK_NAME, FormatLine, debug_out, logger
 from maptasker.src.xmldata import remove_html_tags
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 
 # Class definition for our output lines
 class LineOut:
@@ -541,7 +551,7 @@ class LineOut:
         if PrimeItems.program_arguments["ai_analyze"]:
             # Format thew output line.
             # out_string = self.format_line_out(out_string, list_level)
-            PrimeItems.ai["output_lines"].append(remove_html_tags(out_string, ""))
+            PrimeItems.ai["output_lines"].append(remove_html_tags(apply_style(out_string), ""))
 
         # Go configure the output based on the contents of the element and the
         #   list level. Call format_line before appending it.
@@ -556,3 +566,71 @@ class LineOut:
         if debug_out:
             debug_msg = f"out_string: {self.output_lines[-1]}"
             logger.debug(debug_msg)
+
+
+# Get the final html for our output lines, as it is to be written out.
+def get_html_lines() -> Iterator[str]:
+    """
+    Get the final html for each of our queued output lines, including the directory,
+    with the current colors and font.
+        Args:
+            None
+
+        Returns:
+            Iterator[str]: the html strings, in the order they are to be written out.
+    """
+    for output_line in get_unstyled_html_lines():
+        yield apply_style(output_line)
+
+
+# Get the html for our output lines, with the style tokens still in it (see addcss).
+def get_unstyled_html_lines() -> Iterator[str]:
+    """
+    Get the html for each of our queued output lines, including the directory, with
+    style tokens in place of the colors and font.  The html is the same for any colors
+    and font, and apply_style gets the final html from it.
+        Args:
+            None
+
+        Returns:
+            Iterator[str]: the html strings, in the order they are to be written out.
+    """
+    for item in PrimeItems.output_lines.output_lines:
+        # Check to see if this is where the directory is to go in the
+        # Output directory. if so, output_directory will create it's own list of
+        # output lines.
+        if "maptasker_directory" in item:
+            # Temporarily save our output lines
+            temp_lines_out = PrimeItems.output_lines.output_lines
+            PrimeItems.output_lines.output_lines = []  # Create a new output queue
+
+            # Do the directory output
+            if PrimeItems.program_arguments["directory"]:
+                with profile_phase("directory"):
+                    output_directory()
+            # Output the directory line
+            directory_lines = PrimeItems.output_lines.output_lines
+            # Restore our regular output
+            PrimeItems.output_lines.output_lines = temp_lines_out
+            yield from directory_lines
+            continue
+
+        # Format the output line
+        output_line = format_line(item)
+        # Continue if we are to ignore this output line.
+        if not output_line:
+            continue
+
+        # Parse twisty <details>...yield result
+        with contextlib.suppress(ValueError):
+            details_position = output_line.index("<details>")
+            yield f" {output_line[:details_position]}"
+            yield "<details>\r"
+            output_line = f"    {output_line[details_position + 9:]}"
+
+        # The actual final line as html
+        if output_line.strip():  # Write out if not blank
+            logger.info(f"Writing: {output_line}")
+            yield output_line
+        if debug_out:
+            logger.debug(f"mapit output line:{output_line}")
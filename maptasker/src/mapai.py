@@ -5,21 +5,32 @@
 #                                                                                      #
 # mapai: Ai support                                                                    #
 #                                                                                      #
+import asyncio
 import contextlib
 import importlib.util
-import os
 import sys
 
 # import cria
 from openai import OpenAI, OpenAIError
 
 from maptasker.src import cria
-from maptasker.src.config import AI_PROMPT
+from maptasker.src.aibatch import (
+    AiQuery,
+    analyze_queries,
+    build_ai_query,
+    cache_response,
+    cleanup_output,
+    estimate_tokens,
+    get_ai_messages,
+    get_ai_prompt,
+    get_cached_response,
+    get_openai_api_key,
+    get_token_budget,
+)
 from maptasker.src.error import error_handler
-from maptasker.src.guiutils import get_api_key
 from maptasker.src.guiwins import PopupWindow
 from maptasker.src.primitem import PrimeItems
-from maptasker.src.sysconst import ANALYSIS_FILE, ERROR_FILE, KEYFILE, OPENAI_MODELS
+from maptasker.src.sysconst import ANALYSIS_FILE, ERROR_FILE, OPENAI_MODELS
 
 
 # Determine if a module is available or not.
@@ -73,7 +84,7 @@ def record_response(response: str, ai_object: str, item: str) -> None:
 
 
 # Do local Ai processing.
-def local_ai(query: str, ai_object: str, item: str) -> None:
+def local_ai(query: str, ai_object: str, item: str) -> str | None:
     """
     Perform local AI processing on the given query.
 
@@ -83,7 +94,7 @@ def local_ai(query: str, ai_object: str, item: str) -> None:
         item (str): the object's name
 
     Returns:
-        None: This function does not return anything.
+        str | None: The response, or None if there was an error.
 
     Description:
         This function performs local AI processing on the given query using the specified model.
@@ -102,29 +113,19 @@ def local_ai(query: str, ai_object: str, item: str) -> None:
     # Fix the model name
     if PrimeItems.program_arguments["ai_model"] == "None":
         error_handler("No model selected.", 12)
-        return
+        return None
 
     print(f"Model: {PrimeItems.program_arguments['ai_model']}")
     # print(f"Query: {query}")
 
-    # Prep the querey for the model.
-    prompt = query.split(":")[0]  # Skip the first character, which is a colon.
-    context = query.replace(prompt[1:], "")  # All of the Project/Profile/Task data
-    messages = [
-        {
-            "role": "system",
-            "content": f"You are a programmer using Tasker, and Android task management tool. The program code follows, with each line separated by '\n'. {prompt}:{context}",
-        },
-        {"role": "user", "content": context},
-    ]
-    response = ""
+    # Prep the querey for the model: the Project/Profile/Task data, then the prompt.
+    messages = get_ai_messages(query, PrimeItems.program_arguments["ai_model"])
     ai = cria.Cria()
 
     # Open the model and get the response
     try:
         with cria.Model(PrimeItems.program_arguments["ai_model"]) as ai:
-            for chunk in ai.chat(messages=messages, prompt=prompt):
-                response = f"{response}{chunk}"
+            response = "".join(ai.chat(messages=messages))
             ai.clear()
 
         # Open error file, since we're going to queue up the response in this file for display back to the GUI.
@@ -135,6 +136,8 @@ def local_ai(query: str, ai_object: str, item: str) -> None:
             f"Ai analysis error: {e}.  Try again.",
             12,
         )
+        return None
+    return response
 
 
 # Handle ChatGPT Error
@@ -166,7 +169,7 @@ def process_error(error: str, ai_object: str, item: str) -> None:
 
 
 # Do server-side ChatGPT Ai processing.
-def server_openai(query: str, ai_object: str, item: str) -> None:
+def server_openai(query: str, ai_object: str, item: str) -> str | None:
     """
     Sends a query to the OpenAI API to generate a completion using the specified model.
 
@@ -176,72 +179,66 @@ def server_openai(query: str, ai_object: str, item: str) -> None:
         item (str): the object's name
 
     Returns:
-        None: This function does not return anything.
+        str | None: The response, or None if there was an error.
     """
     # Make sure openai is available.
     if PrimeItems.program_arguments["ai_analyze"] and not module_is_available("openai"):
         error_handler("Module 'openai' not found.  Please install the 'openai'a.", 12)
-        return
-
-    # Get the api key
-    if PrimeItems.program_arguments["ai_apikey"] == "Hidden" and os.path.isfile(KEYFILE):
-        apikey = get_api_key  # Get the key from the file
-    else:
-        apikey = PrimeItems.program_arguments["ai_apikey"]
+        return None
 
     # Set up the OpenAI client and send the query
-    client = OpenAI(api_key=apikey)
+    client = OpenAI(api_key=get_openai_api_key())
 
     try:
         stream_feed = client.chat.completions.create(
             model=PrimeItems.program_arguments["ai_model"],
-            messages=[{"role": "system", "content": "You are a Tasker programmer"}, {"role": "user", "content": query}],
+            messages=get_ai_messages(query, PrimeItems.program_arguments["ai_model"]),
             stream=True,
         )
 
-        response = ""
-        for chunk in stream_feed:
-            response += chunk.choices[0].delta.content or ""
-            # print(chunk.choices[0].delta.content or "", end="")
+        response = "".join(chunk.choices[0].delta.content or "" for chunk in stream_feed)
         # Open error file, since we're going to queue up the response in this file for display back to the GUI.
         record_response(response, ai_object, item)
 
     # Handle all OpenAI API errors
     except OpenAIError as e:
         process_error(str(e), ai_object, item)
+        return None
 
     except Exception as e:  # noqa: BLE001
         # Open error file, since we're going to queue up the response in this file for display back to the GUI.
         with open(ERROR_FILE, "w") as response_file:
             response_file.write(f"OpenAi failed with error: {e!s}")
+        return None
+    return response
 
 
-# Clean up the output list since it has all the front matter and we only need
-# the object (Project/Profile/Task)
-def cleanup_output() -> list:
+# Analyze an object that is too big for one query in parts.
+def analyze_in_parts(ai_object: str, item: str, ai_model: str) -> None:
     """
-    A function that cleans up the output list in prepartion of the query.
+    Analyze the object in parts that fit the model, and merge the analyses (see
+    aibatch.analyze_queries).  The response or error is recorded for the GUI.
+
+    Args:
+        ai_object (str): The object to be analyzed: Project, Profile or Task.
+        item (str): the object's name
+        ai_model (str): the model
 
     Returns:
-        list: The cleaned up output list.
+        None: This function does not return anything.
     """
-    # Delete everything up to the Profile.
-    temp_output = []
-    got_it = False
-    for line in PrimeItems.ai["output_lines"]:
-        if "Profile:" in line or "Project:" in line or "Task:" in line:
-            got_it = True
-        if got_it:
-            # Ignore blank lines.
-            if not line:
-                continue
-            # Quit if at end of Project.
-            if "Tasks not in any Profile," in line:
-                break
-            temp_line = line.replace("&nbsp;", " ")
-            temp_output.append(temp_line)
-
-    return temp_output
+    query = AiQuery(ai_object, item, cleanup_output(PrimeItems.ai["output_lines"]), get_ai_prompt(), "")
+    if ai_model in OPENAI_MODELS:
+        (result,) = asyncio.run(analyze_queries([query], ai_model))
+    else:
+        # Make sure the local model is up.
+        with cria.Model(ai_model):
+            (result,) = asyncio.run(analyze_queries([query], ai_model))
+
+    if result.error:
+        process_error(result.error, ai_object, item)
+    else:
+        record_response(result.response, ai_object, item)
 
 
 # Map Ai: set up Ai query and call appropriate function based on the model.
@@ -250,6 +247,7 @@ def map_ai() -> None:
     A function that determines whether to call the OpenAI or local AI routine based on the model specified in PrimeItems.
 
     Does the setup for the query by concatenating the lines in PrimeItems.ai["output_lines"].
+    The response is taken from the cache if we already have it (see aibatch.py).
     """
     # Display a popup window telling user we are analyzing
     popup = PopupWindow(
@@ -260,9 +258,6 @@ def map_ai() -> None:
     )
     popup.mainloop()
 
-    # Clean up the output list since it has all the front matter and we only need the object (Project/Profile/Task)
-    temp_output = cleanup_output()
-
     # Save the ai popup window position
     with contextlib.suppress(AttributeError):
         PrimeItems.program_arguments["ai_popup_window_position"] = popup.ai_popup_window_position
@@ -278,22 +273,31 @@ def map_ai() -> None:
         ai_object = "Task"
         item = PrimeItems.program_arguments["single_task_name"]
 
-    # Put the query together
-    prompt = PrimeItems.program_arguments["ai_prompt"] if PrimeItems.program_arguments["ai_prompt"] else AI_PROMPT
-    if not prompt.endswith(":"):
-        prompt = f"{prompt}:"
-    query = f"Given the following {ai_object} in Tasker, an Android automation tool, {prompt}"
-    for line in temp_output:
-        query += f"{line}\n"
+    # Put the query together, with only the object (Project/Profile/Task) from the output.
+    query = build_ai_query(ai_object, PrimeItems.ai["output_lines"])
 
     # Let the user know what is going on.
     print(f"MapTasker analysis for {ai_object} '{item}' is running in the background.  Please wait...")
 
+    # If the object hasn't changed since we last analyzed it with this model, we already have the response.
+    ai_model = PrimeItems.program_arguments["ai_model"]
+    messages = get_ai_messages(query, ai_model)
+    if (response := get_cached_response(ai_model, messages)) is not None:
+        record_response(response, ai_object, item)
+
+    # Too big for the model to take in one go: analyze it in parts, and merge the analyses.
+    elif sum(estimate_tokens(message["content"]) for message in messages) > get_token_budget(ai_model):
+        print(f"{ai_object} '{item}' is too big for {ai_model} to analyze at once.  It is analyzed in parts.")
+        analyze_in_parts(ai_object, item, ai_model)
+
     # Call appropriate AI routine: OpenAI or local Ollama
-    if PrimeItems.program_arguments["ai_model"] in OPENAI_MODELS:
-        server_openai(query, ai_object, item)
     else:
-        local_ai(query, ai_object, item)
+        if ai_model in OPENAI_MODELS:
+            response = server_openai(query, ai_object, item)
+        else:
+            response = local_ai(query, ai_object, item)
+        if response is not None:
+            cache_response(ai_model, messages, response)
 
     # Indicate that we are done
     PrimeItems.program_arguments["ai_analyze"] = False
@@ -31,35 +31,36 @@ import contextlib
 import functools
 import gc
 import inspect
+import json
 import os
 import platform
 import sys
+import threading
 import webbrowser
 from subprocess import run
 
 import maptasker.src.proginit as initialize
 import maptasker.src.taskuniq as special_tasks
 from maptasker.src import projects
+from maptasker.src.actiond import log_learned_action_codes
+from maptasker.src.addcss import apply_style
 from maptasker.src.caveats import display_caveats
-from maptasker.src.dirout import output_directory
 from maptasker.src.error import error_handler
-from maptasker.src.format import format_line
 from maptasker.src.getputer import save_restore_args
 from maptasker.src.globalvr import get_variables, output_variables
 from maptasker.src.initparg import initialize_runtime_arguments
-from maptasker.src.lineout import LineOut
-from maptasker.src.mapai import map_ai
-from maptasker.src.outline import outline_the_configuration
-from maptasker.src.primitem import PrimeItems, PrimeItemsReset
+from maptasker.src.lineout import LineOut, get_unstyled_html_lines
+from maptasker.src.primitem import MapRun, PrimeItems, PrimeItemsReset, use_run
+from maptasker.src.runprof import finish_profiling, profile_count, profile_phase
 from maptasker.src.sysconst import (
     NORMAL_TAB,
     Colors,
     DISPLAY_DETAIL_LEVEL_all_variables,
     FormatLine,
     debug_file,
-    debug_out,
     logger,
 )
+from maptasker.src.taskerd import forget_the_model
 
 # print('Path:', os.getcwd())
 # print(
@@ -76,6 +77,26 @@ from maptasker.src.sysconst import (
 
 crash_debug = False
 
+# The last map written, so that it can be rewritten with new colors/font without mapping it again:
+#   "key": its content key (see get_content_key), "xml_tree": the backup it was mapped from and
+#   "lines": its html without the style (see addcss).
+# It outlives the runs (MapRun), and serves the interactive GUI/CLI process only: the render API
+# and the server keep their own maps (see render.py and modcache.py).  It is only used with its
+# lock held, should a map be written from another thread.
+rendered_map = {}
+rendered_map_lock = threading.Lock()
+
+# Runtime arguments that only change the style of the map, or nothing in it at all.
+STYLE_ARGUMENTS = (
+    "appearance_mode",
+    "font",
+    "parallel",
+    "profiling",
+    "profiling_cprofile",
+    "profiling_memory",
+    "rerun",
+)
+
 
 # Handle program error gracefully if not in debug mode
 def on_crash(exctype: str, value: str, traceback: list) -> None:
@@ -124,6 +145,10 @@ def clean_up_memory() -> None:
     Clean up our memory hogs
         :return:
     """
+    # The backup is about to be cleared: it can no longer be reused by a rerun.
+    forget_the_model()
+    with rendered_map_lock:
+        rendered_map.clear()
     if PrimeItems.xml_tree is not None:
         for elem in PrimeItems.xml_tree.iter():
             elem.clear()
@@ -161,51 +186,91 @@ def write_out_the_file(my_output_dir: str, my_file_name: str) -> None:
         :return: nothing
     """
     logger.info(f"Function Entry: write_out_the_file dir:{my_output_dir}")
+    # Keep the html without its style if the map may be restyled (see restyle_the_map).
+    with rendered_map_lock:
+        keep_lines = rendered_map.get("key") is not None
+    unstyled_lines = []
+    lines_written = 0
     output_file = f"{my_output_dir}{my_file_name}"
     with open(output_file, "w", encoding="utf-8") as out_file:
-        # Output the rest that is in our output queue
-        for item in PrimeItems.output_lines.output_lines:
-            # Check to see if this is where the directory is to go in the
-            # Output directory. if so, output_directory will create it's own list of
-            # output lines.
-            if "maptasker_directory" in item:
-                # Temporarily save our output lines
-                temp_lines_out = PrimeItems.output_lines.output_lines
-                PrimeItems.output_lines.output_lines = []  # Create a new output queue
-
-                # Do the directory output
-                if PrimeItems.program_arguments["directory"]:
-                    output_directory()
-                # Output the directory line
-                for output_line in PrimeItems.output_lines.output_lines:
-                    out_file.write(output_line)
-                # Restore our regular output
-                PrimeItems.output_lines.output_lines = temp_lines_out
-                continue
-
-            # Format the output line
-            # logger.info(item)
-            output_line = format_line(item)
-            # Continue if we are to ignore this output line.
-            if not output_line:
-                continue
-
-            # Parse twisty <details>...yield result
-            with contextlib.suppress(ValueError):
-                details_position = output_line.index("<details>")
-                out_file.write(f" {output_line[:details_position]}")
-                out_file.write("<details>\r")
-                output_line = f"    {output_line[details_position + 9:]}"
-
-            # Write the actual final line out as html
-            if output_line.strip():  # Write out if not blank
-                logger.info(f"Writing: {output_line}")
-                out_file.write(output_line)
-            if debug_out:
-                logger.debug(f"mapit output line:{output_line}")
-                logger.info("Function Exit: write_out_the_file")
+        # Output all that is in our output queue
+        for output_line in get_unstyled_html_lines():
+            if keep_lines:
+                unstyled_lines.append(output_line)
+            out_file.write(apply_style(output_line))
+            lines_written += 1
+        logger.info("Function Exit: write_out_the_file")
 
         os.fsync(out_file)  # Force write to disk
+    profile_count("lines_written", lines_written)
+    if keep_lines:
+        with rendered_map_lock:
+            rendered_map["lines"] = unstyled_lines
+
+
+# Get the key of what is in the map, other than its style.
+def get_content_key() -> str | None:
+    """
+    Get the key of what is in the map: the runtime arguments other than the style
+    arguments (font, etc.), and which colors are used (but not the colors themselves).
+        Args:
+            None
+
+        Returns:
+            str | None: the key, or None if the map can't be restyled: it is not run from
+                the GUI, or it displays the colors/arguments or does more than the map.
+    """
+    program_arguments = PrimeItems.program_arguments
+    if not any(program_arguments[name] for name in ("gui", "guiview", "rerun")) or any(
+        program_arguments[name] for name in ("ai_analyze", "debug", "doing_diagram", "outline", "runtime")
+    ):
+        return None
+    arguments = {
+        name: value
+        for name, value in program_arguments.items()
+        if name not in STYLE_ARGUMENTS and not name.endswith("window_position")
+    }
+    colors = sorted(name for name, color in PrimeItems.colors_to_use.items() if color)
+    return json.dumps([arguments, colors], sort_keys=True, default=str)
+
+
+# If only the style of the map has changed, rewrite the last map with the new style.
+def restyle_the_map(content_key: str | None) -> bool:
+    """
+    If the map is the same as the last one written other than its style (colors/font),
+    rewrite the last map with the new style rather than mapping it again.
+        Args:
+            content_key (str | None): the content key of this map (see get_content_key)
+
+        Returns:
+            bool: True if the map was rewritten, False if it is to be mapped.
+    """
+    with rendered_map_lock:
+        if (
+            content_key is None
+            or rendered_map.get("key") != content_key
+            or rendered_map.get("xml_tree") is not PrimeItems.xml_tree
+            or "lines" not in rendered_map
+        ):
+            # Remember what this map will be made from.
+            rendered_map.clear()
+            if content_key is not None:
+                rendered_map.update({"key": content_key, "xml_tree": PrimeItems.xml_tree})
+            return False
+        lines = rendered_map["lines"]
+
+    logger.debug("mapit: only the style of the map has changed.  Restyling the last map.")
+    profile_count("map_cache_hits")
+    my_output_dir = os.getcwd()
+    my_file_name = f"{PrimeItems.slash}MapTasker.html"
+    with profile_phase("restyle"), open(f"{my_output_dir}{my_file_name}", "w", encoding="utf-8") as out_file:
+        for output_line in lines:
+            out_file.write(apply_style(output_line))
+        os.fsync(out_file)  # Force write to disk
+    profile_count("lines_written", len(lines))
+
+    display_output(my_output_dir, my_file_name)
+    return True
 
 
 # Cleanup memory and let user know there was no match found for Task/Profile
@@ -398,7 +463,10 @@ def process_outline() -> None:
         Args:
             my_output_dir (str): Our current directory for output.
     """
-    # Do the configuration outline and generate the map
+    # Do the configuration outline and generate the map.  Imported here since the
+    # diagram needs the GUI modules, which a plain run doesn't.
+    from maptasker.src.outline import outline_the_configuration
+
     outline_the_configuration()
 
     # Display the diagram in the default text editor.
@@ -487,18 +555,23 @@ def display_back_matter(
         - Display output file in browser
     """
     if program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
-        output_variables("Unreferenced Global Variables", "")
+        with profile_phase("variables"):
+            output_variables("Unreferenced Global Variables", "")
 
     # Get the output directory/folder path
     my_output_dir = os.getcwd()
 
     # Output the Configuration Outline
     if program_arguments["outline"]:
-        process_outline()
+        with profile_phase("outline"):
+            process_outline()
 
     # Output the grand total (Projects/Profiles/Tasks/Scenes)
     output_grand_totals()
 
+    # Log what we learned about the Action codes, so actionc.py can be updated.
+    log_learned_action_codes()
+
     # If doing a single named item and the item was not found, clean up and exit
     if (
         (single_task_name and not single_task_found)
@@ -530,7 +603,8 @@ def display_back_matter(
 
     # Finally, write out all of the output that is queued up.
     my_file_name = f"{PrimeItems.slash}MapTasker.html"
-    write_out_the_file(my_output_dir, my_file_name)
+    with profile_phase("write"):
+        write_out_the_file(my_output_dir, my_file_name)
 
     # Display the final results in the default web browser
     display_output(my_output_dir, my_file_name)
@@ -561,12 +635,16 @@ def do_rerun() -> None:
     Returns:
         None: Function does not return anything
     Re-runs the program with a new file by:
-    - Freeing up memory
+    - Freeing up memory (keeping the loaded backup for reuse)
     - Rerunning the program with the new file
     """
 
-    # Get rid of everything.
-    clean_up_memory()
+    # Get rid of everything but the backup, which is reused if its file is unchanged.
+    if PrimeItems.output_lines is not None:
+        PrimeItems.output_lines.output_lines.clear()
+    PrimeItemsReset()
+    PrimeItems.program_arguments = initialize_runtime_arguments()
+    gc.collect()
 
     # Now do it!  Rerun the program.
     restart_program()
@@ -618,14 +696,15 @@ def special_handling(found_tasks: list, projects_without_profiles: list, project
 
     # Get the list of Tasks not called by a Profile,
     # and a list of Projects without Profiles/Tasks
-    process_unique_situations(
-        projects_with_no_tasks,
-        projects_without_profiles,
-        found_tasks,
-        single_project_name,
-        single_profile_name,
-        single_task_name,
-    )
+    with profile_phase("unique situations"):
+        process_unique_situations(
+            projects_with_no_tasks,
+            projects_without_profiles,
+            found_tasks,
+            single_project_name,
+            single_profile_name,
+            single_task_name,
+        )
 
     # Restore the directory setting for the final directory of Totals
     program_arguments["directory"] = temp_dir
@@ -647,13 +726,15 @@ def special_handling(found_tasks: list, projects_without_profiles: list, project
 #   Main Program Starts Here                                                           #
 #                                                                                      #
 ########################################################################################
-def mapit_all(file_to_get: str) -> int:
+def mapit_all(file_to_get: str, run: MapRun | None = None) -> int:
     # Initialize variables and get the backup xml file
     """
     Maps all Projects, Profiles, Tasks and Scenes in a Tasker backup file
 
     Args:
         file_to_get (str): The Tasker backup file to process
+        run (MapRun | None): the run context to map with.  If None, the current run
+            (see primitem.use_run) is used.
 
     Returns:
         int: 0
@@ -672,6 +753,11 @@ def mapit_all(file_to_get: str) -> int:
     Cleans up memory after completing processing.
     If coming from the GUI, then PrimeItems may already be primed with data.
     """
+    # Map with the given run context, if any.
+    if run is not None:
+        with use_run(run):
+            return mapit_all(file_to_get)
+
     # Save our mapview and doing_diagram flags since 'initialize_everything' would otherwise wipe it out.
     try:
         save_map = PrimeItems.program_arguments["guiview"]
@@ -698,22 +784,33 @@ def mapit_all(file_to_get: str) -> int:
     if file_to_get:
         PrimeItems.file_to_get = file_to_get
 
-    # Get all Tasker variables
-    if PrimeItems.program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
-        get_variables()
+    # If only the colors/font have changed since the last map, just restyle it.
+    if not restyle_the_map(get_content_key()):
+        # Get all Tasker variables
+        if PrimeItems.program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
+            with profile_phase("variables"):
+                get_variables()
 
-    # Process all Projects and their Profiles
-    found_tasks = projects.process_projects_and_their_profiles(
-        found_tasks,
-        projects_without_profiles,
-    )
+        # Process all Projects and their Profiles
+        with profile_phase("projects"):
+            found_tasks = projects.process_projects_and_their_profiles(
+                found_tasks,
+                projects_without_profiles,
+            )
 
-    # Do special handling: swrqap up back matter and print the output.
-    special_handling(found_tasks, projects_without_profiles, projects_with_no_tasks)
+        # Do special handling: swrqap up back matter and print the output.
+        special_handling(found_tasks, projects_without_profiles, projects_with_no_tasks)
 
     # Handle Ai Analysis
     if PrimeItems.program_arguments["ai_analyze"]:
-        map_ai()
+        # Imported here so that the Ai (and GUI) packages are only loaded when used.
+        from maptasker.src.mapai import map_ai
+
+        with profile_phase("ai analysis"):
+            map_ai()
+
+    # Report on the run, if profiling.
+    finish_profiling(os.getcwd())
 
     # Save our runtime settings for next time.  Make sure we don't save the rerun state as True
     save_rerun_state = PrimeItems.program_arguments["rerun"]
@@ -13,19 +13,21 @@ import os
 import socket
 import subprocess
 import sys
-from contextlib import contextmanager
-from typing import Generator
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Generator
 
 import defusedxml.ElementTree as et  # noqa: N813
-import requests
-from requests.exceptions import ConnectionError, InvalidSchema, Timeout
 
-from maptasker.src.getbakup import write_out_backup_file
+from maptasker.src.getbakup import download_backup_file
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import logger
 from maptasker.src.taskerd import get_the_xml_data
 from maptasker.src.xmldata import rewrite_xml
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 
 @contextmanager
 def suppress_stdout() -> Generator:  # type: ignore  # noqa: PGH003
@@ -109,6 +111,9 @@ def update() -> None:
 # Get the version of our code out on Pypi
 def get_pypi_version() -> str:
     """Get the PyPi version of this package."""
+    import requests  # Only loaded when needed, to keep start up fast.
+    from requests.exceptions import ConnectionError  # noqa: A004
+
     url = "https://pypi.org/pypi/maptasker/json"
     try:
         version = "==" + requests.get(url).json()["info"]["version"]  # noqa: S113
@@ -117,36 +122,65 @@ def get_pypi_version() -> str:
     return version
 
 
-# Issue HTTP Request to get something from the Android device.
-def http_request(
+# Get the url of a request to the Tasker server on the Android device.
+def get_android_url(ip_address: str, ip_port: str, request_name: str, file_location: str, request_parm: str) -> str:
+    """
+    Get the url of a request to the Tasker server (HTTP Server Example) on the Android device.
+        Args:
+            ip_address (str): TCP/IP address of the Android device
+            ip_port (str): port of the Tasker server
+            request_name (str): the request: "file" or "maplist"
+            file_location (str): location of the file/directory on the Android device
+            request_parm (str): the query (e.g. "?download=1")
+
+        Returns:
+            str: the url.  Something like: http://192.168.0.210:1821/file/path/to/backup.xml?download=1
+    """
+    http = "http://" if "http://" not in ip_address else ""
+    return f"{http}{ip_address}:{ip_port}/{request_name}{file_location}{request_parm}"
+
+
+# Issue HTTP Request to the Android device and get the response.
+def get_android_response(
     ip_address: str,
     ip_port: str,
     file_location: str,
     request_name: str,
     request_parm: str,
+    headers: dict | None = None,
 ) -> tuple[int, object]:
     """
-    Issue HTTP Request to get the backup XML file from the Android device.
-    Tasker's HTTP Server Example must be installed for this to work:
-    https://taskernet.com/shares/?user=AS35m8ne7oO4s%2BaDx%2FwlzjdFTfVMWstg1ay5AkpiNdrLoSXEZdFfw1IpXiyJCVLNW0yn&id=Project%3AHttp+Server+Example
-        :param backup_file_http: the port to use for the Android device's Tasker server
-        :param backup_file_location: location of
-        :return: return code, response: eitherr text string with error message or the
-        contents of the backup file
+    Issue HTTP Request to the Tasker server on the Android device, through the shared
+    session (see droidnet).
+        Args:
+            ip_address (str): TCP/IP address of the Android device
+            ip_port (str): port of the Tasker server
+            file_location (str): location of the file/directory on the Android device
+            request_name (str): the request: "file" or "maplist"
+            request_parm (str): the query (e.g. "?download=1")
+            headers (dict | None): extra request headers (e.g. If-None-Match)
+
+        Returns:
+            tuple[int, object]: 0 and the response (status 200, or 304 if not modified), or
+                the error code and message (6 = file not found, 8 = request failed).
     """
+    from requests.exceptions import ConnectionError, InvalidSchema, Timeout  # noqa: A004
+
+    from maptasker.src.droidnet import get_android_session
+
     # Create the URL to request the backup xml file from the Android device running the
     # Tasker server.
-    # Something like: 192.168.0.210:1821/file/path/to/backup.xml?download=1
-    http = "http://" if "http://" not in ip_address else ""
-    url = f"{http}{ip_address}:{ip_port}/{request_name}{file_location}{request_parm}"
+    url = get_android_url(ip_address, ip_port, request_name, file_location, request_parm)
 
     # Make the request.
     error_message = ""
     response = ""
 
-    with suppress_stdout():  # Suppress any errors (system IMK)
+    # Only the main thread may swap sys.stdout: a worker doing so would race with it.
+    quiet = suppress_stdout() if threading.current_thread() is threading.main_thread() else nullcontext()
+    with quiet:  # Suppress any errors (system IMK)
         try:
-            response = requests.get(url, timeout=5)
+            response = get_android_session().get(url, headers=headers, timeout=5)
         except InvalidSchema:
             error_message = f"Request failed for url: {url} .  Invalid url!"
         except ConnectionError:
@@ -161,12 +195,11 @@ def http_request(
         logger.debug(error_message)
         return 8, error_message
 
-    # Check the response status code.  200 is good!
-    if response and response.status_code == 200:
-        # Return the contents of the file.
-        return 0, response.content
+    # Check the response status code.  200 is good!  304 is good too, if we asked.
+    if response.status_code in {200, 304}:
+        return 0, response
 
-    if response and response.status_code == 404:
+    if response.status_code == 404:
         return 6, "File " + file_location + " not found."
 
     return (
@@ -175,14 +208,44 @@ def http_request(
     )
 
 
+# Issue HTTP Request to get something from the Android device.
+def http_request(
+    ip_address: str,
+    ip_port: str,
+    file_location: str,
+    request_name: str,
+    request_parm: str,
+) -> tuple[int, object]:
+    """
+    Issue HTTP Request to get the backup XML file from the Android device.
+    Tasker's HTTP Server Example must be installed for this to work:
+    https://taskernet.com/shares/?user=AS35m8ne7oO4s%2BaDx%2FwlzjdFTfVMWstg1ay5AkpiNdrLoSXEZdFfw1IpXiyJCVLNW0yn&id=Project%3AHttp+Server+Example
+        :param backup_file_http: the port to use for the Android device's Tasker server
+        :param backup_file_location: location of
+        :return: return code, response: eitherr text string with error message or the
+        contents of the backup file
+    """
+    return_code, response = get_android_response(
+        ip_address,
+        ip_port,
+        file_location,
+        request_name,
+        request_parm,
+    )
+    if return_code != 0:
+        return return_code, response
+
+    # Return the contents of the file.
+    return 0, response.content
+
+
 # Validate XML
-def validate_xml(ip_address: str, android_file: str, return_code: int, file_contents: str) -> tuple:
+def validate_xml(ip_address: str, android_file: str, return_code: int) -> tuple:
     # Run loop since we may have to rerun validation if unicode error
     """Validates an XML file and returns an error message and the parsed XML tree.
     Parameters:
         android_file (str): The path to the XML file to be validated.
         return_code (int): The return code from the validation process.
-        file_contents (str): The contents of the XML file.
         ip_address (str): The TCP/IP address of the Android device or blank.
     Returns:
         error_message (str): A message describing any errors encountered during validation.
@@ -207,12 +270,9 @@ def validate_xml(ip_address: str, android_file: str, return_code: int, file_cont
             # Process the XML file
             PrimeItems.program_arguments["android_file"] = android_file
 
-            # If getting file from Android device, write out the backup file first.
-            if ip_address:
-                write_out_backup_file(file_contents)
-
-            # We don't have the file yet.  Lets get it.
-            else:
+            # If getting file from Android device, it has already been downloaded.
+            # Otherwise, we don't have the file yet.  Lets get it.
+            if not ip_address:
                 return_code = get_the_xml_data()
                 if return_code != 0:
                     return PrimeItems.error_msg, None
@@ -242,13 +302,19 @@ def validate_xml(ip_address: str, android_file: str, return_code: int, file_cont
 
 
 # Read XML file and validate the XML.
-def validate_xml_file(ip_address: str, port: str, android_file: str) -> bool:
+def validate_xml_file(
+    ip_address: str,
+    port: str,
+    android_file: str,
+    progress: Callable[[int, int], None] | None = None,
+) -> bool:
     # Read the file
     """Validates an XML file from an Android device.
     Parameters:
         - ip_address (str): IP address of the Android device.
         - port (str): Port number of the Android device.
         - android_file (str): Name of the XML file to be validated.
+        - progress (Callable | None): if given, called with the progress of the download (see download_backup_file).
     Returns:
         - bool: True if the file is valid, False if not.
     Processing Logic:
@@ -257,14 +323,14 @@ def validate_xml_file(ip_address: str, port: str, android_file: str) -> bool:
         - Checks if the file is Tasker XML.
         - Returns True if the file is valid, False if not."""
     if ip_address:
-        return_code, file_contents = http_request(ip_address, port, android_file, "file", "?download=1")
+        return_code, file_name = download_backup_file(ip_address, port, android_file, progress)
         if return_code != 0:
-            return 1, file_contents
+            return 1, file_name
     else:
         return_code = 0
 
     # Validate the xml
-    error_message, xml_tree = validate_xml(ip_address, android_file, return_code, file_contents)
+    error_message, xml_tree = validate_xml(ip_address, android_file, return_code)
 
     # If there was an error, bail out.
     if error_message:
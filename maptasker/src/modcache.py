@@ -0,0 +1,204 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# modcache: cache of loaded backups (Models) and their rendered maps                   #
+#                                                                                      #
+#           Each backup is kept with the maps rendered from it (by options).  When     #
+#           the memory budget is exceeded, the least recently used backups are         #
+#           dropped.  The cache can be used from several threads at once.              #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import json
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING
+
+from maptasker.src.sysconst import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from maptasker.src.render import Model, RenderResult
+
+
+# Get the key to cache a rendered map by.
+def get_result_key(options: dict, colors: dict, source_name: str) -> str:
+    """
+    Get the key to cache a rendered map by: its options, colors and source name.
+        Args:
+            options (dict): runtime arguments used to render the map
+            colors (dict): colors used to render the map
+            source_name (str): name shown as the source of the backup
+
+        Returns:
+            str: the key
+    """
+    return json.dumps([options, colors, source_name], sort_keys=True, default=str)
+
+
+# Estimate the memory used by a rendered map.
+def get_result_size(result: RenderResult) -> int:
+    """
+    Estimate the memory used by a rendered map: its html plus about as much again for
+    the output lines it was built from.
+        Args:
+            result (RenderResult): the rendered map
+
+        Returns:
+            int: estimated size in bytes
+    """
+    return 2 * len(result.html)
+
+
+class ModelCache:
+    """Least-recently-used cache of Models and their rendered maps, limited by a memory budget"""
+
+    def __init__(self, memory_budget: int) -> None:
+        """
+        Initialize the cache
+        Args:
+            self: The instance of the class
+            memory_budget (int): maximum estimated memory to use, in bytes
+        Returns:
+            None
+        """
+        self.memory_budget = memory_budget
+        self.memory_used = 0
+        # Key: {"model": Model, "results": OrderedDict of result key: RenderResult, "size": int}
+        self.entries = OrderedDict()
+        # Keys being loaded, so that the same backup is only loaded once at a time.
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.stats = {"model_hits": 0, "model_misses": 0, "result_hits": 0, "result_misses": 0, "evictions": 0}
+
+    def get_model(self, key: str, loader: Callable[[], Model]) -> tuple[Model, bool]:
+        """
+        Get the Model for the key, loading it if it isn't in the cache.
+        Args:
+            self: The instance of the class
+            key (str): key of the backup (e.g. hash of its contents)
+            loader (Callable): function to load the Model if we don't have it
+        Returns:
+            tuple: the Model and True if it was in the cache.
+        """
+        while True:
+            with self.lock:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    self.stats["model_hits"] += 1
+                    return self.entries[key]["model"], True
+                # Someone else is loading it: wait for them.
+                if key in self.loading:
+                    event = self.loading[key]
+                else:
+                    event = self.loading[key] = threading.Event()
+                    self.stats["model_misses"] += 1
+                    break
+            event.wait()
+            # If their load failed, the next time around we'll try it ourselves.
+
+        try:
+            model = loader()
+            with self.lock:
+                self.add_entry(key, {"model": model, "results": OrderedDict(), "size": model.size})
+            return model, False
+        finally:
+            with self.lock:
+                del self.loading[key]
+            event.set()
+
+    def get_result(self, key: str, result_key: str, renderer: Callable[[], RenderResult]) -> tuple[RenderResult, bool]:
+        """
+        Get the map rendered from the backup with the result key, rendering it if we don't have it.
+        Args:
+            self: The instance of the class
+            key (str): key of the backup
+            result_key (str): key of the rendered map (see get_result_key)
+            renderer (Callable): function to render the map if we don't have it
+        Returns:
+            tuple: the rendered map and True if it was in the cache.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and result_key in entry["results"]:
+                entry["results"].move_to_end(result_key)
+                self.entries.move_to_end(key)
+                self.stats["result_hits"] += 1
+                return entry["results"][result_key], True
+            self.stats["result_misses"] += 1
+
+        result = renderer()
+
+        with self.lock:
+            # The backup may have been dropped while we were rendering.
+            entry = self.entries.get(key)
+            if entry is not None and result_key not in entry["results"]:
+                size = get_result_size(result)
+                entry["results"][result_key] = result
+                entry["size"] += size
+                self.memory_used += size
+                self.entries.move_to_end(key)
+                self.evict(keep=key)
+        return result, False
+
+    def add_entry(self, key: str, entry: dict) -> None:
+        """
+        Add the entry to the cache, unless it is larger than the memory budget.
+        Lock must be held.
+        Args:
+            self: The instance of the class
+            key (str): key of the backup
+            entry (dict): the entry to add
+        Returns:
+            None
+        """
+        if entry["size"] > self.memory_budget:
+            logger.info(f"modcache: backup {key} is larger than the memory budget.  Not cached.")
+            return
+        self.entries[key] = entry
+        self.memory_used += entry["size"]
+        self.evict(keep=key)
+
+    def evict(self, keep: str) -> None:
+        """
+        Drop the least recently used backups, and then the oldest maps of the backup we
+        are keeping, until we are within the memory budget.  Lock must be held.
+        Args:
+            self: The instance of the class
+            keep (str): key of the backup just used, which is dropped last
+        Returns:
+            None
+        """
+        while self.memory_used > self.memory_budget and len(self.entries) > 1:
+            key = next(iter(self.entries))
+            if key == keep:
+                self.entries.move_to_end(key)
+                continue
+            self.memory_used -= self.entries.pop(key)["size"]
+            self.stats["evictions"] += 1
+            logger.info(f"modcache: evicted backup {key}")
+
+        entry = self.entries[keep]
+        while self.memory_used > self.memory_budget and entry["results"]:
+            _, result = entry["results"].popitem(last=False)
+            size = get_result_size(result)
+            entry["size"] -= size
+            self.memory_used -= size
+
+    def get_stats(self) -> dict:
+        """
+        Get the cache statistics
+        Args:
+            self: The instance of the class
+        Returns:
+            dict: hits/misses/evictions, number of backups and maps cached and memory used.
+        """
+        with self.lock:
+            return self.stats | {
+                "models": len(self.entries),
+                "results": sum(len(entry["results"]) for entry in self.entries.values()),
+                "memory_used": self.memory_used,
+                "memory_budget": self.memory_budget,
+            }
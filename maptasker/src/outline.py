@@ -28,7 +28,10 @@
 #   }
 # }
 
+from __future__ import annotations
+
 import contextlib
+from typing import TYPE_CHECKING
 
 import defusedxml.ElementTree  # Need for type hints
 
@@ -39,6 +42,9 @@ from maptasker.src.primitem import PrimeItems
 from maptasker.src.profiles import get_profile_tasks
 from maptasker.src.sysconst import FormatLine
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 blank = "&nbsp;"
 list_of_found_tasks = []
 line = "─"
@@ -408,6 +414,29 @@ def assign_names_to_anonymous_tasks() -> None:
         PrimeItems.tasks_by_name[value["name"]] = value
 
 
+# Let the outline name the anonymous Tasks and link their callers, on copies of the Tasks.
+@contextlib.contextmanager
+def outline_copy_of_tasks() -> Iterator[None]:
+    """
+    Make the Tasks that the outline sees copies of the loaded Tasks, until the "with" block
+    is exited, so that the names and calls it gives them don't change the loaded backup
+    (which a rerun may reuse, see taskerd.py).
+        Args:
+            None
+
+        Returns:
+            Iterator[None]: nothing
+    """
+    tasker_root_elements = PrimeItems.tasker_root_elements
+    PrimeItems.tasker_root_elements = tasker_root_elements | {
+        "all_tasks": {task_id: dict(task) for task_id, task in tasker_root_elements["all_tasks"].items()},
+    }
+    try:
+        yield
+    finally:
+        PrimeItems.tasker_root_elements = tasker_root_elements
+
+
 # Start outline beginning with the Projects
 def do_the_outline(network: dict) -> None:
     """
@@ -591,16 +620,17 @@ def outline_the_configuration() -> None:
         )
         return
 
-    # Go do it!  Generate the outline near the bottom of the output.
-    do_the_outline(network)
+    with outline_copy_of_tasks():
+        # Go do it!  Generate the outline near the bottom of the output.
+        do_the_outline(network)
 
-    # End the list
-    PrimeItems.output_lines.add_line_to_output(
-        3,
-        "",
-        FormatLine.dont_format_line,
-    )
+        # End the list
+        PrimeItems.output_lines.add_line_to_output(
+            3,
+            "",
+            FormatLine.dont_format_line,
+        )
 
-    # Now generate the outline diagram text file.
-    if network:
-        network_map(network)
+        # Now generate the outline diagram text file.
+        if network:
+            network_map(network)
@@ -10,14 +10,32 @@
 import argparse
 import textwrap
 from argparse import ArgumentParser
-from tkinter import font
 
 from maptasker.src.error import error_handler
+from maptasker.src.fonts import get_mono_font_families
 from maptasker.src.maputils import validate_ip_address, validate_port
-from maptasker.src.nameattr import get_tk
 from maptasker.src.sysconst import LLAMA_MODELS, OPENAI_MODELS, TYPES_OF_COLORS, logger
 
 
+class FullNameArgumentParser(ArgumentParser):
+    """
+    Argument parser that only takes options by their full name, since many of them start
+    the same (e.g. -profile, -profiling and -project).  allow_abbrev=False only stops
+    abbreviations of '--' options, and ours all start with a single '-'.
+    """
+
+    def _get_option_tuples(self, option_string: str) -> list:
+        """
+        Get the options that the option string could be, other than longer options that
+        it is the start of.  A single letter option can still have its value attached (e.g. -i8).
+        Args:
+            option_string (str): the option string from the command line (e.g. "-prof")
+        Returns:
+            list: the (action, option string, ...) tuples that match
+        """
+        return [option_tuple for option_tuple in super()._get_option_tuples(option_string) if len(option_tuple[1]) == 2]
+
+
 # Validate mutually inclusive variables
 def validate_vars(var1: str, var2: int, var3: str) -> None:
     """Validate mutually inclusive arguments
@@ -120,11 +138,8 @@ def font_validation(x: str) -> str:
     - If not valid, raise error
     - Otherwise return input font name"""
     valid_fonts = ["Courier"]
-    # Get our Tkinter window
-    get_tk()
     # Get all monospace ("f"=fixed) fonts
-    fonts = [font.Font(family=f) for f in font.families()]
-    valid_fonts.extend(f.actual("family") for f in fonts if f.metrics("fixed"))
+    valid_fonts.extend(get_mono_font_families())
     if x != "help" and x not in valid_fonts:
         msg = f"Invalid or non-monospace font name '{x}'."
         error_handler(msg, 7)
@@ -170,7 +185,7 @@ def runtime_parser() -> None:
         - Parse arguments and call output function
     """
     # Setup for argument parsing
-    parser = ArgumentParser(
+    parser = FullNameArgumentParser(
         prog="MapTasker",
         description=(
             "This program reads a Tasker backup file (e.g. backup.xml) and displays the"
@@ -192,6 +207,7 @@ def runtime_parser() -> None:
                                 """,
         ),
         formatter_class=argparse.RawTextHelpFormatter,
+        allow_abbrev=False,
     )
 
     # Ai arguments
@@ -379,6 +395,16 @@ def runtime_parser() -> None:
         action="store_true",
         default=False,
     )
+    # Render the Projects in parallel
+    parser.add_argument(
+        "-parallel",
+        help="Render the Projects in parallel using this many worker processes, for this run only.  "
+        "Example: '-parallel 8'",
+        required=False,
+        type=int,
+        nargs=1,
+        default=0,
+    )
     # view_limit
     parser.add_argument(
         "-view_limit",
@@ -429,6 +455,30 @@ def runtime_parser() -> None:
         default=False,
     )
 
+    # Profile the run
+    parser.add_argument(
+        "-profiling",
+        help="Display the time taken by each phase and Project of the run, and what was done, and save it in "
+        "MapTasker_Profile.json",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "-profiling_cprofile",
+        help="Profile the run (see -profiling) and save cProfile stats in MapTasker_Profile.pstats",
+        action="store_true",
+        default=False,
+    )
+    parser.add_argument(
+        "-profiling_memory",
+        help="Profile the run (see -profiling) and report the N places that allocated the most memory.  "
+        "Example: '-profiling_memory 10'",
+        required=False,
+        type=int,
+        nargs=1,
+        default=0,
+    )
+
     # Group project, profile and task = name ... together as exclusive arguments
     single_group = parser.add_mutually_exclusive_group()
     single_group.add_argument(
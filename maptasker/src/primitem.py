@@ -34,6 +34,9 @@
 #  mono_fonts = dictionary of monospace fonts from TkInter
 #  grand_totals = used for trcaking number of Projects/Profiles/Tasks/Scenes
 #  tasker_root_elements points to our root xml for Projects/Profiles/Tasks/Scenes
+#  cross_reference = index of names/ids to owning Projects (see crossref.py)
+#  learned_action_codes = per-run overlay of Action codes learned from the backup
+#  run_profile = timings and counts of the run, if profiling (see runprof.py)
 #  directories = points to our directory items if we are displaying a directory
 #  variables = Tasker variables.
 #  current_project = current Project being processed
@@ -42,133 +45,196 @@
 #  slash = backslash for Windows or forward slash for OS X and Linux.
 #
 #   return
+#
+# MapRun = the per-run context that holds all of the above.  PrimeItems is a facade
+#   onto the current MapRun (see use_run), so several maps can be rendered
+#   concurrently in one process, each thread/task using its own MapRun.
 from __future__ import annotations
 
-from typing import ClassVar
+import contextlib
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
 
+from maptasker.src.actionc import LearnedActionCodes
 from maptasker.src.sysconst import NOW_TIME
 
-
-class PrimeItems:
-    """PrimeItems class contains global variables used throughout MapTasker"""
-
-    ai_analyze = False
-    ai: ClassVar = {
-        "do_ai": False,
-        "model": "",
-        "output_lines": [],
-        "response": [],
-        "api_key": "",
-    }
-    xml_tree = None
-    xml_root = None
-    program_arguments: ClassVar = {}
-    colors_to_use: ClassVar = {}
-    output_lines = None
-    file_to_get = ""
-    file_to_use = ""
-    task_count_for_profile = 0
-    displaying_named_tasks_not_in_profile = False
-    error_code = 0
-    error_msg = ""
-    mono_fonts: ClassVar = {}
-    found_named_items: ClassVar = {
-        "single_project_found": False,
-        "single_profile_found": False,
-        "single_task_found": False,
-    }
-    grand_totals: ClassVar = {
-        "projects": 0,
-        "profiles": 0,
-        "unnamed_tasks": 0,
-        "named_tasks": 0,
-        "scenes": 0,
-    }
-    directory_items: ClassVar = {
-        "current_item": "",
-        "projects": [],
-        "profiles": [],
-        "tasks": [],
-        "scenes": [],
-    }
-    tasker_root_elements: ClassVar = {
-        "all_projects": [],
-        "all_profiles": {},
-        "all_scenes": {},
-        "all_tasks": {},
-        "all_services": [],
-    }
-    directories: ClassVar = []
-    variables: ClassVar = {}
-    current_project = ""
-    tkroot = None
-    last_run = NOW_TIME
-    slash = "/"
+if TYPE_CHECKING:
+    from collections.abc import Iterator
 
 
-# Reset all values
-class PrimeItemsReset:
-    """Re-initialize all values in PrimeItems class"""
+# The per-run context: arguments, colors, model (xml/root elements), indexes,
+#   output sink and counters for a single map.
+class MapRun:
+    """Per-run context holding everything used while mapping a single backup"""
 
     def __init__(self) -> None:
         """
-        Initialize the PrimeItems class
+        Initialize the run with empty values
         Args:
             self: The instance of the class
         Returns:
             None
-        Initializes all attributes of the PrimeItems class with empty values or dictionaries:
+        """
+        self.file_to_use = ""
+        self.last_run = NOW_TIME
+        self.slash = "/"
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Re-initialize the run's values
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        Initializes all attributes with empty values or dictionaries:
             - Sets found_named_items flags to False
             - Initializes grand_totals and directory_items dictionaries
             - Initializes tasker_root_elements dictionary
             - Sets other attributes like xml_tree, program_arguments etc to empty values
+        The file to use, last run date and slash are kept.
         """
-        PrimeItems.found_named_items = {
+        self.found_named_items = {
             "single_project_found": False,
             "single_profile_found": False,
             "single_task_found": False,
         }
-        PrimeItems.grand_totals = {
+        self.grand_totals = {
             "projects": 0,
             "profiles": 0,
             "unnamed_tasks": 0,
             "named_tasks": 0,
             "scenes": 0,
         }
-        PrimeItems.directory_items = {
+        self.directory_items = {
             "current_item": "",
             "projects": [],
             "profiles": [],
             "tasks": [],
             "scenes": [],
         }
-        PrimeItems.tasker_root_elements = {
+        self.tasker_root_elements = {
             "all_projects": [],
             "all_profiles": {},
             "all_scenes": {},
             "all_tasks": {},
             "all_services": [],
         }
-        PrimeItems.directories = []
-        PrimeItems.xml_tree = None
-        PrimeItems.xml_root = None
-        PrimeItems.program_arguments = {}
-        PrimeItems.colors_to_use = {}
-        PrimeItems.output_lines = None
-        PrimeItems.file_to_get = ""
-        PrimeItems.task_count_for_profile = 0
-        PrimeItems.displaying_named_tasks_not_in_profile = False
-        PrimeItems.mono_fonts = {}
-        PrimeItems.directories = []
-        PrimeItems.variables = {}
-        PrimeItems.current_project = ""
-        PrimeItems.error_code = 0
-        PrimeItems.error_msg = ""
-        PrimeItems.tkroot = None
-        PrimeItems.ai_analyze = False
-        PrimeItems.ai = {
+        self.cross_reference = {}
+        self.learned_action_codes = LearnedActionCodes()
+        self.run_profile = None
+        self.directories = []
+        self.xml_tree = None
+        self.xml_root = None
+        self.program_arguments = {}
+        self.colors_to_use = {}
+        self.output_lines = None
+        self.file_to_get = ""
+        self.task_count_for_profile = 0
+        self.displaying_named_tasks_not_in_profile = False
+        self.mono_fonts = {}
+        self.variables = {}
+        self.current_project = ""
+        self.error_code = 0
+        self.error_msg = ""
+        self.tkroot = None
+        self.ai_analyze = False
+        self.ai = {
             "do_ai": False,
+            "model": "",
             "output_lines": [],
             "response": [],
             "api_key": "",
         }
+
+
+# The run used by any thread/task that has not been given one of its own.
+default_run = MapRun()
+current_run: ContextVar[MapRun] = ContextVar("current_run", default=default_run)
+
+
+# Get the current run
+def get_run() -> MapRun:
+    """
+    Get the MapRun for the current thread/task
+        Args:
+            None
+        Returns:
+            MapRun: the current run (the default run if none has been set)
+    """
+    return current_run.get()
+
+
+# Use the given run for everything done inside the "with" block.
+@contextlib.contextmanager
+def use_run(run: MapRun) -> Iterator[MapRun]:
+    """
+    Make the run the current run (and thus what PrimeItems points to) for the
+    current thread/task until the "with" block is exited.
+        Args:
+            run (MapRun): the run to use
+        Returns:
+            MapRun: the run
+    """
+    token = current_run.set(run)
+    try:
+        yield run
+    finally:
+        current_run.reset(token)
+
+
+# Send PrimeItems.xxx to the current run.
+class PrimeItemsFacade(type):
+    """Metaclass which makes the PrimeItems class a facade onto the current MapRun"""
+
+    def __getattr__(cls, name: str) -> Any:  # noqa: ANN401
+        """
+        Get the attribute from the current run
+        Args:
+            name (str): name of the attribute
+        Returns:
+            Any: the value of the attribute
+        """
+        return getattr(current_run.get(), name)
+
+    def __setattr__(cls, name: str, value: Any) -> None:  # noqa: ANN401
+        """
+        Set the attribute in the current run
+        Args:
+            name (str): name of the attribute
+            value (Any): value to set
+        Returns:
+            None
+        """
+        setattr(current_run.get(), name, value)
+
+    def __delattr__(cls, name: str) -> None:
+        """
+        Delete the attribute from the current run
+        Args:
+            name (str): name of the attribute
+        Returns:
+            None
+        """
+        delattr(current_run.get(), name)
+
+
+class PrimeItems(metaclass=PrimeItemsFacade):
+    """PrimeItems class contains global variables used throughout MapTasker.
+    The variables live in the current MapRun: PrimeItems.xxx is the current run's xxx."""
+
+
+# Reset all values
+class PrimeItemsReset:
+    """Re-initialize all values in PrimeItems class (the current MapRun)"""
+
+    def __init__(self) -> None:
+        """
+        Initialize the PrimeItems class
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        Re-initializes all attributes of the current MapRun (see MapRun.reset)
+        """
+        current_run.get().reset()
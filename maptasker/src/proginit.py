@@ -8,6 +8,7 @@ import atexit
 import contextlib
 import platform
 import sys
+from collections.abc import Callable
 from json import dumps, loads  # For write and read counter
 from pathlib import Path
 from tkinter import TkVersion, messagebox
@@ -24,6 +25,7 @@ from maptasker.src.error import error_handler
 from maptasker.src.frontmtr import output_the_front_matter
 from maptasker.src.getbakup import get_backup_file
 from maptasker.src.primitem import PrimeItems
+from maptasker.src.runprof import profile_phase, start_profiling
 from maptasker.src.sysconst import (
     COUNTER_FILE,
     MY_VERSION,
@@ -62,8 +64,25 @@ def write_counter() -> None:
         f.write(dumps(run_counter))
 
 
-run_counter = read_counter()
-atexit.register(write_counter)
+run_counter = 0
+counter_registered = False
+
+
+# Count this run: read the counter now, and write it back out when we exit.
+#  This is done at start up rather than on import, so that importing MapTasker
+#  (e.g. to use the render API) does not read or write the counter file.
+def count_this_run() -> None:
+    """
+    Read the program counter and arrange for it to be written out on exit (once only).
+        Parameters: none
+        Returns: none
+    """
+    global run_counter, counter_registered  # noqa: PLW0603
+    if counter_registered:
+        return
+    run_counter = read_counter()
+    atexit.register(write_counter)
+    counter_registered = True
 
 
 # Prompt user to select the backup xml file to use.
@@ -230,12 +249,13 @@ def log_startup_values() -> None:
 
 
 # POpen and read xml and output the introduction/heading matter
-def get_data_and_output_intro(do_front_matter: bool) -> int:
+def get_data_and_output_intro(do_front_matter: bool, xml_loader: Callable[[], int] = get_the_xml_data) -> int:
     """
     Gets data from Tasker backup file and outputs introductory information.
 
     Args:
         do_front_matter (bool): True = output the front matter, False = don't bother
+        xml_loader (Callable): function to load the xml data with (e.g. in the background for the GUI)
     Returns:
         int: 0 if okay, non-zero if error (error code)
 
@@ -267,20 +287,22 @@ def get_data_and_output_intro(do_front_matter: bool) -> int:
             msg = "Locate the Tasker XML file to use to map your Tasker environment"
             messagebox.showinfo("MapTasker", msg)
 
-        # Open and read the file...
-        open_and_get_backup_xml_file()
-        if PrimeItems.error_code > 0:
-            return PrimeItems.error_code
+        with profile_phase("ingest"):
+            # Open and read the file...
+            open_and_get_backup_xml_file()
+            if PrimeItems.error_code > 0:
+                return PrimeItems.error_code
 
-        # Go get all the xml data
-        return_code = get_the_xml_data()
+            # Go get all the xml data
+            return_code = xml_loader()
 
         # Close the file
         PrimeItems.file_to_get.close()
 
     # Output the inital info: head, source, etc. ...if it hasn't already been output.
     if return_code == 0 and do_front_matter and not PrimeItems.output_lines.output_lines:
-        output_the_front_matter()
+        with profile_phase("front matter"):
+            output_the_front_matter()
         return 0
 
     return return_code
@@ -337,10 +359,11 @@ def start_up() -> dict:
         - Gets key program elements and outputs intro text
         - Logs startup values if debug mode is enabled
     """
-    from maptasker.src.guiwins import PopupWindow
-
     logger.info(f"sys.argv{sys.argv!s}")
 
+    # Count this run (first-time users are prompted for the backup file)
+    count_this_run()
+
     # Get the OS so we know which directory slash to use (/ or \)
     our_platform = platform.system()
     if our_platform == "Windows":
@@ -354,6 +377,9 @@ def start_up() -> dict:
     # Get runtime arguments (from CLI or GUI)
     get_arguments.get_program_arguments()
 
+    # Profile the rest of the run if asked to.
+    start_profiling()
+
     # Get our list of fonts
     # _ = get_fonts(True)
 
@@ -362,6 +388,8 @@ def start_up() -> dict:
 
     # Display a popup window telling user we are analyzing
     if PrimeItems.program_arguments["doing_diagram"]:
+        from maptasker.src.guiwins import PopupWindow  # The GUI modules are only loaded when needed.
+
         popup = PopupWindow(
             title="MapTasker",
             message="The view is running in the background.  Please stand by...",
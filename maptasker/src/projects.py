@@ -12,19 +12,22 @@ from __future__ import annotations
 from typing import TYPE_CHECKING
 
 from maptasker.src import tasks
+from maptasker.src.crossref import get_single_item_projects
 from maptasker.src.dirout import add_directory_item
 from maptasker.src.format import format_html
 from maptasker.src.getids import get_ids
-from maptasker.src.globalvr import output_variables
+from maptasker.src.globalvr import add_project_references, output_variables
 from maptasker.src.kidapp import get_kid_app
 from maptasker.src.nameattr import add_name_attribute
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.proclist import process_list
 from maptasker.src.profiles import process_profiles
+from maptasker.src.projpool import get_parallel_workers, render_projects_in_parallel
 from maptasker.src.property import get_properties
+from maptasker.src.runprof import profile_project
 from maptasker.src.scenes import process_project_scenes
 from maptasker.src.share import share
-from maptasker.src.sysconst import NORMAL_TAB, FormatLine
+from maptasker.src.sysconst import DISPLAY_DETAIL_LEVEL_all_variables, NORMAL_TAB, FormatLine
 from maptasker.src.taskflag import get_priority
 from maptasker.src.twisty import add_twisty, remove_twisty
 
@@ -649,6 +652,71 @@ def process_project_profiles(
     return False, our_task_element, profile_count
 
 
+# Get this Project's detail and output it
+def process_project(
+    project_name: str,
+    projects_without_profiles: list,
+    found_tasks: list,
+    our_task_element: defusedxml.ElementTree,
+) -> tuple:
+    """
+    Get this Project's detail and output it
+
+        :param project_name: name of the Project to process
+        :param projects_without_profiles: list of Projects with no Profiles
+        :param found_tasks: list of Tasks found
+        :param our_task_element: xml element of our Task
+        :return: our Task xml element, and True if we are doing a single item and it was found
+    """
+    # Point to the Project XML element <Project sr=...>
+    project = PrimeItems.tasker_root_elements["all_projects"][project_name]["xml"]
+
+    # Keep track of the Project being processed
+    PrimeItems.current_project = PrimeItems.tasker_root_elements["all_projects"][project_name]
+
+    # Get the Project line item details and output them
+    (
+        single_task_or_profile_found,
+        profile_count,
+        have_project_wanted,
+    ) = get_profile_details_and_output(project, project_name)
+
+    # If we are searching for a specific Project and we found it, then bail out
+    # ...but stay in loop to process all the Profiles for this Project
+    if have_project_wanted:
+        return our_task_element, False
+
+    # Process all of the Profiles for this Project
+    (
+        single_profile_not_found,
+        our_task_element,
+        profile_count,
+    ) = process_project_profiles(
+        project,
+        project_name,
+        projects_without_profiles,
+        found_tasks,
+        our_task_element,
+        profile_count,
+    )
+
+    # Finish the output for this Project
+    finish_up(
+        project,
+        project_name,
+        found_tasks,
+        our_task_element,
+        profile_count,
+    )
+
+    # If we are doing a single item and it was found, close the Project list
+    if is_single_project_or_profile_or_task_found():
+        add_close_project_list_line_to_output()
+        return our_task_element, True
+
+    return our_task_element, False
+
+
 # Go through all the Projects, get their detail and output it
 def process_projects(
     projects_without_profiles: list,
@@ -664,54 +732,39 @@ def process_projects(
         :return: nothing
     """
 
-    # Get all variables from XML first.
-
-    # Go through each Project in backup file
-    for project_name in PrimeItems.tasker_root_elements["all_projects"]:
-        # Point to the Project XML element <Project sr=...>
-        project = PrimeItems.tasker_root_elements["all_projects"][project_name]["xml"]
+    # If we are looking for a single Project/Profile/Task, only do the Project that owns it.
+    if (project_names := get_single_item_projects()) is None:
+        project_names = list(PrimeItems.tasker_root_elements["all_projects"])
 
-        # Keep track of the Project being processed
-        PrimeItems.current_project = PrimeItems.tasker_root_elements["all_projects"][project_name]
-
-        # Get the Project line item details and output them
-        (
-            single_task_or_profile_found,
-            profile_count,
-            have_project_wanted,
-        ) = get_profile_details_and_output(project, project_name)
-
-        # If we are searching for a specific Project and we found it, then bail out
-        # ...but stay in loop to process all the Profiles for this Project
-        if have_project_wanted:
-            continue
+        # Render the Projects in worker processes if requested.
+        if workers := get_parallel_workers(project_names):
+            render_projects_in_parallel(
+                project_names,
+                workers,
+                process_project,
+                projects_without_profiles,
+                found_tasks,
+            )
+            return []
 
-        # Process all of the Profiles for this Project
-        (
-            single_profile_not_found,
-            our_task_element,
-            profile_count,
-        ) = process_project_profiles(
-            project,
-            project_name,
-            projects_without_profiles,
-            found_tasks,
-            our_task_element,
-            profile_count,
+    # The Projects not being mapped still refer to variables (for "Unreferenced Global Variables").
+    elif PrimeItems.program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
+        add_project_references(
+            [name for name in PrimeItems.tasker_root_elements["all_projects"] if name not in project_names],
         )
 
-        # Finish the output for this Project
-        finish_up(
-            project,
-            project_name,
-            found_tasks,
-            our_task_element,
-            profile_count,
-        )
+    # Go through each Project in backup file
+    for project_name in project_names:
+        with profile_project(project_name):
+            our_task_element, single_item_found = process_project(
+                project_name,
+                projects_without_profiles,
+                found_tasks,
+                our_task_element,
+            )
 
         # If we are doing a single item and it was found, return the Tasks list
-        if is_single_project_or_profile_or_task_found():
-            add_close_project_list_line_to_output()
+        if single_item_found:
             return found_tasks
 
     return []
@@ -0,0 +1,229 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# projpool: render the Projects in parallel worker processes                           #
+#                                                                                      #
+#           Each worker renders a Project into its own output buffer and counters.     #
+#           The results are then merged back in Project order, so the output is the    #
+#           same as rendering the Projects one after another.                          #
+#                                                                                      #
+#           A Project's output depends on what the Projects before it have already     #
+#           done: Tasks already found (duplicates/"not in any Profile") and names       #
+#           already in the directory (hyperlink anchors).  A worker starts with none   #
+#           of these, so if its Project uses any that an earlier Project has, the      #
+#           Project is simply rendered again in order, in this process.                #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import multiprocessing
+from functools import partial
+from typing import TYPE_CHECKING
+
+from maptasker.src.actionc import LearnedActionCodes
+from maptasker.src.crossref import get_project_list
+from maptasker.src.dirout import get_directory_names
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.runprof import RunProfile, profile_count, profile_project
+from maptasker.src.sysconst import logger
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DIRECTORY_KEYS = ("projects", "profiles", "tasks", "scenes")
+
+
+# Determine how many worker processes to render the Projects with.
+def get_parallel_workers(project_names: list) -> int:
+    """
+    Determine how many worker processes to render the Projects with.
+        Args:
+            project_names (list): names of the Projects to render
+
+        Returns:
+            int: number of worker processes, or 0 if the Projects are to be rendered one
+                after another (not requested, only one Project, doing Ai analysis, running
+                with the GUI, or the platform can not fork the workers).
+    """
+    workers = PrimeItems.program_arguments["parallel"]
+    if workers < 2 or len(project_names) < 2 or PrimeItems.program_arguments["ai_analyze"]:
+        return 0
+    # Forking a process that has Tk running is not safe (it crashes on macOS).
+    if PrimeItems.program_arguments["gui"] or PrimeItems.program_arguments["guiview"]:
+        logger.info("projpool: running with the GUI.  Rendering Projects serially.")
+        return 0
+    # The workers inherit the parsed backup, so they must be forked.
+    if "fork" not in multiprocessing.get_all_start_methods():
+        logger.info("projpool: 'fork' is not available.  Rendering Projects serially.")
+        return 0
+    return min(workers, len(project_names))
+
+
+# Worker: render a single Project into empty buffers/counters and return the results.
+def render_project(process_project: Callable, project_name: str) -> dict:
+    """
+    Render a single Project (in a worker process) and return what it produced.
+        Args:
+            process_project (Callable): projects.process_project
+            project_name (str): name of the Project to render
+
+        Returns:
+            dict: the Project's results, with the following keys...
+                "output_lines": list of output lines
+                "grand_totals": the Project's counts
+                "directory_items": directory entries, by "projects"/"profiles"/...
+                "found_tasks": list of Task IDs found
+                "task_ids": list of the Project's Task IDs
+                "projects_without_profiles": list of Project names
+                "found_named_items": found flags for single items
+                "variables": variable name: value/verified for variables referenced
+                "learned_action_codes": the learned Action codes overlay
+                "run_profile": the Project's timing and counts, if profiling (see runprof.py)
+    """
+    # Start this Project with empty buffers and counters.  A worker renders several
+    # Projects, so everything is reset each time.
+    PrimeItems.output_lines.output_lines = []
+    PrimeItems.grand_totals = dict.fromkeys(PrimeItems.grand_totals, 0)
+    PrimeItems.directory_items = {"current_item": ""} | {key: [] for key in DIRECTORY_KEYS}
+    PrimeItems.learned_action_codes = LearnedActionCodes()
+    if PrimeItems.run_profile is not None:
+        PrimeItems.run_profile = RunProfile()
+    for variable in PrimeItems.variables.values():
+        variable["project"] = []
+    found_tasks = []
+    projects_without_profiles = []
+
+    with profile_project(project_name):
+        process_project(project_name, projects_without_profiles, found_tasks, "")
+
+    project_xml = PrimeItems.tasker_root_elements["all_projects"][project_name]["xml"]
+    return {
+        "output_lines": PrimeItems.output_lines.output_lines,
+        "grand_totals": PrimeItems.grand_totals,
+        "directory_items": {key: PrimeItems.directory_items[key] for key in DIRECTORY_KEYS},
+        "found_tasks": found_tasks,
+        "task_ids": get_project_list(project_xml, "tids"),
+        "projects_without_profiles": projects_without_profiles,
+        "found_named_items": PrimeItems.found_named_items,
+        "variables": {
+            name: {"value": variable["value"], "verified": variable["verified"]}
+            for name, variable in PrimeItems.variables.items()
+            if variable["project"]
+        },
+        "learned_action_codes": PrimeItems.learned_action_codes,
+        "run_profile": PrimeItems.run_profile,
+    }
+
+
+# Determine if a worker's result depends on what the Projects before it did.
+def has_conflict(result: dict, found_tasks: list) -> bool:
+    """
+    Determine if the worker's result for a Project would have been different had it
+    been rendered after the Projects before it.
+        Args:
+            result (dict): the worker's result (see render_project)
+            found_tasks (list): the Tasks found by the Projects before it
+
+        Returns:
+            bool: True if the Project has to be rendered again, in order.
+    """
+    # A Task the worker found, or checked for, that was already found.
+    if not set(found_tasks).isdisjoint(result["found_tasks"] + result["task_ids"]):
+        return True
+
+    # A name the worker added to the directory that is already there.
+    if PrimeItems.program_arguments["directory"]:
+        for key in DIRECTORY_KEYS:
+            if not get_directory_names(key).isdisjoint(item[1] for item in result["directory_items"][key]):
+                return True
+
+    return False
+
+
+# Merge a worker's result for a Project into our global items.
+def merge_project_result(
+    project_name: str,
+    result: dict,
+    projects_without_profiles: list,
+    found_tasks: list,
+) -> None:
+    """
+    Merge a worker's result for a Project into PrimeItems, as if it had been rendered here.
+        Args:
+            project_name (str): name of the Project
+            result (dict): the worker's result (see render_project)
+            projects_without_profiles (list): list of Projects with no Profiles
+            found_tasks (list): list of Tasks found
+
+        Returns:
+            None
+    """
+    PrimeItems.output_lines.output_lines.extend(result["output_lines"])
+
+    for key, value in result["grand_totals"].items():
+        PrimeItems.grand_totals[key] += value
+
+    for key in DIRECTORY_KEYS:
+        get_directory_names(key).update(item[1] for item in result["directory_items"][key])
+        PrimeItems.directory_items[key].extend(result["directory_items"][key])
+
+    found_tasks.extend(result["found_tasks"])
+    projects_without_profiles.extend(
+        name for name in result["projects_without_profiles"] if name not in projects_without_profiles
+    )
+
+    for key, value in result["found_named_items"].items():
+        PrimeItems.found_named_items[key] = PrimeItems.found_named_items[key] or value
+
+    # Variables referenced by the Project point to it.
+    PrimeItems.current_project = PrimeItems.tasker_root_elements["all_projects"][project_name]
+    for name, variable in result["variables"].items():
+        if name not in PrimeItems.variables:
+            PrimeItems.variables[name] = {"value": variable["value"], "project": [], "verified": variable["verified"]}
+        if PrimeItems.current_project not in PrimeItems.variables[name]["project"]:
+            PrimeItems.variables[name]["project"].append(PrimeItems.current_project)
+
+    PrimeItems.learned_action_codes.merge(result["learned_action_codes"])
+    if PrimeItems.run_profile is not None:
+        PrimeItems.run_profile.merge(result["run_profile"])
+
+
+# Render the Projects in worker processes and merge the results in Project order.
+def render_projects_in_parallel(
+    project_names: list,
+    workers: int,
+    process_project: Callable,
+    projects_without_profiles: list,
+    found_tasks: list,
+) -> None:
+    """
+    Render the Projects in worker processes and merge the results in Project order.
+        Args:
+            project_names (list): names of the Projects to render, in order
+            workers (int): number of worker processes
+            process_project (Callable): projects.process_project
+            projects_without_profiles (list): list of Projects with no Profiles
+            found_tasks (list): list of Tasks found
+
+        Returns:
+            None
+    """
+    rerendered = 0
+    context = multiprocessing.get_context("fork")
+    with context.Pool(processes=workers) as pool:
+        # imap returns the results in Project order, as they become available.
+        results = pool.imap(partial(render_project, process_project), project_names)
+        for project_name, result in zip(project_names, results, strict=True):
+            if has_conflict(result, found_tasks):
+                # Render it again here, after the Projects before it.
+                with profile_project(project_name):
+                    process_project(project_name, projects_without_profiles, found_tasks, "")
+                rerendered += 1
+            else:
+                merge_project_result(project_name, result, projects_without_profiles, found_tasks)
+
+    profile_count("projects_rendered_in_workers", len(project_names) - rerendered)
+    profile_count("projects_rendered_again", rerendered)
+    logger.info(
+        f"projpool: rendered {len(project_names)} Projects with {workers} workers ({rerendered} rendered again).",
+    )
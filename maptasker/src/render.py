@@ -0,0 +1,294 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# render: library API to render a Tasker backup into a map, in memory                  #
+#                                                                                      #
+#         render() takes the backup's bytes and a dictionary of options (the same      #
+#         keys as the runtime arguments, see initparg.py) and returns the map.  It      #
+#         does not read sys.argv, prompt, use Tk, write/read files in the current      #
+#         folder, save settings or open a browser.  Each call renders in its own       #
+#         MapRun, so calls can be made concurrently from several threads.             #
+#                                                                                      #
+#         load_model() and render_model() split this in two, so a backup that is       #
+#         rendered again and again (e.g. by the server, see server.py) is only parsed  #
+#         once.  A loaded Model is not changed by rendering it.                        #
+#                                                                                      #
+#         Example:                                                                     #
+#             from maptasker.src.render import render                                  #
+#             result = render(Path("backup.xml").read_bytes(), {"display_detail_level": 3})
+#             html = result.html                                                       #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import io
+from collections import namedtuple
+
+import defusedxml.ElementTree as ET  # noqa: N817
+
+from maptasker.src import projects
+from maptasker.src.actiond import log_learned_action_codes
+from maptasker.src.caveats import display_caveats
+from maptasker.src.colrmode import set_color_mode
+from maptasker.src.config import DARK_MODE
+from maptasker.src.crossref import build_cross_reference
+from maptasker.src.frontmtr import output_the_front_matter
+from maptasker.src.globalvr import get_variables, output_variables
+from maptasker.src.initparg import initialize_runtime_arguments
+from maptasker.src.lineout import LineOut, get_html_lines
+from maptasker.src.mapit import output_grand_totals, process_unique_situations
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.sysconst import DISPLAY_DETAIL_LEVEL_all_variables, FormatLine
+from maptasker.src.taskerd import load_the_xml_data
+
+# The result of a render:
+#  html = the map, as html
+#  output_lines = the queued output lines the html was built from (before final formatting)
+#  totals = number of projects, profiles, unnamed_tasks, named_tasks and scenes mapped
+RenderResult = namedtuple(  # noqa: PYI024
+    "RenderResult",
+    ["html", "output_lines", "totals"],
+)
+
+# A loaded (parsed) backup:
+#  xml_tree = the parsed xml tree
+#  tasker_root_elements = the Projects/Profiles/Tasks/Scenes/Services (see taskerd.py)
+#  cross_reference = the cross-reference index (see crossref.py)
+#  size = estimated memory used by the Model, in bytes
+Model = namedtuple(  # noqa: PYI024
+    "Model",
+    ["xml_tree", "tasker_root_elements", "cross_reference", "size"],
+)
+
+# A parsed backup takes about this many times the size of its xml in memory.
+MODEL_MEMORY_FACTOR = 9
+
+# Options that need the GUI, files, the network or an Android device.  These are always off.
+UNSUPPORTED_OPTIONS = (
+    "ai_analyze",
+    "debug",
+    "doing_diagram",
+    "fetched_backup_from_android",
+    "gui",
+    "guiview",
+    "outline",
+    "rerun",
+)
+
+
+class RenderError(Exception):
+    """The backup could not be rendered (bad XML, not a Tasker backup, single item not found...)"""
+
+
+# Set up the run's arguments and colors from the options passed in.
+def set_up_run(options: dict, colors: dict, source_name: str) -> None:
+    """
+    Set up the current run's program arguments and colors.
+        Args:
+            options (dict): runtime arguments to use (see initparg.py)
+            colors (dict): colors to use (see colrmode.py), overriding those of the appearance mode
+            source_name (str): name to show as the source of the backup
+
+        Returns:
+            None
+    """
+    program_arguments = initialize_runtime_arguments()
+    if unknown_options := set(options) - set(program_arguments):
+        error = f"Unknown render option(s): {', '.join(sorted(unknown_options))}"
+        raise ValueError(error)
+    program_arguments.update(options)
+    for option in UNSUPPORTED_OPTIONS:
+        program_arguments[option] = False
+    program_arguments["file"] = source_name
+    PrimeItems.program_arguments = program_arguments
+
+    # Appearance mode "system" uses the configured mode rather than asking the system.
+    appearance = program_arguments["appearance_mode"]
+    if appearance == "system":
+        appearance = "dark" if DARK_MODE else "light"
+    PrimeItems.colors_to_use = set_color_mode(appearance) | colors
+
+    PrimeItems.output_lines = LineOut()
+
+
+# Parse the backup and load its Projects/Profiles/Tasks/Scenes.
+def load_model(backup_bytes: bytes) -> Model:
+    """
+    Parse the backup xml and load it into a Model that can be rendered any number of times.
+        Args:
+            backup_bytes (bytes): the Tasker backup (or exported Project/Profile/Task) xml
+
+        Returns:
+            Model: the loaded backup.
+
+        Raises:
+            RenderError: if the backup is not valid xml or not a Tasker backup.
+    """
+    with use_run(MapRun()):
+        PrimeItems.program_arguments = initialize_runtime_arguments()
+        PrimeItems.output_lines = LineOut()
+        try:
+            PrimeItems.xml_tree = ET.parse(io.BytesIO(backup_bytes), parser=ET.XMLParser(encoding="utf-8"))
+        except (ET.ParseError, UnicodeDecodeError) as e:
+            error = f"Improperly formatted XML: {e}"
+            raise RenderError(error) from e
+        if load_the_xml_data() != 0:
+            error = "This is not a Tasker backup XML file."
+            raise RenderError(error)
+
+        return Model(
+            xml_tree=PrimeItems.xml_tree,
+            tasker_root_elements=PrimeItems.tasker_root_elements,
+            cross_reference=build_cross_reference(),
+            size=len(backup_bytes) * MODEL_MEMORY_FACTOR,
+        )
+
+
+# Make a loaded backup the current run's backup.
+def use_model(model: Model) -> None:
+    """
+    Make a loaded backup the one the current run maps.
+        Args:
+            model (Model): the backup, from load_model
+
+        Returns:
+            None
+    """
+    PrimeItems.xml_tree = model.xml_tree
+    PrimeItems.xml_root = model.xml_tree.getroot()
+    PrimeItems.tasker_root_elements = model.tasker_root_elements
+    PrimeItems.cross_reference = model.cross_reference
+
+
+# Check that the single Project/Profile/Task asked for was found.
+def check_single_item_found(items: tuple) -> None:
+    """
+    Raise an error if we were asked for a single Project/Profile/Task and it was not found.
+        Args:
+            items (tuple): the items to check: "project", "profile" and/or "task"
+
+        Returns:
+            None
+    """
+    for item in items:
+        if (name := PrimeItems.program_arguments[f"single_{item}_name"]) and not PrimeItems.found_named_items[
+            f"single_{item}_found"
+        ]:
+            error = f'{item.capitalize()} "{name}" not found.'
+            raise RenderError(error)
+
+
+# Render the map
+def render_the_map() -> None:
+    """
+    Render the map of the loaded backup into the current run's output lines.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    program_arguments = PrimeItems.program_arguments
+    output_the_front_matter()
+
+    # Get all Tasker variables
+    if program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
+        get_variables()
+
+    # Process all Projects and their Profiles
+    projects_without_profiles = []
+    projects_with_no_tasks = []
+    found_tasks = projects.process_projects_and_their_profiles([], projects_without_profiles)
+    check_single_item_found(("project", "profile"))
+
+    # Tasks not called by a Profile, and Projects without Profiles/Tasks.
+    # The directory is turned off while doing these so we don't get duplicates.
+    directory = program_arguments["directory"]
+    program_arguments["directory"] = False
+    process_unique_situations(
+        projects_with_no_tasks,
+        projects_without_profiles,
+        found_tasks,
+        program_arguments["single_project_name"],
+        program_arguments["single_profile_name"],
+        program_arguments["single_task_name"],
+    )
+    program_arguments["directory"] = directory
+    # A single Task may be one that is not called by any Profile.
+    check_single_item_found(("task",))
+
+    # The back matter
+    if program_arguments["display_detail_level"] >= DISPLAY_DETAIL_LEVEL_all_variables:
+        output_variables("Unreferenced Global Variables", "")
+    output_grand_totals()
+    log_learned_action_codes()
+    display_caveats()
+    PrimeItems.output_lines.add_line_to_output(5, "\n</body>\n</html>", FormatLine.dont_format_line)
+
+
+# Render a loaded backup into a map
+def render_model(
+    model: Model,
+    options: dict | None = None,
+    colors: dict | None = None,
+    source_name: str = "backup.xml",
+) -> RenderResult:
+    """
+    Render a loaded backup into a map, in memory.
+        Args:
+            model (Model): the backup, from load_model
+            options (dict | None): runtime arguments (see render)
+            colors (dict | None): colors to use (see render)
+            source_name (str): name to show as the source of the backup in the map.
+
+        Returns:
+            RenderResult: the html, the output lines it was built from and the totals.
+
+        Raises:
+            RenderError: if the backup can not be rendered.
+            ValueError: if an option is not a valid runtime argument.
+    """
+    with use_run(MapRun()):
+        set_up_run(options or {}, colors or {}, source_name)
+        use_model(model)
+        try:
+            render_the_map()
+        except SystemExit as e:
+            error = f"Rendering failed with error code {e.code}: {PrimeItems.error_msg}"
+            raise RenderError(error) from e
+
+        output_lines = list(PrimeItems.output_lines.output_lines)
+        return RenderResult(
+            html="".join(get_html_lines()),
+            output_lines=output_lines,
+            totals=dict(PrimeItems.grand_totals),
+        )
+
+
+# Render a Tasker backup into a map
+def render(
+    backup_bytes: bytes,
+    options: dict | None = None,
+    colors: dict | None = None,
+    source_name: str = "backup.xml",
+) -> RenderResult:
+    """
+    Render a Tasker backup into a map, in memory.
+        Args:
+            backup_bytes (bytes): the Tasker backup (or exported Project/Profile/Task) xml
+            options (dict | None): runtime arguments, with the same keys as
+                initparg.initialize_runtime_arguments (e.g. {"display_detail_level": 3,
+                "directory": True}).  Those not given have their default values.  Options
+                that need the GUI, files or the network (e.g. "outline") are ignored.
+            colors (dict | None): colors to use, with the same keys as colrmode.set_color_mode
+                (e.g. {"task_color": "Yellow"}).
+            source_name (str): name to show as the source of the backup in the map.
+
+        Returns:
+            RenderResult: the html, the output lines it was built from and the totals.
+
+        Raises:
+            RenderError: if the backup can not be rendered.
+            ValueError: if an option is not a valid runtime argument.
+    """
+    return render_model(load_model(backup_bytes), options, colors, source_name)
@@ -89,6 +89,8 @@ def get_and_set_booleans(args: list) -> None:
         "outline": "o",
         "pretty": "",
         "preferences": "",
+        "profiling": "",
+        "profiling_cprofile": "",
         "reset": "",
         "runtime": "",
         "taskernet": "",
@@ -187,6 +189,26 @@ def get_android_settings(program_arguments: dict, args: list) -> None:
             program_arguments["android_file"] = getattr(args, "android_file")
 
 
+def get_performance_settings(program_arguments: dict, args: list) -> None:
+    """
+    A function to get the parallel rendering and profiling settings based on the provided arguments.
+    Args:
+        program_arguments (dict): Dictionary to store the extracted settings.
+        args (list): List of arguments to extract the settings from.
+    Returns:
+        None
+    """
+    # Number of worker processes to render the Projects with
+    if parallel := get_arg_if_in_list(args, "parallel"):
+        program_arguments["parallel"] = parallel
+
+    # Profiling the memory (or with cProfile) is profiling.
+    if profiling_memory := get_arg_if_in_list(args, "profiling_memory"):
+        program_arguments["profiling_memory"] = profiling_memory
+    if program_arguments["profiling_memory"] or program_arguments["profiling_cprofile"]:
+        program_arguments["profiling"] = True
+
+
 def process_extended_arguments(args: list) -> None:
     """
     Process extended arguments from the command line.
@@ -259,6 +281,9 @@ def process_extended_arguments(args: list) -> None:
     if view_limit := get_arg_if_in_list(args, "view_limit"):
         program_arguments["view_limit"] = view_limit
 
+    # Parallel rendering and profiling
+    get_performance_settings(program_arguments, args)
+
 
 # Get our parsed program arguments and save them to PrimeItems.program_args"]
 def get_runtime_arguments(args: list) -> None:
@@ -440,8 +465,12 @@ def unit_test() -> namedtuple:  # noqa: PYI024
         names=False,
         o=False,
         p=False,
+        parallel=0,
         pretty=False,
         profile=None,
+        profiling=False,
+        profiling_cprofile=False,
+        profiling_memory=0,
         project=None,
         reset=False,
         runtime=False,
@@ -0,0 +1,281 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# runprof: profile a run: how long each phase and Project takes, and what it did      #
+#                                                                                      #
+#          With the 'profiling' runtime option, the wall and CPU time of each phase   #
+#          of the run (reading the backup, the Projects, the outline, writing the     #
+#          map...) and of each Project are recorded, along with counts of what was    #
+#          done (Actions decoded, unknown Action codes, cache hits, lines written).   #
+#          When the map is done, a summary is displayed (on stderr) and the report is  #
+#          written to PROFILE_FILE, next to MapTasker.html.                            #
+#                                                                                      #
+#          'profiling_cprofile' also runs cProfile and saves its stats to             #
+#          PROFILE_STATS_FILE (see the pstats module), and 'profiling_memory' N adds   #
+#          the N places that allocated the most memory (tracemalloc) to the report.   #
+#                                                                                      #
+#          The phases can be nested: e.g. "write" includes "directory".               #
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import TYPE_CHECKING
+
+from maptasker.src.primitem import PrimeItems
+from maptasker.src.sysconst import MY_VERSION, PROFILE_FILE, PROFILE_STATS_FILE, logger
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+SUMMARY_PROJECTS = 10  # Number of the slowest Projects to display in the summary
+# What is counted (see profile_count), reported even if none were done.
+PROFILE_COUNTS = ("actions_decoded", "unknown_action_codes", "backup_cache_hits", "map_cache_hits", "lines_written")
+
+
+class RunProfile:
+    """Timings and counts recorded while mapping, if profiling (see start_profiling)"""
+
+    def __init__(self) -> None:
+        """
+        Start the profile with nothing recorded
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        """
+        self.phases = {}  # Phase name: {"seconds", "cpu_seconds", "calls"}
+        self.projects = {}  # Project name: {"seconds", "cpu_seconds", "calls"}
+        self.counts = Counter(dict.fromkeys(PROFILE_COUNTS, 0))  # What was done (see PROFILE_COUNTS)
+        self.start = (time.perf_counter(), time.process_time())
+        self.profiler = None  # The cProfile.Profile, if running it
+        self.memory_top = 0  # Number of places allocating memory to report, if tracing it
+
+    def add_time(self, table: dict, name: str, seconds: float, cpu_seconds: float, calls: int = 1) -> None:
+        """
+        Add the time taken by a phase/Project
+        Args:
+            table (dict): self.phases or self.projects
+            name (str): name of the phase/Project
+            seconds (float): the wall time
+            cpu_seconds (float): the CPU time
+            calls (int): the number of times it was done
+        Returns:
+            None
+        """
+        timing = table.setdefault(name, {"seconds": 0.0, "cpu_seconds": 0.0, "calls": 0})
+        timing["seconds"] += seconds
+        timing["cpu_seconds"] += cpu_seconds
+        timing["calls"] += calls
+
+    def merge(self, other: RunProfile) -> None:
+        """
+        Add what another profile recorded (e.g. that of a worker process, see projpool.py)
+        Args:
+            other (RunProfile): the other profile
+        Returns:
+            None
+        """
+        for table, other_table in ((self.phases, other.phases), (self.projects, other.projects)):
+            for name, timing in other_table.items():
+                self.add_time(table, name, timing["seconds"], timing["cpu_seconds"], timing["calls"])
+        self.counts.update(other.counts)
+
+
+# Time the "with" block into the current run's profile.
+@contextlib.contextmanager
+def timed(table_name: str, name: str) -> Iterator[None]:
+    """
+    Time what is done in the "with" block, if profiling.
+        Args:
+            table_name (str): "phases" or "projects"
+            name (str): name of the phase/Project
+
+        Returns:
+            None
+    """
+    if (run_profile := PrimeItems.run_profile) is None:
+        yield
+        return
+    start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        run_profile.add_time(
+            getattr(run_profile, table_name),
+            name,
+            time.perf_counter() - start,
+            time.process_time() - cpu_start,
+        )
+
+
+# Time a phase of the run.
+def profile_phase(name: str) -> contextlib.AbstractContextManager:
+    """
+    Time a phase of the run: 'with profile_phase("outline"): ...'
+        Args:
+            name (str): name of the phase
+
+        Returns:
+            contextlib.AbstractContextManager: the context manager to time the phase with.
+    """
+    return timed("phases", name)
+
+
+# Time a Project.
+def profile_project(name: str) -> contextlib.AbstractContextManager:
+    """
+    Time the mapping of a Project: 'with profile_project(project_name): ...'
+        Args:
+            name (str): name of the Project
+
+        Returns:
+            contextlib.AbstractContextManager: the context manager to time the Project with.
+    """
+    return timed("projects", name)
+
+
+# Count something that was done.
+def profile_count(name: str, amount: int = 1) -> None:
+    """
+    Count something that was done (e.g. "actions_decoded"), if profiling.
+        Args:
+            name (str): what was done
+            amount (int): how many times
+
+        Returns:
+            None
+    """
+    if (run_profile := PrimeItems.run_profile) is not None:
+        run_profile.counts[name] += amount
+
+
+# Start profiling the run, if asked to.
+def start_profiling() -> None:
+    """
+    Start profiling the current run if the 'profiling' runtime option is set, running
+    cProfile and/or tracing the memory allocated if asked to.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    program_arguments = PrimeItems.program_arguments
+    if not program_arguments["profiling"]:
+        PrimeItems.run_profile = None
+        return
+    run_profile = RunProfile()
+    if program_arguments["profiling_memory"]:
+        import tracemalloc
+
+        run_profile.memory_top = program_arguments["profiling_memory"]
+        tracemalloc.start()
+    if program_arguments["profiling_cprofile"]:
+        import cProfile
+
+        run_profile.profiler = cProfile.Profile()
+        run_profile.profiler.enable()
+    PrimeItems.run_profile = run_profile
+
+
+# Get the report of the profile.
+def get_profile_report(run_profile: RunProfile) -> dict:
+    """
+    Get the report of what the profile recorded.
+        Args:
+            run_profile (RunProfile): the profile
+
+        Returns:
+            dict: "version", "file", "seconds", "cpu_seconds" (of the whole run so far),
+                "phases", "projects" (each {name: {"seconds", "cpu_seconds", "calls"}}),
+                "counts" and "totals" (the grand totals).
+    """
+    start, cpu_start = run_profile.start
+    backup_file = PrimeItems.program_arguments["file"]
+    return {
+        "version": MY_VERSION,
+        "file": backup_file if isinstance(backup_file, str) else getattr(backup_file, "name", ""),
+        "seconds": time.perf_counter() - start,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "phases": run_profile.phases,
+        "projects": run_profile.projects,
+        "counts": dict(sorted(run_profile.counts.items())),
+        "totals": dict(PrimeItems.grand_totals),
+    }
+
+
+# Format the summary of the report.
+def format_profile_summary(report: dict) -> list:
+    """
+    Format the summary of a profile report for display.
+        Args:
+            report (dict): from get_profile_report
+
+        Returns:
+            list: the lines of the summary.
+    """
+    lines = [f"MapTasker profile: {report['seconds']:.3f}s ({report['cpu_seconds']:.3f}s CPU)"]
+    lines.extend(
+        f"  {name:<24} {timing['seconds']:>9.3f}s {timing['cpu_seconds']:>9.3f}s CPU"
+        for name, timing in report["phases"].items()
+    )
+    if report["projects"]:
+        slowest = sorted(report["projects"].items(), key=lambda item: item[1]["seconds"], reverse=True)
+        lines.append(f"  Slowest Projects (of {len(slowest)}):")
+        lines.extend(
+            f"    {name[:22]:<22} {timing['seconds']:>9.3f}s {timing['cpu_seconds']:>9.3f}s CPU"
+            for name, timing in slowest[:SUMMARY_PROJECTS]
+        )
+    if report["counts"]:
+        counts = ", ".join(f"{name.replace('_', ' ')}: {value:,}" for name, value in report["counts"].items())
+        lines.append(f"  {counts}")
+    lines.extend(
+        f"  {allocation['size'] / 1024:>9.1f} KiB in {allocation['count']:,} blocks: {allocation['where']}"
+        for allocation in report.get("memory", [])
+    )
+    return lines
+
+
+# Stop profiling, and report.
+def finish_profiling(output_dir: str) -> dict | None:
+    """
+    Stop profiling the current run, display the summary on stderr and write the report
+    (and the cProfile stats) to the output directory.
+        Args:
+            output_dir (str): the directory MapTasker.html was written to
+
+        Returns:
+            dict | None: the report, or None if not profiling.
+    """
+    if (run_profile := PrimeItems.run_profile) is None:
+        return None
+    PrimeItems.run_profile = None
+
+    report = get_profile_report(run_profile)
+    if run_profile.profiler is not None:
+        run_profile.profiler.disable()
+        report["profile_stats"] = os.path.join(output_dir, PROFILE_STATS_FILE)
+        run_profile.profiler.dump_stats(report["profile_stats"])
+    if run_profile.memory_top:
+        import tracemalloc
+
+        statistics = tracemalloc.take_snapshot().statistics("lineno")
+        tracemalloc.stop()
+        report["memory"] = [
+            {"where": str(statistic.traceback), "size": statistic.size, "count": statistic.count}
+            for statistic in statistics[: run_profile.memory_top]
+        ]
+
+    report_file = os.path.join(output_dir, PROFILE_FILE)
+    with open(report_file, "w", encoding="utf-8") as profile_file:
+        json.dump(report, profile_file, indent=2)
+    logger.debug(f"runprof: profile written to {report_file}")
+
+    print("\n".join([*format_profile_summary(report), f"  Report: {report_file}"]), file=sys.stderr)
+    return report
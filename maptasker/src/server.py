@@ -0,0 +1,457 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# server: 'maptasker serve' - a long-running local server that renders maps            #
+#                                                                                      #
+#         The server keeps the backups it has parsed, and the maps rendered from       #
+#         them, in memory (see modcache.py), so rendering the same backup again does   #
+#         not pay for starting up, parsing the xml and decoding the Actions again.     #
+#                                                                                      #
+#         Requests...                                                                  #
+#           POST /render?display_detail_level=3&directory=true                         #
+#                 The body is the backup xml.  The query holds the runtime options.   #
+#           POST /render  (Content-Type: application/json)                             #
+#                 {"path": "/x/backup.xml" or "backup": "<xml...>",                    #
+#                  "options": {...}, "colors": {...}, "source_name": "..."}            #
+#                 A path (or ?path=) is only allowed if the server is started with     #
+#                 '-allow-paths DIR', and then only for backups in that directory.     #
+#           GET  /status                                                               #
+#                 The cache statistics, as json.                                       #
+#                                                                                      #
+#         The map is returned as text/html.  Errors are returned as text/plain with    #
+#         status 400 (bad request/backup), 403 (path not allowed), 404 (path not       #
+#         found) or 413 (body larger than '-max-body' megabytes).                      #
+#                                                                                      #
+#         Example:                                                                     #
+#             maptasker serve -port 8765 -workers 4 -memory 512                        #
+#             curl --data-binary @backup.xml 'http://127.0.0.1:8765/render?directory=true'
+#                                                                                      #
+# MIT License   Refer to https://opensource.org/license/mit                            #
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import socket
+import socketserver
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import parse_qsl, urlsplit
+
+from maptasker.src.modcache import ModelCache, get_result_key
+from maptasker.src.render import RenderError, load_model, render_model
+from maptasker.src.sysconst import logger
+
+if TYPE_CHECKING:
+    from maptasker.src.render import Model
+
+DEFAULT_SERVER_HOST = "127.0.0.1"
+DEFAULT_SERVER_PORT = 8765
+DEFAULT_SERVER_MEMORY = 512  # Megabytes
+DEFAULT_SERVER_MAX_BODY = 256  # Megabytes
+
+
+# Get a query string value as json (numbers, true/false), or as is if it isn't json.
+def get_query_value(value: str) -> object:
+    """
+    Convert a query string value to the type of the runtime argument.
+        Args:
+            value (str): the value from the query string (e.g. "3", "true" or "Tasker HTTP API")
+
+        Returns:
+            object: the value as an int/bool/etc. if it is json, otherwise the string.
+    """
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+# Get the render request from the http request.
+def get_render_request(query: str, content_type: str, body: bytes) -> dict:
+    """
+    Get the backup, options, colors and source name from the http request.
+        Args:
+            query (str): the url query string
+            content_type (str): the Content-Type header
+            body (bytes): the request body
+
+        Returns:
+            dict: the render request, with keys "backup" (bytes or None), "path" (str),
+                "options" (dict), "colors" (dict) and "source_name" (str).
+
+        Raises:
+            ValueError: if the request is not valid.
+    """
+    if content_type.split(";", 1)[0].strip() == "application/json":
+        request = json.loads(body)
+        if not isinstance(request, dict):
+            error = "The request must be a json object."
+            raise ValueError(error)
+        backup = request.get("backup")
+        request = {
+            "backup": backup.encode("utf-8") if backup is not None else None,
+            "path": request.get("path", ""),
+            "options": request.get("options", {}),
+            "colors": request.get("colors", {}),
+            "source_name": request.get("source_name", ""),
+        }
+    else:
+        options = {key: get_query_value(value) for key, value in parse_qsl(query)}
+        request = {
+            "backup": body or None,
+            "path": options.pop("path", ""),
+            "options": options,
+            "colors": {},
+            "source_name": options.pop("source_name", ""),
+        }
+
+    if request["backup"] is None and not request["path"]:
+        error = "No backup: send the backup xml as the body, or its path."
+        raise ValueError(error)
+    return request
+
+
+class RenderService:
+    """Renders the requests using the model cache and a pool of worker threads"""
+
+    def __init__(self, workers: int, memory_budget: int, allow_paths: str = "") -> None:
+        """
+        Initialize the service
+        Args:
+            self: The instance of the class
+            workers (int): number of maps to render at once
+            memory_budget (int): maximum estimated memory for the model cache, in bytes
+            allow_paths (str): directory of the backups that can be rendered by path, or "" for none
+        Returns:
+            None
+        """
+        self.cache = ModelCache(memory_budget)
+        self.allow_paths = Path(allow_paths).resolve() if allow_paths else None
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="maptasker-render")
+
+    def render(self, request: dict) -> tuple:
+        """
+        Render the request in a worker thread.
+        Args:
+            self: The instance of the class
+            request (dict): the render request (see get_render_request)
+        Returns:
+            tuple: the RenderResult, True if the backup was cached and True if the map was cached.
+        """
+        return self.executor.submit(self.render_request, request).result()
+
+    def render_request(self, request: dict) -> tuple:
+        """
+        Render the request, using the cached backup and map if we have them.
+        Args:
+            self: The instance of the class
+            request (dict): the render request (see get_render_request)
+        Returns:
+            tuple: the RenderResult, True if the backup was cached and True if the map was cached.
+        """
+        if request["backup"] is not None:
+            backup = request["backup"]
+            key = f"sha256:{hashlib.sha256(backup).hexdigest()}"
+            source_name = request["source_name"] or "backup.xml"
+
+            def loader() -> Model:
+                return load_model(backup)
+
+        else:
+            path = self.get_allowed_path(request["path"])
+            stat = path.stat()
+            # A changed file is a new backup.
+            key = f"{path}:{stat.st_mtime_ns}:{stat.st_size}"
+            source_name = request["source_name"] or path.name
+
+            def loader() -> Model:
+                return load_model(path.read_bytes())
+
+        # The server's threads can not fork worker processes.
+        options = request["options"] | {"parallel": 0}
+        colors = request["colors"]
+
+        model, model_cached = self.cache.get_model(key, loader)
+        result, result_cached = self.cache.get_result(
+            key,
+            get_result_key(options, colors, source_name),
+            lambda: render_model(model, options, colors, source_name),
+        )
+        return result, model_cached, result_cached
+
+    def get_allowed_path(self, path: str) -> Path:
+        """
+        Get the backup's path, if it is one the server is allowed to read.
+        Args:
+            self: The instance of the class
+            path (str): the path of the backup, from the request
+        Returns:
+            Path: the resolved path (symbolic links followed).
+        Raises:
+            PermissionError: if the path is not in the -allow-paths directory.
+        """
+        if self.allow_paths is None:
+            error = "Backup paths are not allowed: send the backup xml, or start the server with -allow-paths DIR."
+            raise PermissionError(error)
+        resolved_path = Path(self.allow_paths, path).resolve()
+        if not resolved_path.is_relative_to(self.allow_paths):
+            error = f"Backup path is not in {self.allow_paths}: {path}"
+            raise PermissionError(error)
+        return resolved_path
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker threads
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        """
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class RenderRequestHandler(BaseHTTPRequestHandler):
+    """Handle the http requests: POST /render and GET /status"""
+
+    server_version = "MapTasker"
+
+    def do_GET(self) -> None:
+        """
+        Handle GET /status
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        """
+        if urlsplit(self.path).path != "/status":
+            self.send_text(404, "Not found.  Use POST /render or GET /status.")
+            return
+        self.send_body(200, "application/json", json.dumps(self.server.render_service.cache.get_stats()).encode())
+
+    def do_POST(self) -> None:
+        """
+        Handle POST /render
+        Args:
+            self: The instance of the class
+        Returns:
+            None
+        """
+        url = urlsplit(self.path)
+        if url.path != "/render":
+            self.send_text(404, "Not found.  Use POST /render or GET /status.")
+            return
+
+        if (body := self.read_body()) is None:
+            return
+        try:
+            request = get_render_request(url.query, self.headers.get("Content-Type", ""), body)
+            result, model_cached, result_cached = self.server.render_service.render(request)
+        except (RenderError, ValueError, TypeError) as e:
+            self.send_text(400, str(e))
+            return
+        except PermissionError as e:
+            self.send_text(403, str(e))
+            return
+        except OSError as e:
+            self.send_text(404, f"Backup not found: {e}")
+            return
+
+        self.send_body(
+            200,
+            "text/html; charset=utf-8",
+            result.html.encode("utf-8"),
+            {
+                "X-MapTasker-Model-Cache": "hit" if model_cached else "miss",
+                "X-MapTasker-Result-Cache": "hit" if result_cached else "miss",
+                "X-MapTasker-Totals": json.dumps(result.totals),
+            },
+        )
+
+    def read_body(self) -> bytes | None:
+        """
+        Read the request body, if its Content-Length is valid and within the server's limit.
+        Args:
+            self: The instance of the class
+        Returns:
+            bytes | None: the body, or None if an error was sent instead.
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_text(400, "Invalid Content-Length.")
+            return None
+        if length > self.server.max_body:
+            # The body is not read, so the connection can not be used again.
+            self.close_connection = True
+            self.send_text(413, f"The body is larger than the limit of {self.server.max_body:,} bytes.")
+            return None
+        return self.rfile.read(length)
+
+    def send_text(self, status: int, message: str) -> None:
+        """
+        Send a text message (e.g. an error)
+        Args:
+            self: The instance of the class
+            status (int): http status
+            message (str): the message
+        Returns:
+            None
+        """
+        self.send_body(status, "text/plain; charset=utf-8", f"{message}\n".encode())
+
+    def send_body(self, status: int, content_type: str, body: bytes, headers: dict | None = None) -> None:
+        """
+        Send the response
+        Args:
+            self: The instance of the class
+            status (int): http status
+            content_type (str): Content-Type of the body
+            body (bytes): the body
+            headers (dict | None): other headers to send
+        Returns:
+            None
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in (headers or {}).items():
+            self.send_header(header, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self) -> str:
+        """
+        Get the client's address for the log (there is none for a Unix socket)
+        Args:
+            self: The instance of the class
+        Returns:
+            str: the client's address
+        """
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """
+        Log the request to our log rather than stderr
+        Args:
+            self: The instance of the class
+            format (str): the message format
+            args: the message arguments
+        Returns:
+            None
+        """
+        logger.info(f"server: {self.address_string()} {format % args}")
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """Threaded http server on a Unix socket"""
+
+    daemon_threads = True
+
+
+# Parse the 'maptasker serve' arguments.
+def get_serve_arguments(args: list) -> argparse.Namespace:
+    """
+    Parse the 'maptasker serve' arguments
+        Args:
+            args (list): the arguments after 'serve'
+
+        Returns:
+            argparse.Namespace: the arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="maptasker serve",
+        description="Run a local server that renders Tasker backups into maps.",
+    )
+    parser.add_argument("-host", default=DEFAULT_SERVER_HOST, help="Address to listen on.  Default: 127.0.0.1")
+    parser.add_argument("-port", type=int, default=DEFAULT_SERVER_PORT, help="Port to listen on.  Default: 8765")
+    parser.add_argument("-socket", default="", help="Listen on this Unix socket path rather than a TCP port.")
+    parser.add_argument(
+        "-workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Number of maps to render at once.  Default: number of cpus",
+    )
+    parser.add_argument(
+        "-memory",
+        type=int,
+        default=DEFAULT_SERVER_MEMORY,
+        help="Memory budget for the cached backups and maps, in megabytes.  Default: 512",
+    )
+    parser.add_argument(
+        "-max-body",
+        type=int,
+        default=DEFAULT_SERVER_MAX_BODY,
+        help="Largest request body (backup) accepted, in megabytes.  Default: 256",
+    )
+    parser.add_argument(
+        "-allow-paths",
+        default="",
+        metavar="DIR",
+        help="Allow backups to be rendered by their path, for backups in this directory only.  Default: no paths",
+    )
+    return parser.parse_args(args)
+
+
+# Create the http server
+def make_server(arguments: argparse.Namespace, render_service: RenderService) -> socketserver.BaseServer:
+    """
+    Create the http server on the TCP port or Unix socket.
+        Args:
+            arguments (argparse.Namespace): the 'maptasker serve' arguments
+            render_service (RenderService): the service to render the requests with
+
+        Returns:
+            socketserver.BaseServer: the server
+    """
+    if arguments.socket:
+        if not hasattr(socket, "AF_UNIX"):
+            error = "Unix sockets are not supported on this platform."
+            raise ValueError(error)
+        # Remove the socket left by a previous server.
+        Path(arguments.socket).unlink(missing_ok=True)
+        server = ThreadingUnixHTTPServer(arguments.socket, RenderRequestHandler)
+    else:
+        server = ThreadingHTTPServer((arguments.host, arguments.port), RenderRequestHandler)
+    server.render_service = render_service
+    server.max_body = arguments.max_body * 1024 * 1024
+    return server
+
+
+# 'maptasker serve': run the render server until interrupted.
+def serve(args: list) -> int:
+    """
+    Run the render server until interrupted (Ctrl-C).
+        Args:
+            args (list): the arguments after 'serve'
+
+        Returns:
+            int: exit code
+    """
+    arguments = get_serve_arguments(args)
+    render_service = RenderService(max(arguments.workers, 1), arguments.memory * 1024 * 1024, arguments.allow_paths)
+    try:
+        server = make_server(arguments, render_service)
+    except (OSError, ValueError) as e:
+        print(f"MapTasker server: unable to listen: {e}")
+        render_service.shutdown()
+        return 1
+
+    where = arguments.socket or f"http://{arguments.host}:{server.server_address[1]}"
+    print(f"MapTasker server listening on {where}.  Press Ctrl-C to stop.")
+    logger.info(f"server: listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        render_service.shutdown()
+        if arguments.socket:
+            Path(arguments.socket).unlink(missing_ok=True)
+    return 0
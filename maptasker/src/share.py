@@ -7,6 +7,7 @@
 #                                                                                      #
 import defusedxml.ElementTree  # Need for type hints
 
+from maptasker.src.addcss import style_token
 from maptasker.src.format import format_html
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import FormatLine
@@ -87,7 +88,7 @@ def description_element_output(
     )
 
     # Replace all of the Taskernet imbedded HTML with our HTML.
-    indent_html = f'<div <span class="{PrimeItems.colors_to_use["taskernet_color"]} {tab}"></span"></div>'
+    indent_html = f'<div <span class="{style_token("taskernet_color")} {tab}"></span"></div>'
 
     # Indent the description and override various embedded HTML attributes
     out_string = out_string.replace("<p>", indent_html)
@@ -110,7 +111,7 @@ def description_element_output(
         "<table>",
         (
             "\n<style>\n.myTable2 {\n color:"
-            + PrimeItems.colors_to_use["taskernet_color"]
+            + style_token("taskernet_color")
             + ';}\n</style>\n<table class="myTable2 {tab}">'
         ),
     )
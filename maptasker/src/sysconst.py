@@ -35,6 +35,10 @@ ERROR_FILE = ".maptasker_error.txt"
 ANALYSIS_FILE = "MapTasker_Analysis.txt"
 DIAGRAM_FILE = "MapTasker_Map.txt"
 SYSTEM_SETTINGS_FILE = ".MapTasker_Settings.pkl"
+FONT_CACHE_FILE = ".MapTasker_Fonts.json"
+AI_CACHE_FILE = ".MapTasker_AiCache.json"
+PROFILE_FILE = "MapTasker_Profile.json"
+PROFILE_STATS_FILE = "MapTasker_Profile.pstats"
 
 #  List of color arguments and their names
 #  Two different key/value structures in one:
@@ -130,8 +134,12 @@ ARGUMENT_NAMES = {
     "view_limit": "View Limit",
     "map_window_position": "Last Map Window Position",
     "outline": "Display Configuration Outline",
+    "parallel": "Parallel Rendering Processes",
     "preferences": "Display Tasker Preferences",
     "pretty": "Display Prettier Output",
+    "profiling": "Profile the Run",
+    "profiling_cprofile": "Profile the Run with cProfile",
+    "profiling_memory": "Profile the Memory of the Run (Top N)",
     "rerun": "ReRun Program",
     "runtime": "Display Runtime Arguments/Settings",
     "single_profile_name": "Single Profile Name",
@@ -157,6 +165,9 @@ SYSTEM_ARGUMENTS = [
     "rerun",
 ]
 
+# Runtime arguments that only apply to the run they are given for, and so are not saved.
+RUN_ONLY_ARGUMENTS = ["parallel"]
+
 # Debug stuff
 logger = logging.getLogger("MapTasker")
 debug_out = False  # Prints the line to be added to the output
@@ -6,6 +6,7 @@
 # MIT License   Refer to https://opensource.org/license/mit                            #
 from __future__ import annotations
 
+import itertools
 from typing import TYPE_CHECKING
 
 import maptasker.src.tasks as tasks
@@ -14,13 +15,15 @@ from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import UNKNOWN_TASK_NAME, FormatLine
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
     import defusedxml.ElementTree
 
 
 # Go through list of actions and output them
 def output_list_of_actions(
     action_count: int,
-    alist: list,
+    alist: Iterable[str],
     the_item: defusedxml.ElementTree.XML,
 ) -> None:
     """
@@ -28,7 +31,8 @@ def output_list_of_actions(
 
     Parameters:
         :param action_count: count of Task actions
-        :param alist: list of task actions
+        :param alist: list (or lazy iterator) of task actions.  We stop pulling
+            Actions once we have output as many as the detail level displays.
         :param the_item: the specific Task's detailed line
 
     Returns: the count of the number of times the program has been called
@@ -109,13 +113,15 @@ def get_task_actions_and_output(
 
         # Get Task actions
         if the_task is not None:
-            # If we have Task Actions, then output them.  The action list is a list of the Action output lines already
-            # formatted.
-            if alist := tasks.get_actions(the_task):
+            # If we have Task Actions, then output them.  The action list is a lazy iterator of the Action output
+            # lines already formatted, so Actions that aren't displayed are never decoded (the ones that are, are
+            # decoded in full for the detail level).
+            alist = tasks.iter_actions(the_task)
+            if (first_action := next(alist, None)) is not None:
                 # Start a list of Actions
                 PrimeItems.output_lines.add_line_to_output(1, "", FormatLine.dont_format_line)
                 action_count = 1
-                output_list_of_actions(action_count, alist, the_item)
+                output_list_of_actions(action_count, itertools.chain([first_action], alist), the_item)
                 # End list if Scene Task
                 if "&#45;&#45;Task:" in list_type:
                     PrimeItems.output_lines.add_line_to_output(3, "", FormatLine.dont_format_line)
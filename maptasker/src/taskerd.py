@@ -5,13 +5,146 @@
 #                                                                                      #
 # taskerd: get Tasker data from backup xml                                             #
 #                                                                                      #
+from __future__ import annotations
+
+import os
+import threading
+from typing import TYPE_CHECKING
+
 import defusedxml.ElementTree as ET  # noqa: N817
 
+from maptasker.src.crossref import get_cross_reference
 from maptasker.src.error import error_handler
 from maptasker.src.primitem import PrimeItems
+from maptasker.src.runprof import profile_count
+from maptasker.src.shelsort import sort_by_sr
 from maptasker.src.sysconst import FormatLine, logger
 from maptasker.src.xmldata import rewrite_xml
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from xml.etree.ElementTree import ElementTree
+
+# The last backup loaded, kept so that a rerun of the same (unchanged) file can reuse it
+# rather than parse it all over again:
+#   key = (file path, modification time, size) of the backup file
+#   xml_tree/tasker_root_elements/cross_reference = the loaded backup
+# It outlives the runs (MapRun), and serves the interactive GUI/CLI process only: the render
+# API and the server keep their own backups (see render.py and modcache.py).  The GUI loads
+# backups in a worker thread (see guiload.py), so it is only used with its lock held.
+kept_model = {}
+kept_model_lock = threading.Lock()
+
+
+# Get the key to keep the loaded backup file by.
+def get_model_key(file_name: str) -> tuple | None:
+    """
+    Get the key to keep the loaded backup by: its path, modification time and size.
+        Args:
+            file_name (str): the backup file
+
+        Returns:
+            tuple | None: the key, or None if the file can not be found.
+    """
+    try:
+        stat = os.stat(file_name)
+    except (OSError, TypeError):
+        return None
+    return (os.path.abspath(file_name), stat.st_mtime_ns, stat.st_size)
+
+
+# Keep the backup just loaded for the next run.
+def keep_the_model(key: tuple | None) -> None:
+    """
+    Keep the backup just loaded, so that a rerun of the same file can reuse it.
+        Args:
+            key (tuple | None): the key of the backup file (see get_model_key)
+
+        Returns:
+            None
+    """
+    model = {}
+    if key is not None:
+        model = {
+            "key": key,
+            "xml_tree": PrimeItems.xml_tree,
+            "tasker_root_elements": PrimeItems.tasker_root_elements,
+            "cross_reference": get_cross_reference(),
+        }
+    with kept_model_lock:
+        kept_model.clear()
+        kept_model.update(model)
+
+
+# Reuse the backup we kept, if it is the same file and hasn't changed.
+def reuse_the_model(key: tuple | None) -> bool:
+    """
+    Reuse the backup loaded by the last run, if it is for the same unchanged file.
+        Args:
+            key (tuple | None): the key of the backup file (see get_model_key)
+
+        Returns:
+            bool: True if the kept backup is being reused, False if the file has to be loaded.
+    """
+    with kept_model_lock:
+        model = dict(kept_model)
+    if key is None or model.get("key") != key:
+        return False
+    PrimeItems.xml_tree = model["xml_tree"]
+    PrimeItems.xml_root = PrimeItems.xml_tree.getroot()
+    PrimeItems.tasker_root_elements = model["tasker_root_elements"]
+    PrimeItems.cross_reference = model["cross_reference"]
+    logger.debug(f"taskerd: reusing the backup already loaded from {key[0]}")
+    profile_count("backup_cache_hits")
+    return True
+
+
+# Forget the kept backup (it is being cleared or changed).
+def forget_the_model() -> None:
+    """
+    Forget the backup kept for the next run.
+        Args:
+            None
+
+        Returns:
+            None
+    """
+    with kept_model_lock:
+        kept_model.clear()
+
+
+class ProgressFile:
+    """Binary file that reports how much of it has been read, as it is parsed"""
+
+    def __init__(self, xml_file: object, progress: Callable[[int, int], None]) -> None:
+        """
+        Initialize the file
+        Args:
+            self: The instance of the class
+            xml_file (object): the open (binary) file
+            progress (Callable): called with the number of bytes read so far and the file size
+        Returns:
+            None
+        """
+        self.xml_file = xml_file
+        self.progress = progress
+        self.bytes_read = 0
+        self.file_size = os.fstat(xml_file.fileno()).st_size
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read from the file and report the progress
+        Args:
+            self: The instance of the class
+            size (int): number of bytes to read (-1 = all)
+        Returns:
+            bytes: the data read
+        """
+        data = self.xml_file.read(size)
+        self.bytes_read += len(data)
+        self.progress(self.bytes_read, self.file_size)
+        return data
+
 
 # Convert list of xml to dictionary
 def move_xml_to_table(all_xml: list, get_id: bool, name_qualifier: str) -> dict:
@@ -37,13 +170,31 @@ def move_xml_to_table(all_xml: list, get_id: bool, name_qualifier: str) -> dict:
     return new_table
 
 
+# Parse the backup file, reporting our progress if asked to.
+def parse_the_xml(file_to_parse: str, progress: Callable[[int, int], None] | None) -> ElementTree:
+    """
+    Parse the backup file's xml.
+        Args:
+            file_to_parse (str): the backup file
+            progress (Callable | None): if given, called with the number of bytes parsed so far and the file size.
+
+        Returns:
+            ElementTree: the parsed xml tree
+    """
+    xmlp = ET.XMLParser(encoding="utf-8")
+    if progress is None:
+        return ET.parse(file_to_parse, parser=xmlp)
+    with open(file_to_parse, "rb") as xml_file:
+        return ET.parse(ProgressFile(xml_file, progress), parser=xmlp)
+
+
 # Load all of the Projects, Profiles and Tasks into a format we can easily
 # navigate through.
-def get_the_xml_data() -> bool:
+def get_the_xml_data(progress: Callable[[int, int], None] | None = None) -> bool:
     # Put this code into a while loop in the event we have to re-call it again.
     """Gets the XML data from a Tasker backup file and returns it in a dictionary.
     Parameters:
-        - None
+        - progress (Callable | None): if given, called with the number of bytes parsed so far and the file size.
     Returns:
         - int: 0 if successful, 1 if bad XML, 2 if not a Tasker backup file, 3 if not a valid Tasker backup file.
     Processing Logic:
@@ -61,14 +212,17 @@ def get_the_xml_data() -> bool:
     counter = 0
     error_message = ""
 
+    # Reuse the backup we already have if this is a rerun of the same, unchanged, file.
+    if reuse_the_model(get_model_key(PrimeItems.file_to_get.name)):
+        return 0
+
     while process_file:
         # Import xml...
         # Define the XML parser with ISO encoding since that is what Joao outputs his XML with.
         # # If we still get an encoding error then rewrite the XML with proper ISO encoding and try again.
         file_to_parse = PrimeItems.file_to_get.name
         try:
-            xmlp = ET.XMLParser(encoding="utf-8")
-            PrimeItems.xml_tree = ET.parse(file_to_parse, parser=xmlp)
+            PrimeItems.xml_tree = parse_the_xml(file_to_parse, progress)
             process_file = False  # Get out of while/loop
         except ET.ParseError:  # Parsing error
             PrimeItems.xml_tree = None
@@ -99,6 +253,20 @@ def get_the_xml_data() -> bool:
         PrimeItems.error_msg = error_message
         return 1
 
+    return_code = load_the_xml_data()
+    if return_code == 0:
+        keep_the_model(get_model_key(file_to_parse))
+    return return_code
+
+
+# Load the Projects, Profiles, Tasks and Scenes from the parsed xml tree.
+def load_the_xml_data() -> int:
+    """Loads the Projects, Profiles, Tasks and Scenes from the parsed xml tree (PrimeItems.xml_tree).
+    Parameters:
+        - None
+    Returns:
+        - int: 0 if successful, 3 if not a Tasker backup file.
+    """
     # Get the xml root
     PrimeItems.xml_root = PrimeItems.xml_tree.getroot()
 
@@ -123,6 +291,11 @@ def get_the_xml_data() -> bool:
     all_tasks = move_xml_to_table(all_tasks_list, True, "nme")
     all_scenes = move_xml_to_table(all_scenes_list, False, "nme")
 
+    # Task's Action statements can be out-of-order in the xml.  Put each Task's Actions
+    # in order (by attrib sr='act0', act1, act2, etc.) once, here, and save them with the Task.
+    for task in all_tasks.values():
+        task["actions"] = sort_by_sr(task["xml"].findall("Action"))
+
     # Return all data in a dictionary for easier access
     PrimeItems.tasker_root_elements = {
         "all_projects": all_projects,
@@ -131,4 +304,6 @@ def get_the_xml_data() -> bool:
         "all_tasks": all_tasks,
         "all_services": all_services,
     }
+    # The cross-reference index is rebuilt (on demand) for the new data.
+    PrimeItems.cross_reference = {}
     return 0
@@ -7,6 +7,8 @@
 #                                                                                      #
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 import defusedxml.ElementTree  # Need for type hints
 
 import maptasker.src.actione as action_evaluate
@@ -16,52 +18,70 @@ from maptasker.src.format import format_html
 from maptasker.src.getids import get_ids
 from maptasker.src.kidapp import get_kid_app
 from maptasker.src.primitem import PrimeItems
-from maptasker.src.shelsort import shell_sort
+from maptasker.src.runprof import profile_count
+from maptasker.src.shelsort import sort_by_sr
 from maptasker.src.sysconst import UNKNOWN_TASK_NAME, DISPLAY_DETAIL_LEVEL_all_tasks, FormatLine, logger
 from maptasker.src.xmldata import tag_in_type
 
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
 blank = "&nbsp;"
 
 
-# Navigate through Task's Actions and identify each
-# Return a list of Task's actions for the given Task
-def get_actions(
-    current_task: defusedxml.ElementTree,
-) -> list:
+# Get the Task's <Action> elements in order.
+def get_sorted_actions(current_task: defusedxml.ElementTree) -> list:
     """
-    Get the actions for a task
+    Get the Task's Actions in their proper order.  The order is worked out once for each
+    Task when the backup is read in (see taskerd), so just use it if we have it.
     Args:
         current_task: defusedxml.ElementTree - The XML element of the current task
     Returns:
-        list - The list of actions for the task
+        list - The Task's <Action> elements, sorted by their "sr" attribute
+    """
+    task = PrimeItems.tasker_root_elements["all_tasks"].get(current_task.findtext("id", ""))
+    if task is not None and task["xml"] is current_task and "actions" in task:
+        return task["actions"]
+    # Not a Task we read in (e.g. a Scene element's Action).  Sort them now.
+    return sort_by_sr(current_task.findall("Action"))
+
+
+# Navigate through Task's Actions and identify each, one at a time.
+# Yield each of the Task's output lines as its Action is decoded.
+def iter_actions(
+    current_task: defusedxml.ElementTree,
+) -> Iterator[str]:
+    """
+    Lazily get the actions for a task.  Each Action is only decoded when the caller asks
+    for its output line(s), so callers that only display the first Action(s) (e.g. low
+    display detail levels) don't pay for decoding the rest.  The laziness is per Action
+    only: an Action that is asked for is decoded in full for the detail level (its
+    arguments, label and conditions are left out by the decoder, not decoded later).
+    Args:
+        current_task: defusedxml.ElementTree - The XML element of the current task
+    Yields:
+        str - The next output line for the task's actions
     Processing Logic:
         1. Get all <Action> elements from the current task
-        2. Sort the actions by their "sr" attribute to get them in proper order
-        3. Iterate through each action and get its code
+        2. Get the actions in proper order by their "sr" attribute (see get_sorted_actions)
+        3. Iterate through each action and get its code, as it is asked for
         4. Build the action and add indentation if it is a conditional statement
-        5. Return the list of actions
+        5. Yield the action's output line(s)
     """
-    tasklist = []
     blanks = f'{"&nbsp;" * PrimeItems.program_arguments["indent"]}'
 
-    # Get the Task's Actions (<Action> elements)
+    # Get the Task's Actions (<Action> elements), in proper order/sequence.
     try:
-        task_actions = current_task.findall("Action")
+        task_actions = get_sorted_actions(current_task)
     except defusedxml.DefusedXmlException:
         print("tasks.py current Task:", current_task)
         error_handler("Error: No action found!!!", 0)
-        return []
+        return
 
     # Process the Actions
     if task_actions:
         indentation_amount = ""
         indentation = 0
-        # Task's Action statements can be out-of-order, and we need them in
-        # proper-order/sequence.
-        # sort the Task's Actions by attrib sr (e.g. sr='act0', act1, act2, etc.)
-        # to get them in true order.
-        if len(task_actions) > 0:
-            shell_sort(task_actions, True, False)
 
         # Now go through each Action to start processing it.  They are in "argn" "n" order.
         for action in task_actions:
@@ -74,6 +94,7 @@ def get_actions(
                 True,
                 "t",
             )
+            profile_count("actions_decoded")
             # Log the Task action.
             # logger.debug(
             #     f'Task ID:{action.attrib["sr"]!s} Code:{child.text} task_code:{task_code}Action attr:{action.attrib!s}',
@@ -92,9 +113,9 @@ def get_actions(
                 number_of_blanks = task_code.find(":")
                 task_code = task_code.replace(",", f"<br>{blank*(number_of_blanks-70)}")  # Back out the "<span..."
 
-            # Build the output line.
-            tasklist = action_evaluate.build_action(
-                tasklist,
+            # Build the output line(s) for this Action and hand them back.
+            yield from action_evaluate.build_action(
+                [],
                 task_code,
                 child,
                 indentation,
@@ -106,7 +127,22 @@ def get_actions(
                 indentation += 1
                 indentation_amount = f"{indentation_amount}{blanks}"
 
-    return tasklist
+
+# Navigate through Task's Actions and identify each
+# Return a list of Task's actions for the given Task
+def get_actions(
+    current_task: defusedxml.ElementTree,
+) -> list:
+    """
+    Get the actions for a task
+    Args:
+        current_task: defusedxml.ElementTree - The XML element of the current task
+    Returns:
+        list - The list of actions for the task
+    Processing Logic:
+        Decode all of the Task's Actions (see iter_actions) and return them as a list.
+    """
+    return list(iter_actions(current_task))
 
 
 # Determine if the Task is an Entry or Exit Task.
@@ -7,6 +7,7 @@
 #                                                                                      #
 # MIT License   Refer to https://opensource.org/license/mit                            #
 
+from maptasker.src.crossref import find_task_ids_by_name
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import NO_PROJECT, NORMAL_TAB, UNKNOWN_TASK_NAME, FormatLine
 from maptasker.src.tasks import get_project_for_solo_task, get_task_name, output_task_list, task_in_scene
@@ -179,8 +180,14 @@ def process_tasks_not_called_by_profile(
     save_twisty = PrimeItems.program_arguments["twisty"]
     PrimeItems.program_arguments["twisty"] = False
 
+    # If looking for a single Task, go directly to the Task(s) with that name.
+    if single_task_name := PrimeItems.program_arguments["single_task_name"]:
+        task_ids = find_task_ids_by_name(single_task_name)
+    else:
+        task_ids = PrimeItems.tasker_root_elements["all_tasks"]
+
     # Go through all Tasks, one at a time, and see if this one is not in it (not found)
-    for task_id in PrimeItems.tasker_root_elements["all_tasks"]:
+    for task_id in task_ids:
         # If we just processed a single task only, then bail out.
         if PrimeItems.found_named_items["single_task_found"]:
             break
@@ -25,8 +25,11 @@ from maptasker.src.config import AI_PROMPT, DEFAULT_DISPLAY_DETAIL_LEVEL, OUTPUT
 
 # from CTkColorPicker.ctk_color_picker import AskColor
 from maptasker.src.ctk_color_picker import AskColor
+from maptasker.src.droidnet import fetch_android_exports
 from maptasker.src.getids import get_ids
 from maptasker.src.getputer import save_restore_args
+from maptasker.src.guiai import analyze_in_background
+from maptasker.src.guiload import fetch_and_validate_xml_file, load_xml_in_background
 from maptasker.src.guimap import get_the_map
 from maptasker.src.guiutils import (
     CHANGELOG,
@@ -78,7 +81,7 @@ from maptasker.src.guiwins import (
 from maptasker.src.initparg import initialize_runtime_arguments
 from maptasker.src.lineout import LineOut
 from maptasker.src.mapit import clean_up_memory, mapit_all
-from maptasker.src.maputils import update, validate_xml_file
+from maptasker.src.maputils import update
 from maptasker.src.primitem import PrimeItems
 from maptasker.src.sysconst import (
     ARGUMENT_NAMES,
@@ -91,7 +94,6 @@ from maptasker.src.sysconst import (
     DISPLAY_DETAIL_LEVEL_all_parameters,
     logger,
 )
-from maptasker.src.taskerd import get_the_xml_data
 
 # Color Modes: "System" (standard), "Dark", "Light"
 customtkinter.set_appearance_mode("System")
@@ -369,7 +371,7 @@ class MyGui(customtkinter.CTk):
             self.go_program
         ) = self.outline = self.rerun = self.list_files = self.runtime = self.save = self.twisty = self.directory = (
             self.pretty
-        ) = self.fetched_backup_from_android = False
+        ) = self.profiling = self.fetched_backup_from_android = False
         self.single_project_name = ""
         self.single_profile_name = ""
         self.single_task_name = ""
@@ -863,6 +865,8 @@ class MyGui(customtkinter.CTk):
             "tree_window_position",
             "guiview",
             "fetched_backup_from_android",
+            "profiling_cprofile",
+            "profiling_memory",
         }
         message_map = {
             "android_ipaddr": lambda: f"Android Get XML TCP IP Address set to {value}\n",
@@ -926,6 +930,12 @@ class MyGui(customtkinter.CTk):
                 "Display Prettier",
                 display=False,
             ),
+            "profiling": lambda: self.select_deselect_checkbox(
+                self.profiling_checkbox,
+                value,
+                "Profile the Run",
+                display=False,
+            ),
             "runtime": lambda: self.select_deselect_checkbox(
                 self.runtime_checkbox,
                 value,
@@ -1278,7 +1288,7 @@ class MyGui(customtkinter.CTk):
         Returns:
             bool: True if successful, False otherwise.
         """
-        return_code = get_xml(debug, appearance_mode)
+        return_code = get_xml(self, debug, appearance_mode)
         # Did we get an error reading the backup file?
         if return_code > 0:
             if return_code == 6:
@@ -1341,7 +1351,7 @@ class MyGui(customtkinter.CTk):
 
                 # Get the XML
                 PrimeItems.program_arguments["gui"] = True
-                return_code = get_the_xml_data()
+                return_code = load_xml_in_background(self)
                 if return_code != 0:
                     return False
 
@@ -1471,7 +1481,7 @@ class MyGui(customtkinter.CTk):
         return view
 
     # Display Ai Analysis response in a separate top level window.
-    def display_ai_response(self, error_msg: str) -> None:
+    def display_ai_response(self, error_msg: str) -> CTkTextview:
         """
         Display AI response in a GUI window.
 
@@ -1479,7 +1489,7 @@ class MyGui(customtkinter.CTk):
             error_msg (str): The error message to display in the GUI.
 
         Returns:
-            None
+            CTkTextview: the view, to add more of the response to as it comes (see guiai.py).
         """
         # create window if its None or destroyed
         if self.ai_analysis_window is None or not self.ai_analysis_window.winfo_exists():
@@ -1495,6 +1505,7 @@ class MyGui(customtkinter.CTk):
         analysisview = CTkTextview(master=self.ai_analysis_window, title="Analysis View", the_data=error_msg)
         analysisview.pack(padx=10, pady=10, fill="both", expand=True)
         analysisview.after(10, self.ai_analysis_window.lift)  # Make window jump to the front
+        return analysisview
 
     # Set and display the file name.
     def display_and_set_file(self, filename: str) -> None:
@@ -2042,6 +2053,34 @@ class EventHandlers:
         the_view.list_files_button.configure(text="List Files Selected")
         the_view.event_handlers.fetch_backup_event()
 
+    # Fetch all of the Project/Profile/Task/Scene exports listed on the Android device.
+    def fetch_exports_event(self) -> None:
+        """
+        Fetch all of the Tasker exports in the Android device's Tasker directory into the
+        current directory, several at once, and say which were fetched.
+        Args:
+            self: The class instance
+        Returns:
+            None
+        """
+        the_view = self.parent
+        return_code, results = fetch_android_exports(
+            the_view.android_ipaddr,
+            the_view.android_port,
+            "/storage/emulated/0/Tasker",
+        )
+        if return_code != 0:
+            the_view.display_message_box(results, "Red")
+            return
+        if not results:
+            the_view.display_message_box("There are no Project/Profile/Task/Scene exports to fetch.", "Orange")
+            return
+        for file_location, (file_return_code, file_name_or_error) in results.items():
+            if file_return_code == 0:
+                the_view.display_message_box(f"Fetched {file_location} into {file_name_or_error}", "Green")
+            else:
+                the_view.display_message_box(file_name_or_error, "Red")
+
     # User has selected a specific XML file to get from Android device from pulldown menu.
     def file_selected_event(self, android_file: str) -> None:
         """User has selected a specific Android XML file from pulldown menu.
@@ -2063,7 +2102,11 @@ class EventHandlers:
 
         # Validate XML file.
         PrimeItems.program_arguments["gui"] = True
-        return_code, error_message = validate_xml_file(the_view.android_ipaddr, the_view.android_port, android_file)
+        return_code, error_message = fetch_and_validate_xml_file(
+            the_view.android_ipaddr,
+            the_view.android_port,
+            android_file,
+        )
 
         # Not valid XML...
         if return_code > 0:
@@ -2119,6 +2162,7 @@ class EventHandlers:
             the_view.highlight_checkbox,
             the_view.underline_checkbox,
             the_view.runtime_checkbox,
+            the_view.profiling_checkbox,
             the_view.outline_checkbox,
             the_view.everything_checkbox,
         ]
@@ -2760,6 +2804,20 @@ class EventHandlers:
         the_view = self.parent
         the_view.runtime = the_view.get_input_and_put_message(the_view.runtime_checkbox, "Display Runtime Settings")
 
+    # Process the 'Profile the Run' checkbox
+    def profiling_checkbox_event(self) -> None:
+        """
+        Get input and put message for profiling checkbox
+        Args:
+            self: The class instance
+        Returns:
+            None: No return value
+        - Get value of profiling_checkbox input
+        - If checked, put message "Profile the Run" (see runprof.py)
+        - No return value, function modifies instance attributes"""
+        the_view = self.parent
+        the_view.profiling = the_view.get_input_and_put_message(the_view.profiling_checkbox, "Profile the Run")
+
     # Process the 'Save Settings' checkbox
     def save_settings_event(self) -> None:
         # Get program arguments from GUI and store in a temporary dictionary
@@ -2919,11 +2977,12 @@ class EventHandlers:
         Analyzes a single item identified by the current instance.
 
         This function checks if the instance has a single project name, profile name, or task name.
-        If so, it sets the `ai_analyze` attribute to True, displays a message box indicating the analysis is running
-        with the current model, and reruns the program.
+        If so, it starts the analysis in the background with the current model (see guiai.analyze_in_background),
+        and displays a message box saying it is running, or that an analysis is already running.  The response
+        shows up in the Analysis view as the model writes it.
 
-        If no single item is identified, it displays a message box indicating that a single project, profile,
-        or task has not been selected.
+        If no model is selected, no XML is loaded or no single item is identified, it displays a message box
+        saying so.
 
         Parameters:
             self (object): The current instance of the class.
@@ -2939,18 +2998,13 @@ class EventHandlers:
             the_view.single_profile_name = ""
         # Do we have a single item identified?
         if the_view.single_project_name or the_view.single_profile_name or the_view.single_task_name:
-            the_view.ai_analyze = True
             the_view.event_handlers.clear_messages_event()  # Clear out all displayed messages.
-            the_view.display_message_box(f"Running analysis with model {the_view.ai_model}.", "Green")
-
-            # Do the analysis.  First save our windows and settings.
-            store_windows(the_view)
-            temp_args = {value: getattr(the_view, value) for value in ARGUMENT_NAMES}
-            _, _ = save_restore_args(temp_args, the_view.color_lookup, True)
-
-            # Ok, run the analysis by rerunning the program with our ai_analyze = True
-            # The analysis output file will be created and displayed upon reentry to MyGui.
-            the_view.event_handlers.rerun_event()
+            # Run the analysis in the background.  The response shows up in the Analysis
+            # view as the model writes it.
+            if analyze_in_background(the_view):
+                the_view.display_message_box(f"Running analysis with model {the_view.ai_model}.", "Green")
+            else:
+                the_view.display_message_box("An analysis is already running.  Please wait for it.", "Orange")
         # Test if no XML data loaded
         elif (
             not PrimeItems.tasker_root_elements["all_projects"]
@@ -0,0 +1,110 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# conftest: fixtures shared by the tests                                               #
+#                                                                                      #
+#           serve: run an http server in a thread for the test.                        #
+#           stand_in: run a local stand-in of a server MapTasker talks to (Tasker's    #
+#                     HTTP server, the OpenAi api or Ollama), with the test module's   #
+#                     request handler, in a temporary current directory.              #
+#                                                                                      #
+from __future__ import annotations
+
+import contextlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    import socketserver
+    from collections.abc import Callable, Iterator
+    from pathlib import Path
+
+
+class StandInServer(ThreadingHTTPServer):
+    """A stand-in server, which keeps track of the requests it gets and has the test's settings"""
+
+    daemon_threads = True
+
+    def __init__(self, handler: type, settings: dict) -> None:
+        """Listen on a free local port, with the settings as attributes (e.g. delay=0.1)."""
+        super().__init__(("127.0.0.1", 0), handler)
+        self.requests = []  # What the handler records of each request it gets
+        self.active = []  # Number of requests being answered at once, as each one starts
+        self.lock = threading.Lock()
+        for name, value in settings.items():
+            setattr(self, name, value)
+
+    @property
+    def url(self) -> str:
+        """The server's url."""
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def record(self, request: tuple) -> None:
+        """Record a request."""
+        with self.lock:
+            self.requests.append(request)
+
+    @contextlib.contextmanager
+    def answering(self) -> Iterator[None]:
+        """Count the requests being answered at once, while in the "with" block."""
+        with self.lock:
+            self.active.append(self.active[-1] + 1 if self.active else 1)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.active.append(self.active[-1] - 1)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Base of the stand-in servers' request handlers: keeps the connection open, and doesn't log"""
+
+    protocol_version = "HTTP/1.1"
+
+    def send(self, status: int, body: bytes, headers: dict, cut_off: int = 0) -> None:
+        """Send the response, closing the connection after cut_off bytes of the body if it isn't 0."""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        if cut_off:
+            body = body[:cut_off]
+            self.close_connection = True
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Don't log the requests."""
+
+
+@pytest.fixture
+def serve() -> Iterator[Callable[[socketserver.BaseServer], socketserver.BaseServer]]:
+    """Run servers in threads, until the end of the test: serve(server) starts one."""
+    servers = []
+
+    def start(server: socketserver.BaseServer) -> socketserver.BaseServer:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stand_in(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    serve: Callable,
+) -> Callable[..., StandInServer]:
+    """
+    Run stand-in servers, with the current directory set to a temporary directory:
+    stand_in(handler, setting=value...) starts one.
+    """
+    monkeypatch.chdir(tmp_path)
+    return lambda handler, **settings: serve(StandInServer(handler, settings))
@@ -0,0 +1,295 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_aibatch: Ai analysis of many objects at once, against a local stand-in server   #
+#                                                                                      #
+#               The stand-in serves the OpenAi (/v1/chat/completions, server-sent      #
+#               events) and Ollama (/api/chat, json lines) streaming chat endpoints.   #
+#               Its response to a query is the number of characters in the query.     #
+#               The objects are analyzed whole unless a test asks for a small token    #
+#               budget, to have them analyzed in parts.                                #
+#                                                                                      #
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from itertools import pairwise
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from maptasker.src.aibatch import (
+    AI_CHARS_PER_TOKEN,
+    AiBatch,
+    AiQuery,
+    analyze_backup,
+    build_ai_query,
+    estimate_tokens,
+    get_ai_queries,
+    read_ai_cache,
+    split_into_chunks,
+)
+from maptasker.src.render import load_model
+from tests.conftest import StandInHandler
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from tests.conftest import StandInServer
+
+ROOT = Path(__file__).resolve().parent.parent
+MODEL = load_model((ROOT / "sample.prj.xml").read_bytes())
+ITEMS = [
+    ("Project", "Tasker HTTP API"),
+    ("Profile", "GET Stats"),
+    ("Profile", "POST Task"),
+    ("Task", "Ping"),
+    ("Task", "Device Info"),
+]
+WHOLE = 100_000  # A token budget that fits any of the objects
+
+
+class AiHandler(StandInHandler):
+    """Stand-in for the OpenAi api and the Ollama server"""
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Answer a chat request, with the length of the last message."""
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.record((self.path, body, time.monotonic()))
+        with self.server.answering():
+            time.sleep(self.server.delay)
+        if self.server.fail:
+            self.send(500, b'{"error": "the model has gone away"}', {"Content-Type": "application/json"})
+            return
+
+        answer = str(len(body["messages"][-1]["content"]))
+        chunks = ["Looks ", "good: ", answer, "." * self.server.padding]
+        if self.path.startswith("/v1/"):
+            events = [
+                {"id": "1", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                 "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]}
+                for chunk in chunks
+            ]  # fmt: skip
+            lines = [f"data: {json.dumps(event)}\n\n" for event in events] + ["data: [DONE]\n\n"]
+            self.send(200, "".join(lines).encode(), {"Content-Type": "text/event-stream"})
+        else:
+            lines = [
+                {"model": body["model"], "created_at": "2024-01-01T00:00:00Z",
+                 "message": {"role": "assistant", "content": chunk}, "done": False}
+                for chunk in [*chunks, ""]
+            ]  # fmt: skip
+            lines[-1]["done"] = True
+            body = "".join(f"{json.dumps(line)}\n" for line in lines).encode()
+            self.send(200, body, {"Content-Type": "application/x-ndjson"})
+
+
+@pytest.fixture
+def server(stand_in: Callable) -> StandInServer:
+    """
+    Run the stand-in server, with the current directory set to a temporary directory.
+    Settings: delay = seconds to take over each response, fail = answer with "500 Internal
+    Server Error", padding = characters to add to each response.
+    """
+    return stand_in(AiHandler, delay=0, fail=False, padding=0)
+
+
+def analyze(server: StandInServer, items: list, ai_model: str, **kwargs: object) -> list:
+    """Analyze the items of the sample backup with the stand-in server, whole unless told otherwise."""
+    kwargs = {"base_url": server.url, "token_budget": WHOLE} | kwargs
+    return analyze_backup(MODEL, items, ai_model, **kwargs)
+
+
+def test_ollama_batch(server: StandInServer) -> None:
+    """The objects are analyzed by the local model, a few at a time, and a missing object is an error."""
+    server.delay = 0.2
+    results = analyze(server, [*ITEMS, ("Project", "Nope")], "llama3.1:8b", concurrency=2)
+
+    assert [(result.ai_object, result.name) for result in results] == [*ITEMS, ("Project", "Nope")]
+    for result in results[:-1]:
+        assert not result.error
+        assert result.response.startswith("Looks good: ")
+        assert not result.cached
+    assert 'Project "Nope" not found' in results[-1].error
+    assert len(server.requests) == len(ITEMS)
+    assert max(server.active) == 2
+    # The local model gets the Project/Profile/Task data, then the prompt.
+    path, body, _ = server.requests[0]
+    assert path == "/api/chat"
+    assert [message["role"] for message in body["messages"]] == ["system", "user", "user"]
+    assert "Ping" in "".join(body["messages"][1]["content"] for _, body, _ in server.requests)
+
+
+def test_unchanged_objects_are_not_sent_again(server: StandInServer) -> None:
+    """An object analyzed before comes from the cache, unless the model or prompt is another one."""
+    first = analyze(server, ITEMS, "llama3.1:8b")
+    assert len(read_ai_cache()) == len(ITEMS)
+
+    second = analyze(server, ITEMS, "llama3.1:8b")
+    assert len(server.requests) == len(ITEMS)
+    assert [result.response for result in second] == [result.response for result in first]
+    assert all(result.cached for result in second)
+
+    # Another model or another prompt is another query.
+    analyze(server, ITEMS[:1], "llama3.2:3b")
+    analyze(server, ITEMS[:1], "llama3.1:8b", prompt="explain this")
+    assert len(server.requests) == len(ITEMS) + 2
+
+
+def test_the_same_query_is_sent_once(server: StandInServer) -> None:
+    """The same object asked for twice in a batch is only analyzed once."""
+    results = analyze(server, [ITEMS[0], ITEMS[0]], "llama3.1:8b", use_cache=False)
+    assert results[0] == results[1]
+    assert len(server.requests) == 1
+    assert not Path(".MapTasker_AiCache.json").exists()
+
+
+def test_openai_batch(server: StandInServer) -> None:
+    """The objects are analyzed by the OpenAi api, a few at a time, with the api key."""
+    server.delay = 0.1
+    results = analyze(server, ITEMS, "gpt-4o", concurrency=3, api_key="sk-test", base_url=f"{server.url}/v1")
+
+    assert all(result.response.startswith("Looks good: ") for result in results)
+    assert max(server.active) == 3
+    path, body, _ = server.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["model"] == "gpt-4o"
+    assert body["stream"] is True
+    assert body["messages"][0] == {"role": "system", "content": "You are a Tasker programmer"}
+
+
+def test_requests_per_minute(server: StandInServer) -> None:
+    """The queries are spaced out to keep to the requests per minute."""
+    analyze(server, ITEMS[:3], "llama3.1:8b", requests_per_minute=300)
+    starts = sorted(start for _, _, start in server.requests)
+    assert all(later - earlier >= 0.19 for earlier, later in pairwise(starts))
+
+
+def test_errors_are_not_cached(server: StandInServer) -> None:
+    """A failed analysis is not cached, so it is tried again the next time."""
+    server.fail = True
+    results = analyze(server, ITEMS[:2], "llama3.1:8b")
+    assert all(result.error and not result.response for result in results)
+    assert read_ai_cache() == {}
+
+    server.fail = False
+    results = analyze(server, ITEMS[:2], "llama3.1:8b")
+    assert all(result.response and not result.cached for result in results)
+
+
+def test_query() -> None:
+    """The query is the prompt and the object's lines, without the front matter or html."""
+    lines = ["MapTasker front matter", "Project: Base", "", "&nbsp;Profile: Clock", "Tasks not in any Profile,", "x"]
+    assert build_ai_query("Project", lines, "why") == (
+        "Given the following Project in Tasker, an Android automation tool, why:Project: Base\n Profile: Clock\n"
+    )
+
+
+def test_big_object_is_analyzed_in_parts(server: StandInServer) -> None:
+    """An object too big for the token budget is analyzed in parts, and the analyses merged."""
+    server.delay = 0.1
+    budget = 1000
+    results = analyze(server, ITEMS[:1], "llama3.1:8b", token_budget=budget, concurrency=8)
+
+    assert not results[0].error
+    *parts, merge = server.requests
+    assert len(parts) > 2
+    assert all("part (" in body["messages"][-1]["content"] for _, body, _ in parts)
+    # The parts are analyzed at the same time, and the analyses are then merged.
+    assert max(server.active) > 2
+    assert merge[2] >= max(start for _, _, start in parts)
+    assert "Merge them" in merge[1]["messages"][-1]["content"]
+    assert results[0].response == f"Looks good: {len(merge[1]['messages'][-1]['content'])}"
+    for _, body, _ in server.requests:
+        assert sum(estimate_tokens(message["content"]) for message in body["messages"]) <= budget
+    # Each part starts with its Project.
+    for _, body, _ in parts:
+        assert body["messages"][0]["content"].split(":", 2)[2].startswith("Project: Tasker HTTP API")
+
+    # The parts and the merge are cached.
+    again = analyze(server, ITEMS[:1], "llama3.1:8b", token_budget=budget)
+    assert again[0].response == results[0].response
+    assert again[0].cached
+    assert len(server.requests) == len(parts) + 1
+
+
+def test_big_analyses_are_merged_a_few_at_a_time(server: StandInServer) -> None:
+    """Analyses too big to merge all at once are merged a few at a time."""
+    server.padding = 500
+    budget = 400
+    results = analyze(server, ITEMS[:1], "llama3.1:8b", token_budget=budget)
+
+    assert not results[0].error
+    merges = [body for _, body, _ in server.requests if "Merge them" in body["messages"][-1]["content"]]
+    assert len(merges) > 1
+    for _, body, _ in server.requests:
+        assert sum(estimate_tokens(message["content"]) for message in body["messages"]) <= budget
+
+
+def test_chunks() -> None:
+    """Each chunk fits the token budget and starts with its Project and Profile."""
+    (query,) = get_ai_queries(MODEL, ITEMS[:1])
+    budget = 100
+    chunks = split_into_chunks(query.lines, budget)
+
+    assert len(chunks) > 10
+    # All of the lines are there, in order, and the Project/Profile lines start each chunk.
+    lines = []
+    for chunk in chunks:
+        assert sum(len(line) + 1 for line in chunk) <= budget * AI_CHARS_PER_TOKEN
+        assert chunk[0].startswith("Project: Tasker HTTP API")
+        lines.extend(line for line in chunk if line not in lines or not line.startswith(("Project:", "Profile:")))
+    assert [line[:100] for line in lines] == [line[:100] for line in query.lines]
+
+
+@pytest.mark.parametrize("ai_model", ["llama3.1:8b", "gpt-4o"])
+def test_responses_are_streamed(server: StandInServer, ai_model: str) -> None:
+    """The responses are passed on as they come, from the model or the cache."""
+    streamed = {}
+    kwargs = {
+        "api_key": "sk-test",
+        "base_url": f"{server.url}/v1" if ai_model == "gpt-4o" else server.url,
+        "stream": lambda index, chunk: streamed.setdefault(index, []).append(chunk),
+    }
+    results = analyze(server, ITEMS[:2], ai_model, **kwargs)
+    # Chunk by chunk, as the model wrote them.
+    assert streamed[0][:2] == ["Looks ", "good: "]
+    assert ["".join(streamed[index]) for index in range(2)] == [result.response for result in results]
+
+    # A response from the cache comes all at once.
+    streamed.clear()
+    analyze(server, ITEMS[:1], ai_model, **kwargs)
+    assert streamed == {0: [results[0].response]}
+
+
+def test_merged_response_is_streamed(server: StandInServer) -> None:
+    """Only the merged analysis of an object in parts is passed on."""
+    streamed = []
+    results = analyze(
+        server,
+        ITEMS[:1],
+        "llama3.1:8b",
+        token_budget=1000,
+        stream=lambda _, chunk: streamed.append(chunk),
+    )
+    # Only the merge, not the analyses of the parts.
+    assert "".join(streamed) == results[0].response
+
+
+@pytest.mark.parametrize(("prompt", "token_budget"), [("p" * 3000, 0), ("p" * 1000, 600)])
+def test_prompt_too_long(server: StandInServer, prompt: str, token_budget: int) -> None:
+    """A prompt that leaves no room for the object is an error, and nothing is sent."""
+    results = analyze(server, [("Task", "Ping")], "llama3.1:8b", prompt=prompt, token_budget=token_budget)
+    assert results[0].error == "Ai analysis error: the prompt is too long for llama3.1:8b"
+    assert not server.requests
+
+
+def test_merge_needs_room() -> None:
+    """A merge that leaves no room for the analyses is an error."""
+    async def merge() -> tuple:
+        batch = AiBatch(None, None, "llama3.1:8b", 600, {})
+        query = AiQuery("Task", "Ping", ["Task: Ping"], "p" * 1000 + ":", "")
+        return await batch.merge(query, ["finding " * 200] * 3, False, None)
+
+    assert asyncio.run(merge()) == ("", "Ai analysis error: the prompt is too long for llama3.1:8b", False)
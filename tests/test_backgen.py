@@ -0,0 +1,72 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_backgen: the synthetic Tasker backups are valid, and are the size asked for     #
+#                                                                                      #
+from pathlib import Path
+
+import defusedxml.ElementTree as ET  # noqa: N817
+import pytest
+
+from maptasker.src.backgen import PRODUCTION_SPEC, BackupSpec, make_backup, scale_spec, write_backup
+from maptasker.src.render import load_model, render_model
+
+SPEC = BackupSpec(projects=3, profiles=12, tasks=30, actions=8, scenes=4, variables=10)
+
+
+def test_the_same_spec_makes_the_same_backup() -> None:
+    """A spec always makes the same backup, and another seed makes another one."""
+    assert make_backup(SPEC) == make_backup(SPEC)
+    assert make_backup(SPEC) != make_backup(SPEC._replace(seed=2))
+
+
+def test_scale() -> None:
+    """The production spec is scaled up, except for the Actions in each Task."""
+    spec = scale_spec(10)
+    assert (spec.projects, spec.profiles, spec.tasks) == (
+        PRODUCTION_SPEC.projects * 10,
+        PRODUCTION_SPEC.profiles * 10,
+        PRODUCTION_SPEC.tasks * 10,
+    )
+    assert spec.actions == PRODUCTION_SPEC.actions
+
+
+def test_backup_contents() -> None:
+    """The backup has what the spec asks for, and its references are all to things it has."""
+    root = ET.fromstring(make_backup(SPEC))
+    assert root.tag == "TaskerData"
+    assert len(root.findall("Project")) == SPEC.projects
+    assert len(root.findall("Profile")) == SPEC.profiles
+    assert len(root.findall("Task")) == SPEC.tasks
+    assert len(root.findall("Scene")) == SPEC.scenes
+    assert len(root.findall("Variable")) == SPEC.variables
+    assert all(len(task.findall("Action")) == SPEC.actions for task in root.findall("Task"))
+
+    # Every Profile, Task and Scene is in a Project, and every Perform Task is of a Task we have.
+    assert sorted(int(pid) for project in root.findall("Project") for pid in project.find("pids").text.split(",")) == [
+        int(profile.find("id").text) for profile in root.findall("Profile")
+    ]
+    assert {int(tid) for project in root.findall("Project") for tid in project.find("tids").text.split(",")} == {
+        int(task.find("id").text) for task in root.findall("Task")
+    }
+    task_names = {task.find("nme").text for task in root.findall("Task") if task.find("nme") is not None}
+    performed = [action.find("Str").text for action in root.iter("Action") if action.find("code").text == "130"]
+    assert performed
+    assert set(performed) <= task_names
+    assert any(not name.isascii() for name in task_names)
+
+
+@pytest.mark.parametrize("level", [0, 1, 2, 3, 4, 5])
+def test_backup_is_mapped(level: int) -> None:
+    """The backup is mapped at every level of detail."""
+    result = render_model(load_model(make_backup(SPEC)), {"display_detail_level": level, "directory": True})
+    assert result.totals["projects"] == SPEC.projects
+    assert result.totals["profiles"] == SPEC.profiles
+    assert result.totals["scenes"] == SPEC.scenes
+
+
+def test_write_backup(tmp_path: Path) -> None:
+    """The backup is written to the file, which is its size."""
+    backup_file = tmp_path / "backup.xml"
+    assert write_backup(str(backup_file), SPEC) == backup_file.stat().st_size
+    assert backup_file.read_bytes() == make_backup(SPEC)
@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_benchmark: time each phase of mapping synthetic backups, and compare with a     #
+#                 baseline                                                             #
+#                                                                                      #
+#                 By default the backups are small, to check that every phase runs.   #
+#                 Set these to benchmark for real:                                     #
+#                   MAPTASKER_BENCHMARK_SCALES   backup scales, e.g. "1,10" (see       #
+#                                                backgen.scale_spec)                   #
+#                   MAPTASKER_BENCHMARK_REPEAT   times to time each phase             #
+#                   MAPTASKER_BENCHMARK_OUTPUT   json file to save the results in     #
+#                   MAPTASKER_BENCHMARK_BASELINE json file of earlier results: fail if #
+#                                                a phase has become slower             #
+#                   MAPTASKER_BENCHMARK_THRESHOLD how much slower it may be (0.25)     #
+#                                                                                      #
+import os
+from pathlib import Path
+
+import pytest
+
+from maptasker.src.benchmk import (
+    DEFAULT_THRESHOLD,
+    PHASE_NAMES,
+    compare_to_baseline,
+    read_results,
+    run_benchmarks,
+    save_results,
+)
+
+SCALES = [float(scale) for scale in os.environ.get("MAPTASKER_BENCHMARK_SCALES", "0.05").split(",")]
+REPEAT = int(os.environ.get("MAPTASKER_BENCHMARK_REPEAT", "1"))
+
+
+@pytest.fixture(scope="module")
+def results() -> dict:
+    """Benchmark the phases, and save the results if asked to."""
+    the_results = run_benchmarks(SCALES, REPEAT)
+    if output := os.environ.get("MAPTASKER_BENCHMARK_OUTPUT"):
+        save_results(the_results, output)
+    return the_results
+
+
+def test_every_phase_is_benchmarked(results: dict, tmp_path: Path) -> None:
+    """Every phase is timed at every scale, and the results can be saved and read back."""
+    assert list(results["scales"]) == [f"{scale:g}" for scale in SCALES]
+    for result in results["scales"].values():
+        assert result["backup_bytes"] > 0
+        assert list(result["phases"]) == list(PHASE_NAMES)
+        for timing in result["phases"].values():
+            assert timing["seconds"] > 0
+            assert timing["cpu_seconds"] >= 0
+            assert timing["peak_bytes"] > 0
+
+    results_file = str(tmp_path / "results.json")
+    save_results(results, results_file)
+    assert read_results(results_file) == results
+
+
+def test_against_baseline(results: dict) -> None:
+    """No phase is slower than in the baseline results, if there are any."""
+    if not (baseline := os.environ.get("MAPTASKER_BENCHMARK_BASELINE")):
+        pytest.skip("MAPTASKER_BENCHMARK_BASELINE is not set")
+    threshold = float(os.environ.get("MAPTASKER_BENCHMARK_THRESHOLD", DEFAULT_THRESHOLD))
+    regressions = compare_to_baseline(results, read_results(baseline), threshold)
+    assert not regressions, "\n".join(
+        f"scale {regression.scale} {regression.phase}: {regression.seconds:.3f}s, "
+        f"was {regression.baseline_seconds:.3f}s"
+        for regression in regressions
+    )
+
+
+def test_compare_to_baseline() -> None:
+    """Only a phase that is slower than the threshold, and by more than a little, is a regression."""
+    def timings(**seconds: float) -> dict:
+        phases = {name: {"seconds": value, "cpu_seconds": value, "peak_bytes": 1} for name, value in seconds.items()}
+        return {"scales": {"1": {"phases": phases}}}
+
+    baseline = timings(ingest=1.0, output=2.0, write=0.001)
+    regressions = compare_to_baseline(timings(ingest=1.2, output=3.0, write=0.002, parse=9.0), baseline, 0.25)
+    # Output is 50% slower.  Write is twice as slow, but only by a millisecond.  Parse is new.
+    assert [(regression.phase, regression.seconds) for regression in regressions] == [("output", 3.0)]
+    assert compare_to_baseline(timings(output=3.0), baseline, 0.5) == []
+    assert compare_to_baseline(timings(output=3.0), {"scales": {}}, 0.25) == []
@@ -0,0 +1,316 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_download: fetch the backup from a local stand-in of the Tasker HTTP server      #
+#                                                                                      #
+#                The stand-in serves the HTTP Server Example endpoints used by         #
+#                MapTasker: /file<path>?download=1 (with Range and gzip support)       #
+#                and /maplist<dir>?xml, over keep-alive connections.                   #
+#                                                                                      #
+from __future__ import annotations
+
+import gzip
+import time
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import pytest
+
+from maptasker.src.droidnet import (
+    close_android_session,
+    fetch_android_exports,
+    fetch_android_files,
+    forget_lists_of_files,
+    get_list_of_files,
+)
+from maptasker.src import getbakup
+from maptasker.src.getbakup import PART_FILE_SUFFIX, download_backup_file
+from maptasker.src.initparg import initialize_runtime_arguments
+from maptasker.src.primitem import PrimeItems
+from tests.conftest import StandInHandler
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+    from tests.conftest import StandInServer
+
+ROOT = Path(__file__).resolve().parent.parent
+BACKUP = (ROOT / "sample.prj.xml").read_bytes()
+ANDROID_FILE = "/Tasker/configs/user/backup.xml"
+EXPORTS = {
+    f"/Tasker/{name}": BACKUP[: 1000 * (number + 1)]
+    for number, name in enumerate(["a.prj.xml", "b.prf.xml", "c.tsk.xml", "d.scn.xml", "e.prj.xml"])
+}
+
+
+class TaskerHandler(StandInHandler):
+    """Stand-in for Tasker's HTTP Server Example"""
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Answer a /maplist or /file request."""
+        url = urlsplit(self.path)
+        server = self.server
+        server.record((url.path, dict(self.headers), self.client_address[1]))
+        with server.lock:
+            busy, server.busy = server.busy, max(server.busy - 1, 0)
+        if busy:
+            self.send(503, b"Busy", {})
+            return
+        if url.path.startswith("/maplist"):
+            # Each entry ends with a 3 character field, which MapTasker drops.
+            body = ",".join(f"/storage/emulated/0{name}:00" for name in [*server.files, "/.Trash/old.xml"]).encode()
+            etag = f'"{zlib.crc32(body)}"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send(304, b"", {"ETag": etag})
+            else:
+                self.send(200, body, {"ETag": etag})
+            return
+
+        contents = server.files.get(url.path.removeprefix("/file"))
+        if contents is None:
+            self.send(404, b"Not found", {})
+            return
+
+        status, headers = 200, {}
+        if range_header := self.headers.get("Range"):
+            start = int(range_header.removeprefix("bytes=").split("-")[0])
+            if start >= len(contents):
+                self.send(416, b"", {"Content-Range": f"bytes */{len(contents)}"})
+                return
+            headers["Content-Range"] = f"bytes {start}-{len(contents) - 1}/{len(contents)}"
+            status, contents = 206, contents[start:]
+        elif server.gzip and "gzip" in self.headers.get("Accept-Encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+            contents = gzip.compress(contents)
+        with server.answering():
+            time.sleep(server.delay)
+        if server.chunked_rate:
+            self.send_chunked(status, contents, headers)
+        else:
+            self.send(status, contents, headers, server.cut_off)
+
+    def send_chunked(self, status: int, body: bytes, headers: dict) -> None:
+        """Send the response in chunks, with no Content-Length, at chunked_rate bytes a second."""
+        self.send_response(status)
+        self.send_header("Transfer-Encoding", "chunked")
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.end_headers()
+        for start in range(0, len(body), 8192):
+            chunk = body[start : start + 8192]
+            self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+            self.wfile.flush()
+            time.sleep(len(chunk) / self.server.chunked_rate)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def server(stand_in: Callable) -> Iterator[StandInServer]:
+    """
+    Run the stand-in server, with the current directory set to a temporary directory.
+    Settings: files = path: contents of the files it has, gzip = send the file gzipped if the
+    client accepts it, cut_off = if not 0, close the connection after sending this many bytes,
+    busy = answer this many requests with "503 Service Unavailable", delay = seconds to take
+    over each file, chunked_rate = if not 0, send the file in chunks, with no Content-Length,
+    at this many bytes a second.
+    """
+    PrimeItems.program_arguments = initialize_runtime_arguments()
+    yield stand_in(
+        TaskerHandler,
+        files={ANDROID_FILE: BACKUP},
+        gzip=False,
+        cut_off=0,
+        busy=0,
+        delay=0,
+        chunked_rate=0,
+    )
+    close_android_session()
+    forget_lists_of_files()
+
+
+def fetch(server: StandInServer, android_file: str = ANDROID_FILE) -> tuple:
+    """Fetch the file from the stand-in server, keeping track of the progress reported."""
+    progress = []
+    return_code, result = download_backup_file(
+        "127.0.0.1",
+        str(server.server_address[1]),
+        android_file,
+        lambda bytes_done, bytes_total: progress.append((bytes_done, bytes_total)),
+    )
+    return return_code, result, progress
+
+
+def test_download_writes_the_backup_file(server: StandInServer) -> None:
+    """The backup is written to the current directory, and the progress is reported."""
+    return_code, file_name, progress = fetch(server)
+    assert (return_code, file_name) == (0, "backup.xml")
+    assert Path("backup.xml").read_bytes() == BACKUP
+    assert not Path(f"backup.xml{PART_FILE_SUFFIX}").exists()
+    assert progress[-1] == (len(BACKUP), len(BACKUP))
+    assert PrimeItems.program_arguments["fetched_backup_from_android"]
+
+
+def test_download_is_gzipped_if_the_server_can(server: StandInServer) -> None:
+    """The backup comes gzipped if the server can send it that way."""
+    server.gzip = True
+    return_code, _, progress = fetch(server)
+    assert return_code == 0
+    assert Path("backup.xml").read_bytes() == BACKUP
+    # The progress is of the bytes received, which are fewer than the file's.
+    assert progress[-1][0] == progress[-1][1] < len(BACKUP)
+
+
+def test_interrupted_download_is_resumed(server: StandInServer) -> None:
+    """An interrupted download leaves the old file alone, and picks up where it left off."""
+    Path("backup.xml").write_bytes(b"the previous backup")
+    server.cut_off = 100_000
+    return_code, message, _ = fetch(server)
+    assert return_code == 8, message
+    # The old file is untouched and what we did get is kept for the next try.
+    assert Path("backup.xml").read_bytes() == b"the previous backup"
+    part = Path(f"backup.xml{PART_FILE_SUFFIX}").read_bytes()
+    assert part
+    assert BACKUP.startswith(part)
+
+    server.cut_off = 0
+    return_code, _, progress = fetch(server)
+    assert return_code == 0
+    assert server.requests[-1][1]["Range"] == f"bytes={len(part)}-"
+    assert Path("backup.xml").read_bytes() == BACKUP
+    assert progress[0][1] == len(BACKUP)
+
+
+def test_complete_part_file_is_fetched_again(server: StandInServer) -> None:
+    """A part file that is already the whole file is fetched again, from the start."""
+    Path(f"backup.xml{PART_FILE_SUFFIX}").write_bytes(BACKUP)
+    return_code, _, _ = fetch(server)
+    assert return_code == 0
+    assert Path("backup.xml").read_bytes() == BACKUP
+    assert "Range" not in server.requests[-1][1]
+
+
+@pytest.mark.parametrize(("rate", "return_code"), [(300_000, 0), (40_000, 8)])
+def test_download_with_no_content_length(
+    server: StandInServer,
+    monkeypatch: pytest.MonkeyPatch,
+    rate: int,
+    return_code: int,
+) -> None:
+    """A download with no Content-Length carries on for as long as it comes fast enough."""
+    # The file takes longer than the grace period to come, but faster than the slowest allowed.
+    monkeypatch.setattr(getbakup, "DOWNLOAD_TIMEOUT", 0.3)
+    monkeypatch.setattr(getbakup, "DOWNLOAD_MIN_RATE", 100_000)
+    server.chunked_rate = rate
+    result = fetch(server)
+    assert result[0] == return_code, result[1]
+    if return_code:
+        assert "taking too long" in result[1]
+    else:
+        assert Path("backup.xml").read_bytes() == BACKUP
+        assert result[2][-1] == (len(BACKUP), 0)
+
+
+def test_file_not_found(server: StandInServer) -> None:
+    """A file the server does not have is an error, and nothing is written."""
+    return_code, message, _ = fetch(server, "/Tasker/nope.xml")
+    assert return_code == 6
+    assert "not found" in message
+    assert not list(Path().iterdir())
+
+
+def test_list_of_files(server: StandInServer) -> None:
+    """The list of files is of the backup's files, without the trash."""
+    return_code, file_list = get_list_of_files("127.0.0.1", str(server.server_address[1]), "/storage/emulated/0/Tasker")
+    assert return_code == 0
+    assert file_list == [ANDROID_FILE]
+
+
+def test_list_of_files_is_cached(server: StandInServer) -> None:
+    """The list of files is only asked for once."""
+    port = str(server.server_address[1])
+    assert get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker") == (0, [ANDROID_FILE])
+    server.files = EXPORTS
+    assert get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker") == (0, [ANDROID_FILE])
+    assert len(server.requests) == 1
+
+
+def test_old_list_of_files_is_refreshed_in_the_background(server: StandInServer) -> None:
+    """An old list of files is returned at once, and refreshed in the background."""
+    port = str(server.server_address[1])
+    get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker")
+
+    # Unchanged: the server just says so.
+    time.sleep(0.01)
+    assert get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker", max_age=0.001) == (0, [ANDROID_FILE])
+    wait_for_requests(server, 2)
+    assert server.requests[-1][1]["If-None-Match"]
+
+    # Changed: the old list is returned, and the new one the next time.
+    server.files = EXPORTS
+    time.sleep(0.01)
+    assert get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker", max_age=0.001) == (0, [ANDROID_FILE])
+    wait_for_requests(server, 3)
+    assert get_list_of_files("127.0.0.1", port, "/storage/emulated/0/Tasker") == (0, list(EXPORTS))
+
+
+def wait_for_requests(server: StandInServer, count: int) -> None:
+    """Wait for the server to have had count requests, and for the client to be done with the last one."""
+    for _ in range(500):
+        if len(server.requests) >= count:
+            break
+        time.sleep(0.01)
+    assert len(server.requests) == count
+    time.sleep(0.1)
+
+
+def test_requests_share_the_connection(server: StandInServer) -> None:
+    """The requests to the server all go over the same connection."""
+    get_list_of_files("127.0.0.1", str(server.server_address[1]), "/storage/emulated/0/Tasker")
+    fetch(server)
+    fetch(server)
+    assert len(server.requests) == 3
+    assert len({client_port for _, _, client_port in server.requests}) == 1
+
+
+def test_busy_server_is_retried(server: StandInServer) -> None:
+    """A request the server is too busy for is tried again."""
+    server.busy = 1
+    return_code, _, _ = fetch(server)
+    assert return_code == 0
+    assert Path("backup.xml").read_bytes() == BACKUP
+    assert len(server.requests) == 2
+
+
+def test_files_are_fetched_at_once(server: StandInServer) -> None:
+    """The files are fetched at the same time, each with its own result and progress."""
+    server.files = EXPORTS
+    server.delay = 0.2
+    progress = {}
+    results = fetch_android_files(
+        "127.0.0.1",
+        str(server.server_address[1]),
+        [*EXPORTS, "/Tasker/nope.prj.xml", "/Other/a.prj.xml"],
+        lambda file_location, bytes_done, bytes_total: progress.__setitem__(file_location, (bytes_done, bytes_total)),
+    )
+    assert list(results) == [*EXPORTS, "/Tasker/nope.prj.xml", "/Other/a.prj.xml"]
+    for file_location, contents in EXPORTS.items():
+        assert results[file_location] == (0, file_location.removeprefix("/Tasker/"))
+        assert Path(results[file_location][1]).read_bytes() == contents
+        assert progress[file_location] == (len(contents), len(contents))
+    assert results["/Tasker/nope.prj.xml"][0] == 6
+    # Same name as /Tasker/a.prj.xml
+    assert results["/Other/a.prj.xml"][0] == 8
+    assert max(server.active) > 1
+
+
+def test_fetch_exports(server: StandInServer) -> None:
+    """The exported Projects, Profiles, Tasks and Scenes are fetched, but not the backup."""
+    server.files = {**EXPORTS, ANDROID_FILE: BACKUP}
+    port = str(server.server_address[1])
+    return_code, results = fetch_android_exports("127.0.0.1", port, "/storage/emulated/0/Tasker")
+    assert return_code == 0
+    assert list(results) == list(EXPORTS)
+    assert all(return_code == 0 for return_code, _ in results.values())
+    assert not Path("backup.xml").exists()
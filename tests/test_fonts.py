@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_fonts: the cache of the monospace fonts (finding them means measuring every    #
+#             font with Tk, which is not called here)                                  #
+#                                                                                      #
+from __future__ import annotations
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from maptasker.src import fonts
+from maptasker.src.sysconst import FONT_CACHE_FILE
+
+FINGERPRINT = [["/usr/share/fonts", 1]]
+
+
+@pytest.fixture
+def font_calls(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> dict:
+    """Find the fonts without Tk, in a temporary directory, and count the finds and refreshes."""
+    monkeypatch.chdir(tmp_path)
+    calls = {"find": 0, "refresh": []}
+
+    def find_mono_fonts() -> list:
+        calls["find"] += 1
+        return ["Found Mono"]
+
+    def popen(args: list, **kwargs: object) -> None:
+        calls["refresh"].append((args, kwargs))
+
+    monkeypatch.setattr(fonts, "find_mono_fonts", find_mono_fonts)
+    monkeypatch.setattr(fonts, "get_font_fingerprint", lambda: FINGERPRINT)
+    monkeypatch.setattr(fonts, "subprocess", SimpleNamespace(Popen=popen, DEVNULL=subprocess.DEVNULL))
+    return calls
+
+
+def test_no_cache(font_calls: dict) -> None:
+    """The fonts are found and cached, and come from the cache the next time."""
+    assert fonts.get_mono_font_families() == ["Found Mono"]
+    assert font_calls["find"] == 1
+    assert json.loads(Path(FONT_CACHE_FILE).read_text()) == {"fingerprint": FINGERPRINT, "fonts": ["Found Mono"]}
+    # The next time, the fonts come from the cache.
+    assert fonts.get_mono_font_families() == ["Found Mono"]
+    assert font_calls["find"] == 1
+    assert font_calls["refresh"] == []
+
+
+def test_cache_hit(font_calls: dict) -> None:
+    """The cached fonts are used when the fonts have not changed."""
+    Path(FONT_CACHE_FILE).write_text(json.dumps({"fingerprint": FINGERPRINT, "fonts": ["Cached Mono"]}))
+    assert fonts.get_mono_font_families() == ["Cached Mono"]
+    assert font_calls["find"] == 0
+    assert font_calls["refresh"] == []
+
+
+def test_stale_fingerprint(font_calls: dict, tmp_path: Path) -> None:
+    """The cached fonts are used when the fonts have changed, and the cache refreshed in the background."""
+    Path(FONT_CACHE_FILE).write_text(json.dumps({"fingerprint": [["/usr/share/fonts", 0]], "fonts": ["Cached Mono"]}))
+    # The cached fonts are used for now, and the cache is refreshed in the background.
+    assert fonts.get_mono_font_families() == ["Cached Mono"]
+    assert font_calls["find"] == 0
+    assert len(font_calls["refresh"]) == 1
+
+    # The refresh runs here (where the cache file is), and can import the package from anywhere.
+    args, kwargs = font_calls["refresh"][0]
+    assert args == [sys.executable, "-m", "maptasker.src.fonts"]
+    assert kwargs["cwd"] == str(tmp_path)
+    result = subprocess.run(
+        [sys.executable, "-c", "import maptasker.src.fonts"],
+        cwd=tmp_path,
+        env=kwargs["env"],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize("contents", ["{not json", "[1, 2]", '{"fingerprint": []}', ""])
+def test_corrupt_cache(font_calls: dict, contents: str) -> None:
+    """A cache that can't be read is replaced by the fonts found."""
+    Path(FONT_CACHE_FILE).write_text(contents)
+    assert fonts.get_mono_font_families() == ["Found Mono"]
+    assert font_calls["find"] == 1
+    assert json.loads(Path(FONT_CACHE_FILE).read_text())["fonts"] == ["Found Mono"]
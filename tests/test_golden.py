@@ -0,0 +1,176 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_golden: map the sample and a generated backup with many runtime options, and    #
+#              compare the output with what is expected (tests/golden)                 #
+#                                                                                      #
+#              Each case runs MapTasker from the command line, as run_test.py does,   #
+#              and compares MapTasker.html, the diagram (MapTasker_Map.txt, for the    #
+#              outline) and for some the GUI's map view of the html (see guimap.py).  #
+#              The dates, the version and the paths are taken out before comparing.   #
+#              No browser or text editor is opened, and the diagram is drawn without  #
+#              a display for Tkinter.                                                  #
+#                                                                                      #
+#              When the output is meant to change, write the new expected output:    #
+#                MAPTASKER_GOLDEN_UPDATE=1 pytest tests/test_golden.py                 #
+#              and review the changes to tests/golden.                                 #
+#                                                                                      #
+import contextlib
+import difflib
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from maptasker.src.backgen import BackupSpec, write_backup
+from maptasker.src.getputer import save_restore_args
+from maptasker.src.guimap import parse_html
+from maptasker.src.initparg import initialize_runtime_arguments
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.sysconst import VERSION
+
+ROOT = Path(__file__).resolve().parent.parent
+GOLDEN = Path(__file__).resolve().parent / "golden"
+UPDATE = bool(os.environ.get("MAPTASKER_GOLDEN_UPDATE"))
+SAMPLE = ROOT / "sample.prj.xml"
+GENERATED_SPEC = BackupSpec(projects=3, profiles=8, tasks=20, actions=6, scenes=2, variables=4)
+DIFF_LINES = 80  # Number of lines of a difference to show
+
+# The html dates (see frontmtr.py), the diagram dates (see diagram.py) and the version.
+NORMALIZE = (
+    (re.compile(r"\d{1,2}-[A-Z][a-z]+-\d{4} \d\d:\d\d:\d\d"), "<date>"),
+    (re.compile(r"[A-Z][a-z]+ \d\d, \d{4}  \d\d:\d\d:\d\d"), "<date>"),
+    (re.compile(rf"MapTasker version {re.escape(VERSION)}\b"), "MapTasker version <version>"),
+)
+
+# name: (backup, runtime options, also compare the GUI's map view)
+CASES = {
+    "detail0": ("sample", ["-detail", "0"], False),
+    "detail1": ("sample", ["-detail", "1"], False),
+    "detail2": ("sample", ["-detail", "2"], False),
+    "detail3": ("sample", ["-detail", "3"], False),
+    "detail4": ("sample", ["-detail", "4"], False),
+    "detail5": ("sample", ["-detail", "5"], False),
+    "names_bold_highlight": (
+        "sample",
+        ["-detail", "2", "-names", "bold", "highlight", "-cHighlight", "LightBlue"],
+        False,
+    ),
+    "names_underline_italicize": ("sample", ["-detail", "1", "-names", "underline", "italicize"], False),
+    "appearance_light": ("sample", ["-detail", "2", "-appearance", "light"], False),
+    "indent": ("sample", ["-detail", "4", "-i", "10"], False),
+    "pretty": ("sample", ["-detail", "3", "-pretty"], False),
+    "project": ("sample", ["-project", "Tasker HTTP API", "-conditions", "-taskernet"], False),
+    "profile": ("sample", ["-profile", "GET Stats", "-detail", "3", "-pretty"], False),
+    "task": ("sample", ["-task", "Run Code", "-detail", "4"], False),
+    "preferences": ("sample", ["-preferences", "-taskernet", "-detail", "2"], False),
+    "directory": ("sample", ["-directory", "-taskernet", "-detail", "4"], True),
+    "twisty": ("sample", ["-twisty", "-detail", "3", "-directory"], False),
+    "outline": ("sample", ["-outline", "-detail", "3"], False),
+    "everything": ("sample", ["-e"], True),
+    "colors": (
+        "sample",
+        ["-detail", "2", "-cBackground", "Black", "-cProfile", "Yellow", "-cTask", "Orange", "-cAction", "Blue"],
+        False,
+    ),
+    "generated_directory": ("generated", ["-detail", "3", "-directory"], True),
+    "generated_pretty": ("generated", ["-detail", "5", "-pretty", "-conditions"], False),
+    "generated_outline": ("generated", ["-detail", "2", "-outline"], False),
+    "generated_twisty": ("generated", ["-detail", "4", "-twisty", "-names", "bold"], False),
+    "generated_project": ("generated", ["-project", "Backup Project 2", "-detail", "3"], False),
+    # Only its Project is mapped, so the variables of the other Projects are unreferenced.
+    "generated_profile": ("generated", ["-profile", "Clock Profile 22", "-detail", "4"], False),
+}
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the diagram would be opened in the text editor")
+
+
+@pytest.fixture(scope="module")
+def quiet_env(tmp_path_factory: pytest.TempPathFactory) -> dict:
+    """The environment to run MapTasker in: no browser, no text editor ('open') and no display."""
+    bin_dir = tmp_path_factory.mktemp("bin")
+    (bin_dir / "open").write_text("#!/bin/sh\nexit 0\n")
+    (bin_dir / "open").chmod(0o755)
+    env = {key: value for key, value in os.environ.items() if key not in ("DISPLAY", "WAYLAND_DISPLAY")}
+    return env | {"PYTHONPATH": str(ROOT), "BROWSER": "true", "PATH": f"{bin_dir}{os.pathsep}{env['PATH']}"}
+
+
+@pytest.fixture(scope="module")
+def backups(tmp_path_factory: pytest.TempPathFactory) -> dict:
+    """The backups to map."""
+    generated = tmp_path_factory.mktemp("backup") / "generated.xml"
+    write_backup(str(generated), GENERATED_SPEC)
+    return {"sample": SAMPLE, "generated": generated}
+
+
+def normalize(text: str, paths: dict) -> str:
+    """Take out what changes from run to run: the dates, the version and the paths."""
+    for path, replacement in paths.items():
+        text = text.replace(str(path), replacement)
+    for pattern, replacement in NORMALIZE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def get_map_view(run_dir: Path) -> str:
+    """The GUI's map view of MapTasker.html, with the settings of the run, one line at a time."""
+    with use_run(MapRun()), contextlib.chdir(run_dir):
+        PrimeItems.program_arguments, PrimeItems.colors_to_use = save_restore_args(
+            initialize_runtime_arguments(),
+            {},
+            False,
+        )
+        map_view = parse_html()
+    lines = [f"{json.dumps(str(num))}: {json.dumps(line, ensure_ascii=False)}" for num, line in map_view.items()]
+    return "{\n" + ",\n".join(lines) + "\n}\n"
+
+
+def check_golden(actual: str, golden_file: Path) -> None:
+    """Compare the output with what is expected, or make it what is expected if updating."""
+    if UPDATE:
+        golden_file.parent.mkdir(exist_ok=True)
+        golden_file.write_text(actual, encoding="utf-8")
+        return
+    assert golden_file.exists(), f"{golden_file} is missing: run with MAPTASKER_GOLDEN_UPDATE=1 to make it"
+    expected = golden_file.read_text(encoding="utf-8")
+    if actual != expected:
+        diff = difflib.unified_diff(
+            expected.splitlines(),
+            actual.splitlines(),
+            f"expected {golden_file.name}",
+            "actual",
+            lineterm="",
+        )
+        pytest.fail("\n".join(list(diff)[:DIFF_LINES]), pytrace=False)
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_golden(name: str, tmp_path: Path, quiet_env: dict, backups: dict) -> None:
+    """The map (and diagram and Map view) of the backup with the options is the golden one."""
+    backup, options, map_view = CASES[name]
+    backup_file = backups[backup]
+    (tmp_path / ".MapTasker_RunCount.txt").write_text("1")
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, str(ROOT / "main.py"), "-reset", "-file", str(backup_file), *options],
+        cwd=tmp_path,
+        env=quiet_env,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=300,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    paths = {backup_file.parent: "<backups>", tmp_path: "<run>"}
+    check_golden(normalize((tmp_path / "MapTasker.html").read_text(encoding="utf-8"), paths), GOLDEN / f"{name}.html")
+    diagram = tmp_path / "MapTasker_Map.txt"
+    assert diagram.exists() == ("-outline" in options or "-e" in options)
+    if diagram.exists():
+        check_golden(normalize(diagram.read_text(encoding="utf-8"), paths), GOLDEN / f"{name}.map.txt")
+    if map_view:
+        check_golden(normalize(get_map_view(tmp_path), paths), GOLDEN / f"{name}.mapview.json")
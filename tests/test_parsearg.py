@@ -0,0 +1,35 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_parsearg: the runtime options are only taken by their full names                #
+#                                                                                      #
+import pytest
+
+from maptasker.src.parsearg import FullNameArgumentParser
+
+
+@pytest.fixture
+def parser() -> FullNameArgumentParser:
+    """A parser with options that start the same, and a single letter option with a long name."""
+    parser = FullNameArgumentParser(allow_abbrev=False, exit_on_error=False)
+    for option in ("-profile", "-profiling", "-pretty"):
+        parser.add_argument(option, action="store_true")
+    parser.add_argument("-i", "-indent", dest="indent", type=int, nargs=1)
+    return parser
+
+
+@pytest.mark.parametrize("argument", ["-p", "-prof", "-profil", "-pre"])
+def test_abbreviations_are_not_options(parser: FullNameArgumentParser, argument: str) -> None:
+    """The start of an option's name is not taken for the option."""
+    with pytest.raises(SystemExit):
+        parser.parse_args([argument])
+
+
+@pytest.mark.parametrize(
+    ("arguments", "indent"),
+    [(["-i", "8"], [8]), (["-i8"], [8]), (["-indent", "8"], [8]), (["-indent=8"], [8]), ([], None)],
+)
+def test_full_names(parser: FullNameArgumentParser, arguments: list, indent: list | None) -> None:
+    """Options are taken by their full names, and a single letter option can have its value attached."""
+    args = parser.parse_args(["-profile", *arguments])
+    assert (args.profile, args.profiling, args.indent) == (True, False, indent)
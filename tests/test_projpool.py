@@ -0,0 +1,83 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_projpool: rendering the Projects in worker processes ('parallel' runtime       #
+#                option) gives the same map as rendering them one after the other     #
+#                                                                                      #
+from __future__ import annotations
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tomllib
+from pathlib import Path
+
+import pytest
+
+from maptasker.src.backgen import BackupSpec, write_backup
+from maptasker.src.initparg import initialize_runtime_arguments
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.projpool import get_parallel_workers
+from maptasker.src.sysconst import ARGUMENT_NAMES
+
+ROOT = Path(__file__).resolve().parent.parent
+SPEC = BackupSpec(projects=6, profiles=18, tasks=40, actions=8, scenes=4, variables=6)
+DATE = re.compile(r"\d{1,2}-[A-Z][a-z]+-\d{4} \d\d:\d\d:\d\d")  # When the map was rendered (see frontmtr.py)
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the worker processes are forked")
+
+
+def map_backup(backup: Path, args: list, run_dir: Path) -> list:
+    """Map the backup from the command line: the lines of MapTasker.html, without the date."""
+    run_dir.mkdir()
+    (run_dir / ".MapTasker_RunCount.txt").write_text("1")
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, str(ROOT / "main.py"), "-reset", "-file", str(backup), *args],
+        cwd=run_dir,
+        env=os.environ | {"PYTHONPATH": str(ROOT), "BROWSER": "true"},
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=300,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return DATE.sub("<date>", (run_dir / "MapTasker.html").read_text(encoding="utf-8")).splitlines()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [["-detail", "4", "-directory", "-runtime"], ["-detail", "5", "-twisty", "-conditions", "-runtime"]],
+)
+def test_parallel_map_is_the_same(tmp_path: Path, options: list) -> None:
+    """The map is the same when the Projects are rendered in worker processes."""
+    backup = tmp_path / "backup.xml"
+    write_backup(str(backup), SPEC)
+    serial = map_backup(backup, [*options, "-profiling"], tmp_path / "serial")
+    parallel = map_backup(backup, [*options, "-profiling", "-parallel", "3"], tmp_path / "parallel")
+
+    # Every Project was rendered by a worker: none had to be rendered again here.
+    counts = json.loads((tmp_path / "parallel" / "MapTasker_Profile.json").read_text())["counts"]
+    assert (counts["projects_rendered_in_workers"], counts["projects_rendered_again"]) == (SPEC.projects, 0)
+    # The number of workers only applies to this run.
+    settings = tomllib.loads((tmp_path / "parallel" / "MapTasker_Settings.toml").read_text())
+    assert "parallel" not in settings["program_arguments"]
+
+    # Only the runtime setting says the Projects were rendered in parallel.
+    setting = ARGUMENT_NAMES["parallel"]
+    assert [line.endswith(": 0</span><br>") for line in serial if setting in line] == [True]
+    assert [line.endswith(": 3</span><br>") for line in parallel if setting in line] == [True]
+    assert [line for line in parallel if setting not in line] == [line for line in serial if setting not in line]
+
+
+@pytest.mark.parametrize(("gui", "workers"), [([], 3), (["gui"], 0), (["guiview"], 0)])
+def test_gui_renders_serially(gui: list, workers: int) -> None:
+    """The Projects are not rendered in worker processes when running with the GUI."""
+    with use_run(MapRun()):
+        PrimeItems.program_arguments = initialize_runtime_arguments()
+        PrimeItems.program_arguments["parallel"] = 3
+        for argument in gui:
+            PrimeItems.program_arguments[argument] = True
+        assert get_parallel_workers(["Project 1", "Project 2", "Project 3", "Project 4"]) == workers
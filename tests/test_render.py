@@ -0,0 +1,130 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_render: the library API, which renders a backup into a map in memory           #
+#                                                                                      #
+from __future__ import annotations
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from maptasker.src.backgen import BackupSpec, make_backup
+from maptasker.src.render import RenderError, load_model, render, render_model
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE = (ROOT / "sample.prj.xml").read_bytes()
+SPEC = BackupSpec(projects=3, profiles=8, tasks=20, actions=6, scenes=2, variables=4)
+DATE = re.compile(r"\d{1,2}-[A-Z][a-z]+-\d{4} \d\d:\d\d:\d\d")  # When the map was rendered (see frontmtr.py)
+
+
+def without_date(text: str) -> str:
+    """Take out the date and time the map was rendered."""
+    return DATE.sub("<date>", text)
+
+
+def test_render_is_deterministic() -> None:
+    """The same backup and options always give the same map."""
+    options = {"display_detail_level": 4, "directory": True, "twisty": True}
+    first = render(SAMPLE, options)
+    second = render(SAMPLE, options)
+    assert without_date(first.html) == without_date(second.html)
+    assert [without_date(str(line)) for line in first.output_lines] == [
+        without_date(str(line)) for line in second.output_lines
+    ]
+    assert first.totals == second.totals
+
+
+def test_model_is_not_changed_by_rendering() -> None:
+    """A loaded backup can be rendered many times at once, with the same maps as rendering it alone."""
+    model = load_model(SAMPLE)
+    options = [{"display_detail_level": level} for level in (0, 1, 2, 3, 4, 5)] * 2
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda option: render_model(model, option), options))
+    for option, result in zip(options, results, strict=True):
+        assert without_date(result.html) == without_date(render(SAMPLE, option).html)
+
+
+def test_totals() -> None:
+    """The totals are of the Projects, Profiles, Tasks and Scenes in the backup."""
+    totals = render(make_backup(SPEC), {"display_detail_level": 3}).totals
+    assert (totals["projects"], totals["profiles"], totals["scenes"]) == (SPEC.projects, SPEC.profiles, SPEC.scenes)
+    assert totals["named_tasks"] + totals["unnamed_tasks"] >= SPEC.tasks
+
+    totals = render(SAMPLE).totals
+    assert (totals["projects"], totals["profiles"], totals["scenes"]) == (1, 17, 0)
+
+
+def test_options_and_colors() -> None:
+    """The colors and the backup's name are in the map."""
+    result = render(SAMPLE, {"display_detail_level": 1}, {"task_color": "Orchid"}, "my_backup.xml")
+    assert "my_backup.xml" in result.html
+    assert ".task_color {color: Orchid;" in result.html
+    assert ".task_color {color: Orchid;" not in render(SAMPLE, {"display_detail_level": 1}).html
+
+
+@pytest.mark.parametrize(
+    "single_item",
+    [
+        {"single_project_name": "Backup Project 2"},
+        {"single_profile_name": "Music Profile 25"},
+        {"single_task_name": "Music Task 6"},
+    ],
+)
+def test_single_item_unreferenced_variables(single_item: dict) -> None:
+    """Only the single item's Project is mapped, but all of the Projects' variable references count."""
+    unused = b'<Variable sr="v9"><n>%Unused</n><v>none</v></Variable></TaskerData>'
+    backup = make_backup(SPEC).replace(b"</TaskerData>", unused)
+
+    def unreferenced(html: str) -> str:
+        start = html.index("Unreferenced Global Variables")
+        return html[start : html.index("</table>", start)]
+
+    expected = unreferenced(render(backup, {"display_detail_level": 4}).html)
+    assert "%Unused" in expected
+    assert unreferenced(render(backup, {"display_detail_level": 4} | single_item).html) == expected
+
+
+def test_learned_action_codes_are_logged(caplog: pytest.LogCaptureFixture) -> None:
+    """A Profile condition code that is not in actionc.py is logged at the end of the run, with its args."""
+    unknown = b'<State sr="con0" ve="2"><code>9905</code><Str sr="arg0" ve="3">on</Str><Int sr="arg1" val="1"/></State>'
+    backup = make_backup(SPEC).replace(b'<State sr="con0" ve="2"><code>5</code></State>', unknown, 1)
+    with caplog.at_level(logging.INFO, logger="MapTasker"):
+        render(backup, {"display_detail_level": 3, "conditions": True})
+    assert "actiond: 9905s is not in actionc.py: numargs=2, args=['0', '1'], types=['Str', 'Int']" in caplog.text
+
+
+@pytest.mark.parametrize(
+    ("backup", "options", "error"),
+    [
+        (b"<TaskerData><Task>", {}, "Improperly formatted XML"),
+        (b"\xff\xfe<TaskerData/>", {}, "Improperly formatted XML"),
+        (b"<NotTasker></NotTasker>", {}, "This is not a Tasker backup XML file."),
+        (SAMPLE, {"single_project_name": "No Such Project"}, 'Project "No Such Project" not found.'),
+        (SAMPLE, {"single_profile_name": "No Such Profile"}, 'Profile "No Such Profile" not found.'),
+        (SAMPLE, {"single_task_name": "No Such Task"}, 'Task "No Such Task" not found.'),
+    ],
+)
+def test_render_error(backup: bytes, options: dict, error: str) -> None:
+    """A backup that can't be mapped, or a single item that isn't in it, is a RenderError."""
+    with pytest.raises(RenderError, match=re.escape(error)):
+        render(backup, options)
+
+
+def test_unknown_option() -> None:
+    """An option that is not a runtime option is a ValueError."""
+    with pytest.raises(ValueError, match="Unknown render option"):
+        render(SAMPLE, {"no_such_option": True})
+
+
+def test_no_files_are_written(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Rendering writes no files."""
+    monkeypatch.chdir(tmp_path)
+    render(SAMPLE, {"display_detail_level": 4, "directory": True, "outline": True})
+    render(SAMPLE, {"single_task_name": "Run Code"})
+    with pytest.raises(RenderError):
+        render(SAMPLE, {"single_task_name": "No Such Task"})
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_rerun: map the same backup several times in one process (as the GUI does),      #
+#             reusing the backup loaded by the first map                              #
+#                                                                                      #
+from __future__ import annotations
+
+import os
+import re
+import sys
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from maptasker.src import taskerd
+from maptasker.src.mapit import mapit_all
+from maptasker.src.primitem import MapRun, use_run
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE = ROOT / "sample.prj.xml"
+DATE = re.compile(r"\d{1,2}-[A-Z][a-z]+-\d{4} \d\d:\d\d:\d\d")  # When the map was rendered (see frontmtr.py)
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the diagram would be opened in the text editor")
+
+
+@pytest.fixture
+def map_sample(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Iterator[Callable[..., str]]:
+    """Map the sample in this process, with no browser, text editor ('open') or display: returns the html."""
+    (tmp_path / "open").write_text("#!/bin/sh\nexit 0\n")
+    (tmp_path / "open").chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("BROWSER", "true")
+    monkeypatch.delenv("DISPLAY", raising=False)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".MapTasker_RunCount.txt").write_text("1")
+
+    def map_it(*args: str) -> str:
+        monkeypatch.setattr(sys, "argv", ["main.py", "-reset", "-file", str(SAMPLE), *args])
+        with use_run(MapRun()):
+            mapit_all("")
+        return DATE.sub("<date>", (tmp_path / "MapTasker.html").read_text(encoding="utf-8"))
+
+    yield map_it
+    taskerd.forget_the_model()
+
+
+def test_outline_does_not_change_the_reused_backup(map_sample: Callable[..., str]) -> None:
+    """An outline names the anonymous Tasks, but not in the backup that the next map reuses."""
+    first = map_sample("-detail", "3")
+    key = taskerd.kept_model["key"]
+    outline = map_sample("-detail", "3", "-outline")
+    again = map_sample("-detail", "3")
+
+    assert taskerd.kept_model["key"] == key
+    assert "Anonymous#" in outline
+    assert again == first
@@ -0,0 +1,101 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_runprof: the 'profiling' runtime option reports where the time of a run went    #
+#                                                                                      #
+import json
+import os
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+from maptasker.src.backgen import BackupSpec, write_backup
+from maptasker.src.primitem import MapRun, PrimeItems, use_run
+from maptasker.src.runprof import RunProfile, profile_count, profile_phase, profile_project
+from maptasker.src.sysconst import PROFILE_FILE, PROFILE_STATS_FILE
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_maptasker(args: list, cwd: Path) -> subprocess.CompletedProcess:
+    """Run MapTasker from the command line, in the directory."""
+    (cwd / ".MapTasker_RunCount.txt").write_text("1")
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, str(ROOT / "main.py"), "-reset", *args],
+        cwd=cwd,
+        env=os.environ | {"PYTHONPATH": str(ROOT)},
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=300,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return result
+
+
+def test_profiled_run(tmp_path: Path) -> None:
+    """A profiled run reports its phases, Projects, counts, memory and cProfile stats."""
+    sample = str(ROOT / "sample.prj.xml")
+    result = run_maptasker(
+        ["-file", sample, "-detail", "4", "-directory", "-profiling_cprofile", "-profiling_memory", "3"],
+        tmp_path,
+    )
+
+    report = json.loads((tmp_path / PROFILE_FILE).read_text())
+    assert report["file"] == sample
+    assert {"ingest", "projects", "directory", "write"} <= set(report["phases"])
+    assert list(report["projects"]) == ["Tasker HTTP API"]
+    assert report["projects"]["Tasker HTTP API"]["seconds"] <= report["phases"]["projects"]["seconds"]
+    assert report["seconds"] >= sum(report["phases"][phase]["seconds"] for phase in ("ingest", "projects", "write"))
+    assert report["counts"]["actions_decoded"] > 0
+    assert report["counts"]["lines_written"] > 0
+    assert report["counts"]["backup_cache_hits"] == 0
+    assert report["totals"]["projects"] == 1
+    assert len(report["memory"]) == 3
+
+    # The cProfile stats, and the summary.
+    assert pstats.Stats(report["profile_stats"]).total_calls > 0
+    assert report["profile_stats"] == str(tmp_path / PROFILE_STATS_FILE)
+    assert "MapTasker profile:" in result.stderr
+    assert "Tasker HTTP API" in result.stderr
+
+
+def test_not_profiled(tmp_path: Path) -> None:
+    """A run that is not profiled writes no report."""
+    run_maptasker(["-file", str(ROOT / "sample.prj.xml"), "-detail", "0"], tmp_path)
+    assert not (tmp_path / PROFILE_FILE).exists()
+
+
+def test_parallel_projects_are_profiled(tmp_path: Path) -> None:
+    """The Projects rendered in worker processes are in the report."""
+    spec = BackupSpec(projects=4, profiles=8, tasks=20, actions=6, scenes=2, variables=4)
+    write_backup(str(tmp_path / "backup.xml"), spec)
+    run_maptasker(["-file", str(tmp_path / "backup.xml"), "-detail", "3", "-parallel", "2", "-profiling"], tmp_path)
+
+    report = json.loads((tmp_path / PROFILE_FILE).read_text())
+    assert len(report["projects"]) == spec.projects
+    assert report["counts"]["actions_decoded"] > 0
+
+
+def test_nothing_is_recorded_unless_profiling() -> None:
+    """Nothing is recorded without a run profile, and profiles are merged."""
+    with use_run(MapRun()):
+        with profile_phase("ingest"), profile_project("Base"):
+            profile_count("actions_decoded")
+        assert PrimeItems.run_profile is None
+
+        PrimeItems.run_profile = RunProfile()
+        for _ in range(2):
+            with profile_phase("ingest"):
+                profile_count("actions_decoded", 3)
+        assert PrimeItems.run_profile.phases["ingest"]["calls"] == 2
+        assert PrimeItems.run_profile.counts["actions_decoded"] == 6
+
+        other = RunProfile()
+        other.add_time(other.projects, "Base", 1.0, 0.5)
+        other.counts["actions_decoded"] = 4
+        PrimeItems.run_profile.merge(other)
+        assert PrimeItems.run_profile.projects == {"Base": {"seconds": 1.0, "cpu_seconds": 0.5, "calls": 1}}
+        assert PrimeItems.run_profile.counts["actions_decoded"] == 10
@@ -0,0 +1,212 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_server: 'maptasker serve', the render server, and its cache of backups/maps     #
+#                                                                                      #
+#              Each test starts the server on a free port, in a thread.                #
+#                                                                                      #
+from __future__ import annotations
+
+import json
+import re
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import pytest
+
+from maptasker.src.backgen import make_backup, scale_spec
+from maptasker.src.render import render
+from maptasker.src.server import RenderService, get_serve_arguments, make_server
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE = (ROOT / "sample.prj.xml").read_bytes()  # About 2.2 MB in memory, once loaded
+GENERATED = make_backup(scale_spec(0.5))  # About 2.4 MB in memory, once loaded
+DATE = re.compile(r"\d{1,2}-[A-Z][a-z]+-\d{4} \d\d:\d\d:\d\d")  # When the map was rendered (see frontmtr.py)
+
+
+@pytest.fixture
+def start_server(serve: Callable) -> Iterator[Callable[..., str]]:
+    """Start the server with the 'maptasker serve' arguments: start_server("-memory", "3") returns its url."""
+    services = []
+
+    def start(*args: str) -> str:
+        arguments = get_serve_arguments(["-port", "0", *args])
+        services.append(RenderService(max(arguments.workers, 1), arguments.memory * 1024 * 1024, arguments.allow_paths))
+        server = serve(make_server(arguments, services[-1]))
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for service in services:
+        service.shutdown()
+
+
+def request(url: str, body: bytes | None = None, content_type: str = "application/xml") -> tuple:
+    """Send a request (a POST if there is a body): (status, headers, body as text)."""
+    the_request = urllib.request.Request(url, body, {"Content-Type": content_type} if body is not None else {})  # noqa: S310
+    try:
+        with urllib.request.urlopen(the_request, timeout=120) as response:  # noqa: S310
+            return response.status, response.headers, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read().decode()
+
+
+def render_options(url: str, backup: bytes, query: str = "") -> tuple:
+    """Render the backup with the options in the query: (status, headers, body)."""
+    return request(f"{url}/render{'?' if query else ''}{query}", backup)
+
+
+def cache_headers(headers: object) -> tuple:
+    """Whether the backup and the map came from the cache."""
+    return headers["X-MapTasker-Model-Cache"], headers["X-MapTasker-Result-Cache"]
+
+
+def get_status(url: str) -> dict:
+    """The cache statistics."""
+    return json.loads(request(f"{url}/status")[2])
+
+
+def test_render_over_post(start_server: Callable, tmp_path: Path) -> None:
+    """A backup posted, or given by its path, is rendered with the options in the query or json."""
+    url = start_server("-allow-paths", str(tmp_path))
+    status, headers, html = render_options(url, SAMPLE, "display_detail_level=3&directory=true")
+    assert status == 200
+    assert headers["Content-Type"] == "text/html; charset=utf-8"
+    expected = render(SAMPLE, {"display_detail_level": 3, "directory": True})
+    assert DATE.sub("", html) == DATE.sub("", expected.html)
+    assert json.loads(headers["X-MapTasker-Totals"]) == expected.totals
+
+    # A json request, with the path of the backup.
+    (tmp_path / "backup.xml").write_bytes(SAMPLE)
+    body = {"path": str(tmp_path / "backup.xml"), "options": {"display_detail_level": 3, "directory": True}}
+    status, _, path_html = request(f"{url}/render", json.dumps(body).encode(), "application/json")
+    assert status == 200
+    assert DATE.sub("", path_html).replace("backup.xml", "") == DATE.sub("", html).replace("backup.xml", "")
+    # A path relative to the -allow-paths directory.
+    status, _, relative_html = render_options(url, b"", "path=backup.xml&display_detail_level=3&directory=true")
+    assert status == 200
+    assert DATE.sub("", relative_html) == DATE.sub("", path_html)
+
+
+def test_paths_are_confined(start_server: Callable, tmp_path: Path) -> None:
+    """A backup can only be read by its path if it is in the -allow-paths directory."""
+    allowed = tmp_path / "allowed"
+    allowed.mkdir()
+    (allowed / "backup.xml").write_bytes(SAMPLE)
+    (tmp_path / "secret.xml").write_bytes(SAMPLE)
+    (allowed / "link.xml").symlink_to(tmp_path / "secret.xml")
+
+    # Without -allow-paths, no path can be rendered.
+    status, _, error = render_options(start_server(), b"", f"path={allowed / 'backup.xml'}")
+    assert (status, "start the server with -allow-paths DIR" in error) == (403, True)
+
+    url = start_server("-allow-paths", str(allowed))
+    assert render_options(url, b"", f"path={allowed / 'backup.xml'}&display_detail_level=0")[0] == 200
+    for path in (tmp_path / "secret.xml", "../secret.xml", "link.xml", "/etc/passwd"):
+        status, _, error = render_options(url, b"", f"path={path}")
+        assert (status, "Backup path is not in" in error) == (403, True), path
+    assert render_options(url, b"", "path=missing.xml")[0] == 404
+
+
+def test_body_limit(start_server: Callable) -> None:
+    """A body larger than -max-body is rejected without reading it."""
+    url = start_server("-max-body", "1")
+    status, _, error = render_options(url, b"<" * (1024 * 1024 + 1), "display_detail_level=0")
+    assert (status, "larger than the limit of 1,048,576 bytes" in error) == (413, True)
+    # The body was never read, and the server carries on.
+    assert render_options(url, SAMPLE, "display_detail_level=0")[0] == 200
+    assert get_status(url)["model_misses"] == 1
+
+
+def test_cache_hits_and_misses(start_server: Callable) -> None:
+    """The loaded backup and the rendered map are kept for the next request."""
+    url = start_server()
+    _, headers, first = render_options(url, SAMPLE, "display_detail_level=2")
+    assert cache_headers(headers) == ("miss", "miss")
+    _, headers, again = render_options(url, SAMPLE, "display_detail_level=2")
+    assert cache_headers(headers) == ("hit", "hit")
+    assert again == first
+    _, headers, _ = render_options(url, SAMPLE, "display_detail_level=3")
+    assert cache_headers(headers) == ("hit", "miss")
+
+    stats = get_status(url)
+    assert (stats["model_hits"], stats["model_misses"]) == (2, 1)
+    assert (stats["result_hits"], stats["result_misses"]) == (1, 2)
+    assert (stats["models"], stats["results"], stats["evictions"]) == (1, 2, 0)
+
+
+def test_least_recently_used_backup_is_evicted(start_server: Callable) -> None:
+    """The backup used longest ago makes way for a new one over the memory budget."""
+    url = start_server("-memory", "3")
+    render_options(url, SAMPLE, "display_detail_level=0")
+    _, headers, _ = render_options(url, GENERATED, "display_detail_level=0")
+    assert cache_headers(headers) == ("miss", "miss")
+
+    stats = get_status(url)
+    assert (stats["models"], stats["evictions"]) == (1, 1)
+    assert stats["memory_used"] <= stats["memory_budget"] == 3 * 1024 * 1024
+    # The generated backup is kept, and the sample has to be loaded again.
+    _, headers, _ = render_options(url, GENERATED, "display_detail_level=0")
+    assert cache_headers(headers) == ("hit", "hit")
+    _, headers, _ = render_options(url, SAMPLE, "display_detail_level=0")
+    assert cache_headers(headers)[0] == "miss"
+
+
+def test_backup_larger_than_the_budget_is_not_cached(start_server: Callable) -> None:
+    """A backup larger than the memory budget is rendered but not kept."""
+    url = start_server("-memory", "1")
+    for _ in range(2):
+        status, headers, _ = render_options(url, SAMPLE, "display_detail_level=0")
+        assert status == 200
+        assert cache_headers(headers) == ("miss", "miss")
+    stats = get_status(url)
+    assert (stats["models"], stats["results"], stats["memory_used"]) == (0, 0, 0)
+
+
+@pytest.mark.parametrize(
+    ("query", "body", "content_type", "status", "error"),
+    [
+        ("nonsense_option=1", SAMPLE, "application/xml", 400, "Unknown render option(s): nonsense_option"),
+        ("", b"<TaskerData><Task>", "application/xml", 400, "Improperly formatted XML"),
+        ("", b"", "application/xml", 400, "No backup"),
+        ("", b"[1, 2]", "application/json", 400, "must be a json object"),
+        ("", b'{"path": "/no/such/backup.xml"}', "application/json", 403, "Backup paths are not allowed"),
+    ],
+)
+def test_bad_requests(
+    start_server: Callable,
+    query: str,
+    body: bytes,
+    content_type: str,
+    status: int,
+    error: str,
+) -> None:
+    """A bad request is answered with its status and error."""
+    url = start_server()
+    response = request(f"{url}/render{'?' if query else ''}{query}", body, content_type)
+    assert response[0] == status
+    assert error in response[2]
+
+
+def test_concurrent_requests(start_server: Callable) -> None:
+    """Requests rendered at the same time give the same maps as rendering them alone."""
+    url = start_server("-workers", "4")
+    queries = [f"display_detail_level={level}&directory=true" for level in (0, 1, 2, 3)] * 3
+    with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+        responses = list(executor.map(lambda query: render_options(url, SAMPLE, query), queries))
+
+    assert all(status == 200 for status, _, _ in responses)
+    # The same options give the same map, which is what it is when rendered on its own.
+    htmls = {}
+    for query, (_, _, html) in zip(queries, responses, strict=True):
+        htmls.setdefault(query, set()).add(DATE.sub("", html))
+    for level in (0, 1, 2, 3):
+        expected = render(SAMPLE, {"display_detail_level": level, "directory": True}).html
+        assert htmls[f"display_detail_level={level}&directory=true"] == {DATE.sub("", expected)}
+    # The backup was only loaded once.
+    assert get_status(url)["model_misses"] == 1
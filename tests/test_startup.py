@@ -0,0 +1,77 @@
+#! /usr/bin/env python3
+
+#                                                                                      #
+# test_startup: guard the start up time of a plain (command line) run                  #
+#                                                                                      #
+#               A plain run must not load the GUI, Ai or network packages, and         #
+#               importing MapTasker must stay within the import time budget.           #
+#               The budget can be changed with MAPTASKER_IMPORT_BUDGET_MS.             #
+#                                                                                      #
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Packages that are only to be loaded when the feature that needs them is used.
+DEFERRED_PACKAGES = ("customtkinter", "PIL", "openai", "ollama", "requests")
+
+# Import time budget for maptasker.src.mapit, in milliseconds.
+IMPORT_BUDGET_MS = int(os.environ.get("MAPTASKER_IMPORT_BUDGET_MS", "500"))
+
+
+def run_with_import_time(args: list, cwd: Path) -> dict:
+    """
+    Run python with '-X importtime' and get the cumulative import time of each module.
+        Args:
+            args (list): the arguments to python, after '-X importtime'
+            cwd (Path): the directory to run in
+
+        Returns:
+            dict: module name: cumulative import time in microseconds
+    """
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd,
+        env=os.environ | {"PYTHONPATH": str(ROOT)},
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        timeout=300,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            modules[name.strip()] = int(cumulative)
+    return modules
+
+
+def test_plain_run_does_not_load_deferred_packages(tmp_path: Path) -> None:
+    """
+    A plain command line run of the sample backup loads none of the GUI, Ai or network packages.
+    """
+    (tmp_path / ".MapTasker_RunCount.txt").write_text("1")
+    modules = run_with_import_time(
+        [str(ROOT / "main.py"), "-reset", "-file", str(ROOT / "sample.prj.xml"), "-detail", "3"],
+        tmp_path,
+    )
+    assert "maptasker.src.mapit" in modules
+    loaded = [package for package in DEFERRED_PACKAGES if package in modules]
+    assert not loaded, f"A plain run loaded: {', '.join(loaded)}"
+
+
+def test_import_time_budget(tmp_path: Path) -> None:
+    """
+    Importing the program stays within the import time budget.
+    """
+    modules = run_with_import_time(["-c", "import maptasker.src.mapit"], tmp_path)
+    import_time_ms = modules["maptasker.src.mapit"] / 1000
+    assert import_time_ms <= IMPORT_BUDGET_MS, (
+        f"Importing maptasker.src.mapit took {import_time_ms:.0f}ms (budget {IMPORT_BUDGET_MS}ms)"
+    )